@@ -1,4 +1,5 @@
 import wallchart
 
 app = wallchart.create_app()
+wallchart.start_schedulers(app)
 application = app
@@ -1,31 +1,43 @@
 import os
 import tempfile
+from contextlib import contextmanager
 
 import pytest
 from flask import current_app
 
 import wallchart
-from wallchart import db
+from wallchart import db, db_wrapper
 from wallchart.db import create_tables
 from wallchart.util import parse_csv
 
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     db_fd, db_path = tempfile.mkstemp()
     app = wallchart.create_app(
         {
             "ADMIN_PASSWORD": "admin",
+            "BACKUP_FOLDER": tmp_path / "backups",
+            # compacted explicitly where tested
+            "CHECKPOINT_INTERVAL": None,
             "DATABASE": db_path,
             "SECRET_KEY": "test",
+            "SLOW_QUERY_LOG": tmp_path / "slow-queries.log",
             "TESTING": True,
-        }
+            "UPLOAD_FOLDER": tmp_path,
+        },
+        # keeps scheduler.lock and friends out of the source tree
+        instance_path=str(tmp_path / "instance"),
     )
     create_tables()
-    load_test_data()
+    with app.app_context():
+        load_test_data()
     yield app
     os.close(db_fd)
     os.unlink(db_path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
 
 
 @pytest.fixture
@@ -65,3 +77,20 @@ def admin_login(client):
 
 def logout(client):
     return client.get("/logout/", follow_redirects=True)
+
+
+@contextmanager
+def record_queries():
+    """Collect ``(sql, params)`` of every statement executed in the block."""
+    database = db_wrapper.database.obj
+    queries = []
+
+    def execute_sql(sql, params=None, *args, **kwargs):
+        queries.append((sql, params))
+        return type(database).execute_sql(database, sql, params, *args, **kwargs)
+
+    database.execute_sql = execute_sql
+    try:
+        yield queries
+    finally:
+        del database.execute_sql
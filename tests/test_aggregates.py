@@ -0,0 +1,109 @@
+import pytest
+
+from tests.conftest import admin_login
+from wallchart import aggregates, db
+from wallchart.db import (
+    Department,
+    DepartmentCount,
+    Participation,
+    ParticipationCount,
+    StructureTest,
+    Worker,
+)
+
+
+@pytest.fixture
+def structure_tests(client):
+    tests = [
+        StructureTest.create(name="Card", description=""),
+        StructureTest.create(name="Strike", description=""),
+    ]
+    db.close()
+    return tests
+
+
+def participants(department_id, structure_test_id):
+    return (
+        ParticipationCount.select(ParticipationCount.participants)
+        .where(
+            (ParticipationCount.department_id == department_id)
+            & (ParticipationCount.structure_test_id == structure_test_id)
+        )
+        .scalar()
+    )
+
+
+def test_rebuild_after_import(client):
+    assert DepartmentCount.select().count() == 9
+    assert aggregates.check() == []
+
+
+def test_participation_toggle(client, structure_tests):
+    admin_login(client)
+    worker = Worker.get_by_id(1)
+    card = structure_tests[0]
+
+    assert client.get(f"/participation/1/{card.id}/1").status_code == 200
+    assert participants(worker.organizing_dept_id, card.id) == 1
+    assert client.get(f"/participation/1/{card.id}/0").status_code == 200
+    assert client.get(f"/participation/1/{card.id}/0").status_code == 200
+    assert participants(worker.organizing_dept_id, card.id) == 0
+    assert aggregates.check() == []
+
+
+def test_worker_edit_and_delete(client, structure_tests):
+    admin_login(client)
+    card = structure_tests[0]
+    client.get(f"/participation/1/{card.id}/1")
+    pami = Department.get(Department.name == "Pami")
+
+    rv = client.post("/worker/1", data={"organizing_dept": pami.id, "active": "True"})
+    assert rv.status_code == 302
+    assert participants(pami.id, card.id) == 1
+    assert aggregates.check() == []
+
+    client.post("/worker/1", data={"organizing_dept": pami.id})
+    assert participants(pami.id, card.id) == 0
+    assert aggregates.check() == []
+
+    client.post("/worker/2", data={"organizing_dept": pami.id, "active": "True"})
+    client.get("/worker/2/delete")
+    assert DepartmentCount.get_by_id(pami.id).workers == 1
+    assert aggregates.check() == []
+
+
+def test_structure_test_delete(client, structure_tests):
+    admin_login(client)
+    card = structure_tests[0]
+    client.get(f"/participation/1/{card.id}/1")
+    client.post(f"/structure_test/{card.id}?action=delete")
+    assert ParticipationCount.select().count() == 0
+    assert aggregates.check() == []
+
+
+def test_overview_pages(client, structure_tests):
+    admin_login(client)
+    client.get(f"/participation/1/{structure_tests[0].id}/1")
+
+    rv = client.get("/departments/")
+    assert b"Departments (9)" in rv.data
+    assert b'title="1&#x2F;2 completed"' in rv.data
+
+    rv = client.get("/units/")
+    assert b"Units (9)" in rv.data
+
+
+def test_check_and_rebuild_commands(app, client):
+    DepartmentCount.update(workers=5).where(
+        DepartmentCount.department_id == 1
+    ).execute()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["db", "check-aggregates"])
+    assert result.exit_code == 1
+    assert "department 1 structure test None: stored 5, actual 2" in result.output
+
+    result = runner.invoke(args=["db", "rebuild-aggregates"])
+    assert result.exit_code == 0
+    result = runner.invoke(args=["db", "check-aggregates"])
+    assert result.exit_code == 0
@@ -1,3 +1,5 @@
+import json
+
 from tests.conftest import admin_login
 
 # /api/workers
@@ -13,6 +15,48 @@ def test_api_workers_login_data(client):
     rv = client.get("/api/workers")
     assert rv.status_code == 200
     assert len(rv.json) == 10
+    assert [worker["id"] for worker in rv.json] == list(range(1, 11))
+    assert "password" not in rv.json[0]
+    assert "notes" not in rv.json[0]
+
+
+def test_api_workers_pages(client):
+    admin_login(client)
+    rv = client.get("/api/workers?limit=4&fields=name")
+    assert [worker["id"] for worker in rv.json] == [1, 2, 3, 4]
+    assert (
+        rv.headers["Link"]
+        == '</api/workers?limit=4&fields=name&after_id=4>; rel="next"'
+    )
+
+    rv = client.get("/api/workers?limit=4&fields=name&after_id=8")
+    assert rv.json == [
+        {"id": 9, "name": "Hello,Winter Melon"},
+        {"id": 10, "name": "Josephonson,Bob K"},
+    ]
+    assert "Link" not in rv.headers
+
+
+def test_api_workers_ndjson(client):
+    admin_login(client)
+    rv = client.get("/api/workers?format=ndjson&fields=active&after_id=5")
+    assert rv.mimetype == "application/x-ndjson"
+    lines = rv.data.decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": worker_id, "active": True} for worker_id in range(6, 11)
+    ]
+
+
+def test_api_workers_empty(client):
+    admin_login(client)
+    rv = client.get("/api/workers?after_id=10")
+    assert rv.json == []
+
+
+def test_api_workers_unknown_field(client):
+    admin_login(client)
+    rv = client.get("/api/workers?fields=name,password")
+    assert rv.status_code == 400
 
 
 # /api/worker
@@ -36,10 +80,18 @@ def test_api_worker_login_data(client):
     assert rv.json["active"] == True
     assert rv.json["id"] == 1
     assert rv.json["email"] == "test@test.com"
-    assert (
-        rv.json["password"]
-        == "$2b$12$bKGBVGgi7AzUXIuljVHE8OxPptMM9TxYKTw7qdNQiBDIAZ.jjXxyu"
-    )
+    assert "password" not in rv.json
+    assert "notes" not in rv.json
+
+
+def test_api_worker_fields(client):
+    admin_login(client)
+    rv = client.get("/api/worker/1?fields=name,department_slug")
+    assert rv.json == {
+        "id": 1,
+        "name": "Station,International Space",
+        "department_slug": "curriculum-studies",
+    }
 
 
 # /api/participation
@@ -84,4 +136,4 @@ def test_api_units(client):
     admin_login(client)
     rv = client.get("/api/units")
     assert rv.status_code == 200
-    assert len(rv.json) == 0
+    assert len(rv.json) == 9
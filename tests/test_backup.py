@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import sqlite3
+
+import pytest
+
+import wallchart
+from tests.conftest import admin_login
+from wallchart import backup, db
+
+
+def workers(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT COUNT(*) FROM worker").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_download_db(client, tmp_path):
+    admin_login(client)
+    rv = client.get("/download_db")
+    assert rv.status_code == 200
+    assert rv.mimetype == "application/gzip"
+    assert rv.headers["Content-Disposition"].endswith(".db.gz")
+
+    data = gzip.decompress(rv.data)
+    assert hashlib.sha256(data).hexdigest() == rv.headers["X-Checksum-SHA256"]
+    (tmp_path / "download.db").write_bytes(data)
+    assert workers(tmp_path / "download.db") == 10
+
+    # the temporary snapshot is gone once the response is sent
+    rv.close()
+    assert list(backup.backup_folder().iterdir()) == []
+
+
+def test_download_db_cleanup(client, monkeypatch):
+    admin_login(client)
+    # HEAD requests never read the body
+    rv = client.head("/download_db")
+    assert rv.status_code == 200
+    rv.close()
+    assert list(backup.backup_folder().iterdir()) == []
+
+    def checksum(path):
+        raise OSError("disk failed")
+
+    monkeypatch.setattr(backup, "checksum", checksum)
+    with pytest.raises(OSError):
+        client.get("/download_db")
+    assert list(backup.backup_folder().iterdir()) == []
+
+
+def test_download_db_nologin(client):
+    rv = client.get("/download_db")
+    assert rv.status_code == 302
+
+
+def test_store_snapshot(app, tmp_path):
+    with app.app_context():
+        assert backup.snapshot_due(3600)
+        stored = backup.store_snapshot()
+        assert backup.snapshots() == [stored]
+        assert not backup.snapshot_due(3600)
+
+        (tmp_path / "restored.db").write_bytes(gzip.decompress(stored.read_bytes()))
+        assert workers(tmp_path / "restored.db") == 10
+        db.close()
+
+
+def test_snapshot_retention(app):
+    with app.app_context():
+        folder = backup.backup_folder()
+        for day in range(1, 5):
+            (folder / f"wallcharts-2020010{day}-000000.db.gz").touch()
+        stored = backup.store_snapshot(retention=2)
+        assert backup.snapshots() == [
+            stored,
+            folder / "wallcharts-20200104-000000.db.gz",
+        ]
+        db.close()
+
+
+def test_start_schedulers(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(backup, "start_scheduler", started.append)
+    wallchart.start_schedulers(app)
+    assert started == []
+
+    app.config["BACKUP_INTERVAL"] = 3600
+    wallchart.start_schedulers(app)
+    # a second process finds the lock taken
+    other = wallchart.create_app(
+        dict(app.config, DATABASE=app.config["DATABASE"]["name"]), app.instance_path
+    )
+    wallchart.start_schedulers(other)
+    assert started == [app]
+    app.extensions["scheduler_lock"].close()
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from wallchart import bench, events
+from wallchart.db import Participation
+
+
+def test_roster_rows():
+    rows = list(bench.roster_rows(500, departments=20, units=4))
+    assert len({(row["Last Name"], row["First Name"]) for row in rows}) == 500
+    assert len({row["Sect Desc"] for row in rows}) <= 20
+    assert {row["Unit (in UnionWare)"] for row in rows} <= {
+        "UNIT 1",
+        "UNIT 2",
+        "UNIT 3",
+        "UNIT 4",
+    }
+    assert rows == list(bench.roster_rows(500, departments=20, units=4))
+
+
+def test_roster_csv():
+    reader = csv.DictReader(io.StringIO(bench.roster_csv(3).decode()))
+    assert tuple(reader.fieldnames) == bench.HEADER
+    assert len(list(reader)) == 3
+
+
+def test_generate_participation(client):
+    assert "Dela Cruz" in bench.LAST_NAMES
+    tests = bench.generate_participation(structure_tests=3, rate=1)
+    added = {
+        structure_test_id: day
+        for structure_test_id, day in Participation.select(
+            Participation.structure_test, Participation.added
+        )
+        .where(Participation.structure_test.in_(tests))
+        .order_by(Participation.added.desc())
+        .tuples()
+    }
+    # spread over the history instead of all added today
+    assert added[tests[0]] < added[tests[-1]] <= date.today()
+    assert (
+        len(events.participation_at(datetime.now())) == Participation.select().count()
+    )
+
+
+def test_suffix():
+    assert [bench.suffix(number) for number in (0, 25, 26, 701, 702)] == [
+        "A",
+        "Z",
+        "AA",
+        "ZZ",
+        "AAA",
+    ]
+
+
+def test_run(tmp_path):
+    output = tmp_path / "bench.json"
+    assert (
+        bench.main(
+            [
+                "--workers=60",
+                "--departments=5",
+                "--units=2",
+                "--structure-tests=3",
+                "--repeat=2",
+                f"--output={output}",
+            ]
+        )
+        == 0
+    )
+    results = json.loads(output.read_text())
+    assert results["scale"]["workers"] == 60
+    for name in ("import", "departments_cold", "department_warm", "api_workers"):
+        assert results["results"][name]["median_ms"] > 0
+    assert results["results"]["departments_warm"]["queries"] == 1
+
+
+def test_compare():
+    old = {"results": {"a": {"median_ms": 10}, "b": {"median_ms": 10}}}
+    new = {
+        "results": {
+            "a": {"median_ms": 11},
+            "b": {"median_ms": 13},
+            "c": {"median_ms": 1},
+        }
+    }
+    assert bench.compare(old, new) == [("b", 10, 13)]
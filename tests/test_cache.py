@@ -0,0 +1,92 @@
+import pytest
+
+from tests.conftest import admin_login
+from wallchart import db
+from wallchart.cache import build_id, data_version, response_cache
+from wallchart.db import StructureTest
+
+
+@pytest.fixture
+def structure_test(client):
+    structure_test = StructureTest.create(name="Card", description="")
+    db.close()
+    return structure_test
+
+
+def test_etag_not_modified(client, structure_test):
+    admin_login(client)
+    client.get("/admin")
+
+    rv = client.get("/departments/")
+    assert rv.status_code == 200
+    assert rv.headers["Cache-Control"] == "private, no-cache"
+    etag = rv.headers["ETag"]
+
+    rv = client.get("/departments/", headers={"If-None-Match": etag})
+    assert rv.status_code == 304
+    assert rv.headers["ETag"] == etag
+
+
+def test_etag_per_build(app, client, structure_test):
+    admin_login(client)
+    etag = client.get("/departments/").headers["ETag"]
+
+    # a deployment with changed templates
+    app.extensions["build_id"] = "next"
+    rv = client.get("/departments/", headers={"If-None-Match": etag})
+    assert rv.status_code == 200
+    assert rv.headers["ETag"] != etag
+
+
+def test_build_id(tmp_path):
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("old")
+    before = build_id(tmp_path)
+    assert build_id(tmp_path) == before
+    (tmp_path / "templates" / "page.html").write_text("new")
+    assert build_id(tmp_path) != before
+
+
+def test_write_invalidates(client, structure_test):
+    admin_login(client)
+    client.get("/admin")
+
+    version = data_version()
+    rv = client.get("/structure_tests")
+    etag = rv.headers["ETag"]
+    assert b"0 (0.0%)" in rv.data
+
+    client.get(f"/participation/1/{structure_test.id}/1")
+    assert data_version() == version + 1
+
+    rv = client.get("/structure_tests", headers={"If-None-Match": etag})
+    assert rv.status_code == 200
+    assert rv.headers["ETag"] != etag
+    assert b"1 (10.0%)" in rv.data
+
+
+def test_cache_per_role(client, structure_test):
+    admin_login(client)
+    client.get("/admin")
+    response_cache().clear()
+
+    rv = client.get("/structure_tests")
+    assert b"Add Structure Test" in rv.data
+    assert len(response_cache().entries) == 1
+
+    client.get("/logout/")
+    client.post("/login/", data=dict(email="test@test.com", password="test"))
+    client.get("/department/")
+    rv = client.get("/structure_tests")
+    assert b"Add Structure Test" not in rv.data
+    assert len(response_cache().entries) == 2
+
+
+def test_flash_not_cached(app, client):
+    response_cache().clear()
+    client.post(
+        "/login/", data=dict(email="admin", password=app.config["ADMIN_PASSWORD"])
+    )
+    rv = client.get("/admin")
+    assert b"You are logged in as administrator." in rv.data
+    assert len(response_cache().entries) == 0
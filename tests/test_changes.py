@@ -0,0 +1,94 @@
+import io
+
+from tests.conftest import admin_login
+from wallchart import db
+from wallchart.changes import revision
+from wallchart.db import StructureTest, Worker
+from wallchart.util import parse_csv
+
+
+def token(client, url):
+    rv = client.get(url)
+    assert rv.status_code == 200
+    return int(rv.headers["X-Change-Token"])
+
+
+def test_token_header(client):
+    admin_login(client)
+    tokens = {
+        token(client, url)
+        for url in (
+            "/api/workers",
+            "/api/workers?limit=2",
+            "/api/participation",
+            "/api/departments",
+            "/api/units",
+        )
+    }
+    assert len(tokens) == 1
+    assert tokens.pop() > 0
+
+
+def test_since_unchanged(client):
+    admin_login(client)
+    since = token(client, "/api/workers")
+    for url in ("/api/workers", "/api/participation", "/api/departments"):
+        rv = client.get(f"{url}?since={since}")
+        assert rv.json == {"token": since, "changed": [], "deleted": []}
+
+
+def test_since_worker_changes(client):
+    admin_login(client)
+    since = token(client, "/api/workers")
+
+    Worker.update(preferred_name="Dolly").where(Worker.id == 4).execute()
+    Worker.delete().where(Worker.id == 2).execute()
+    db.close()
+
+    rv = client.get(f"/api/workers?since={since}&fields=preferred_name")
+    assert rv.json["changed"] == [{"id": 4, "preferred_name": "Dolly"}]
+    assert rv.json["deleted"] == [2]
+    assert rv.json["token"] == int(rv.headers["X-Change-Token"])
+    assert rv.json["token"] > since
+
+    rv = client.get(f"/api/workers?since={rv.json['token']}")
+    assert rv.json["changed"] == rv.json["deleted"] == []
+
+
+def test_since_participation_toggle(client):
+    structure_test = StructureTest.create(name="Card", description="")
+    db.close()
+    admin_login(client)
+    since = token(client, "/api/participation")
+
+    client.get(f"/participation/1/{structure_test.id}/1")
+    rv = client.get(f"/api/participation?since={since}")
+    (participation,) = rv.json["changed"]
+    assert participation["worker"] == 1
+    since = rv.json["token"]
+
+    client.get(f"/participation/1/{structure_test.id}/0")
+    rv = client.get(f"/api/participation?since={since}")
+    assert rv.json["changed"] == []
+    assert rv.json["deleted"] == [participation["id"]]
+
+
+def test_since_roster_import(client):
+    admin_login(client)
+    since = token(client, "/api/departments")
+    with open("tests/test_roster.csv", "rb") as roster_file:
+        roster = roster_file.read() + b"Doe,Jane,NEW UNIT,NEW SECTION,NEW SECTION\n"
+    with client.application.app_context():
+        parse_csv(io.BytesIO(roster), diff=True)
+        db.close()
+
+    rv = client.get(f"/api/departments?since={since}")
+    assert [department["name"] for department in rv.json["changed"]] == ["New Section"]
+    rv = client.get(f"/api/workers?since={since}&fields=name")
+    assert rv.json["changed"] == [{"id": 11, "name": "Doe,Jane"}]
+
+
+def test_since_unknown_token(client):
+    admin_login(client)
+    rv = client.get(f"/api/units?since={revision() + 1}")
+    assert rv.status_code == 410
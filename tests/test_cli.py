@@ -0,0 +1,89 @@
+import csv
+import io
+import shutil
+
+from wallchart import db
+from wallchart.db import ImportHistory, Participation, StructureTest, Worker
+
+
+def invoke(app, *args, **kwargs):
+    return app.test_cli_runner().invoke(args=["wallchart", *args], **kwargs)
+
+
+def test_import(app, tmp_path):
+    roster = tmp_path / "roster.csv"
+    shutil.copy("tests/test_roster.csv", roster)
+
+    rv = invoke(app, "import", str(roster))
+    assert rv.exit_code == 0, rv.output
+    assert "Imported 10 rows in" in rv.output
+    assert "rows/s" in rv.output
+    for phase in ("load", "workers", "deactivate", "aggregates"):
+        assert f"  {phase} " in rv.output
+    assert "0 created, 10 updated, 0 deactivated" in rv.output
+
+    with app.app_context():
+        latest = ImportHistory.select().order_by(ImportHistory.id.desc()).get()
+        assert (latest.filename, latest.mode) == ("roster.csv", "full")
+        db.close()
+
+
+def test_import_stdin(app):
+    with open("tests/test_roster.csv", "rb") as roster_file:
+        roster = roster_file.read()
+    rows = roster.splitlines(keepends=True)
+
+    rv = invoke(app, "import", "-", "--dry-run", input=b"".join(rows[:-1]))
+    assert rv.exit_code == 0, rv.output
+    assert "1 deactivated, 9 unchanged (dry run, nothing written)" in rv.output
+    with app.app_context():
+        assert Worker.select().where(Worker.active == False).count() == 0
+        db.close()
+
+    rv = invoke(app, "import", "-", "--diff", input=roster)
+    assert "0 deactivated, 10 unchanged" in rv.output
+
+
+def test_export(app, tmp_path):
+    with app.app_context():
+        structure_test = StructureTest.create(name="Card", description="")
+        Participation.create(worker=1, structure_test=structure_test)
+        db.close()
+
+    output = tmp_path / "wallcharts.csv"
+    rv = invoke(app, "export", str(output))
+    assert rv.exit_code == 0, rv.output
+    rows = list(csv.DictReader(io.StringIO(output.read_text())))
+    assert len(rows) == 10
+    assert [row["Card"] for row in rows].count("x") == 1
+
+    rv = invoke(app, "export", "-", "--department", "curriculum-studies")
+    rows = list(csv.DictReader(io.StringIO(rv.stdout)))
+    assert {row["Department"] for row in rows} == {"Curriculum Studies"}
+
+    rv = invoke(app, "export", "-", "--department", "unknown")
+    assert rv.exit_code == 1
+    assert "Unknown department unknown" in rv.output
+
+
+def test_maintenance(app):
+    rv = invoke(app, "rebuild-aggregates")
+    assert rv.exit_code == 0, rv.output
+    assert "Aggregates rebuilt in" in rv.output
+
+    rv = invoke(app, "analyze")
+    assert rv.exit_code == 0, rv.output
+    assert "Analyzed in" in rv.output
+
+    rv = invoke(app, "vacuum")
+    assert rv.exit_code == 0, rv.output
+    assert "Vacuumed in" in rv.output
+    assert "MiB ->" in rv.output
+
+
+def test_bench(app):
+    rv = invoke(
+        app, "bench", "--workers", "60", "--structure-tests", "2", "--repeat", "1"
+    )
+    assert rv.exit_code == 0, rv.output
+    assert "departments_cold" in rv.output
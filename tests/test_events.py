@@ -0,0 +1,251 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import wallchart
+from tests.conftest import admin_login
+from wallchart import db, events
+from wallchart.db import (
+    Participation,
+    ParticipationCheckpoint,
+    ParticipationEvent,
+    StructureTest,
+    Worker,
+)
+
+
+@pytest.fixture
+def structure_tests(client):
+    tests = [
+        StructureTest.create(name="Card", description=""),
+        StructureTest.create(name="Strike", description=""),
+    ]
+    db.close()
+    return tests
+
+
+def log(*changes):
+    """Append ``(worker_id, structure_test_id, status, timestamp)`` events."""
+    for worker_id, structure_test_id, status, timestamp in changes:
+        ParticipationEvent.create(
+            worker_id=worker_id,
+            structure_test_id=structure_test_id,
+            status=status,
+            timestamp=timestamp,
+        )
+
+
+def test_participation_logged(client, structure_tests):
+    card, strike = structure_tests
+    admin_login(client)
+    client.get(f"/participation/1/{card.id}/1")
+    client.get(f"/participation/1/{card.id}/1")
+    rv = client.post(
+        "/participation",
+        json={
+            "changes": [
+                {"worker": 1, "structure_test": card.id, "status": 0},
+                {"worker": 2, "structure_test": strike.id, "status": 1},
+            ]
+        },
+    )
+    assert rv.json == {"added": 1, "removed": 1}
+
+    logged = list(
+        ParticipationEvent.select(
+            ParticipationEvent.worker_id,
+            ParticipationEvent.structure_test_id,
+            ParticipationEvent.status,
+            ParticipationEvent.user_id,
+        )
+        .order_by(ParticipationEvent.id)
+        .tuples()
+    )
+    # repeated clicks change nothing and are not logged
+    assert logged == [
+        (1, card.id, True, 0),
+        (2, strike.id, True, 0),
+        (1, card.id, False, 0),
+    ]
+    assert events.participation_at(datetime.now()) == {(2, strike.id)}
+    assert events.participation_at(datetime(2000, 1, 1)) == set()
+
+
+def test_deletions_logged(client, structure_tests):
+    card, strike = structure_tests
+    admin_login(client)
+    for worker_id in (1, 2):
+        for structure_test in structure_tests:
+            client.get(f"/participation/{worker_id}/{structure_test.id}/1")
+
+    client.get("/worker/1/delete")
+    client.post(f"/structure_test/{strike.id}?action=delete")
+    assert events.participation_at(datetime.now()) == {(2, card.id)}
+    assert events.participation_at(datetime.now()) == set(
+        Participation.select(
+            Participation.worker, Participation.structure_test
+        ).tuples()
+    )
+
+
+def test_checkpoints(client, structure_tests, monkeypatch):
+    monkeypatch.setattr(events, "CHECKPOINT_EVENTS", 2)
+    card, strike = structure_tests
+    day = datetime(2024, 1, 1)
+    log(
+        (1, card.id, True, day),
+        (2, card.id, True, day + timedelta(days=1)),
+        (1, strike.id, True, day + timedelta(days=2)),
+        (1, card.id, False, day + timedelta(days=3)),
+        (3, card.id, True, day + timedelta(days=4)),
+    )
+    assert events.compact().event_id == 5
+    assert events.compact() is None
+
+    # the scheduler compacts once enough events piled up
+    events.record([(4, card.id)], [], user_id=1)
+    assert events.compact_if_due() is None
+    events.record([(5, card.id)], [(3, card.id)], user_id=1)
+    assert events.compact_if_due().event_id == 8
+    assert ParticipationCheckpoint.select().count() == 2
+
+    assert events.participation_at(day - timedelta(days=1)) == set()
+    assert events.participation_at(day + timedelta(days=2)) == {
+        (1, card.id),
+        (2, card.id),
+        (1, strike.id),
+    }
+    curriculum = Worker.get_by_id(1).organizing_dept_id
+    assert events.participation_at(day + timedelta(days=4), curriculum) == {
+        (1, strike.id)
+    }
+    assert events.participation_at(datetime.now()) == {
+        (2, card.id),
+        (1, strike.id),
+        (4, card.id),
+        (5, card.id),
+    }
+
+
+def test_requests_never_compact(client, structure_tests, monkeypatch):
+    monkeypatch.setattr(events, "CHECKPOINT_EVENTS", 1)
+    card, _ = structure_tests
+    admin_login(client)
+    assert client.get(f"/participation/1/{card.id}/1").status_code == 200
+    assert ParticipationCheckpoint.select().count() == 0
+    assert events.participation_at(datetime.now()) == {(1, card.id)}
+
+
+def test_checkpoints_pruned(client, structure_tests, monkeypatch):
+    monkeypatch.setattr(events, "CHECKPOINT_KEEP", 2)
+    card, _ = structure_tests
+    day = datetime(2024, 1, 1)
+    for offset in range(4):
+        log((offset + 1, card.id, True, day + timedelta(days=offset)))
+        events.compact()
+    assert [
+        checkpoint.event_id
+        for checkpoint in ParticipationCheckpoint.select().order_by(
+            ParticipationCheckpoint.event_id
+        )
+    ] == [3, 4]
+    # before the oldest checkpoint kept the log is replayed from its start
+    assert events.participation_at(day + timedelta(days=1)) == {
+        (1, card.id),
+        (2, card.id),
+    }
+
+
+def test_scheduler_started(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(events, "start_scheduler", started.append)
+    app.config["CHECKPOINT_INTERVAL"] = 600
+    wallchart.start_schedulers(app)
+    assert started == [app]
+    app.extensions["scheduler_lock"].close()
+
+
+def test_checkpoint_bounds_replay(client, structure_tests, monkeypatch):
+    card, _ = structure_tests
+    day = datetime(2024, 1, 1)
+    log((1, card.id, True, day), (1, card.id, False, day + timedelta(days=2)))
+    events.compact()
+    # a clock running behind, later events are still not replayed
+    log((1, card.id, True, day))
+
+    replayed = []
+    monkeypatch.setattr(
+        events, "replay", lambda participation, *event: replayed.append(event)
+    )
+    events.participation_at(day + timedelta(days=1))
+    assert replayed == [((1, card.id), True)]
+
+
+def test_seed(client, structure_tests):
+    card, strike = structure_tests
+    Participation.create(worker=1, structure_test=card, added=date(2024, 1, 1))
+    Participation.create(worker=2, structure_test=strike, added=date(2024, 2, 1))
+
+    events.seed()
+    assert ParticipationCheckpoint.select().count() == 1
+    assert events.participation_at(datetime(2024, 1, 15)) == {(1, card.id)}
+    assert events.participation_at(datetime(2024, 2, 1)) == {
+        (1, card.id),
+        (2, strike.id),
+    }
+
+
+def test_department_as_of(client, structure_tests):
+    card, _ = structure_tests
+    Worker.update(added=date(2023, 1, 1)).execute()
+    dolly = Worker.get(Worker.name == "Parton,Dolly")
+    station = Worker.get(Worker.name == "Station,International Space")
+    log(
+        (dolly.id, card.id, True, datetime(2024, 1, 1, 12)),
+        (station.id, card.id, True, datetime(2024, 1, 1, 12)),
+    )
+    # left with the roster of June
+    Worker.update(active=False, updated=date(2024, 6, 1)).where(
+        Worker.id == station.id
+    ).execute()
+    # joined after the day looked at
+    Worker.create(
+        name="Later,Lee",
+        organizing_dept_id=dolly.organizing_dept_id,
+        added=date(2024, 2, 1),
+    )
+    db.close()
+    admin_login(client)
+
+    rv = client.get("/department/curriculum-studies?as_of=2024-01-01")
+    assert b"(2) as of 2024-01-01" in rv.data
+    assert b"Later,Lee" not in rv.data
+    assert rv.data.count(b"checked") == 2
+    rv = client.get("/department/curriculum-studies?as_of=2023-12-31")
+    assert rv.data.count(b"checked") == 0
+    rv = client.get("/department/curriculum-studies?as_of=2024-07-01")
+    assert b"(2) as of 2024-07-01" in rv.data
+    assert b"Station,International Space" not in rv.data
+    assert client.get("/department/curriculum-studies?as_of=x").status_code == 400
+
+    rv = client.get("/api/participation/as_of/2024-01-01?department=curriculum-studies")
+    assert rv.json == sorted([[dolly.id, card.id], [station.id, card.id]])
+    rv = client.get("/api/participation/as_of/2024-07-01?department=curriculum-studies")
+    assert rv.json == [[dolly.id, card.id]]
+    rv = client.get("/api/participation/as_of/2024-01-01?department=unknown")
+    assert rv.status_code == 404
+    assert client.get("/api/participation/as_of/x").status_code == 400
+    assert client.get("/api/participation/as_of/2023-12-31").json == []
+
+
+def test_checkpoint_command(app):
+    runner = app.test_cli_runner()
+    rv = runner.invoke(args=["wallchart", "checkpoint"])
+    assert "No events since the latest checkpoint" in rv.output
+
+    with app.app_context():
+        log((1, 1, True, datetime.now()))
+        db.close()
+    rv = runner.invoke(args=["wallchart", "checkpoint"])
+    assert rv.exit_code == 0, rv.output
+    assert "Checkpoint after event 1 stored in" in rv.output
@@ -0,0 +1,95 @@
+import csv
+import io
+
+import pytest
+
+from tests.conftest import admin_login
+from wallchart import db, export
+from wallchart.db import Participation, StructureTest, Worker
+
+
+@pytest.fixture
+def participation(client):
+    structure_test = StructureTest.create(name="Card", description="")
+    StructureTest.create(name="Strike", description="")
+    Participation.create(
+        worker=Worker.get(Worker.name == "Parton,Dolly"), structure_test=structure_test
+    )
+    Worker.update(active=False).where(Worker.name == "Watson,Emma").execute()
+    db.close()
+
+
+def read_csv(data):
+    return list(csv.DictReader(io.StringIO(data.decode())))
+
+
+def test_export_csv(client, participation):
+    admin_login(client)
+    rv = client.get("/export/csv")
+    assert rv.status_code == 200
+    assert rv.mimetype == "text/csv"
+    assert rv.headers["Content-Disposition"].startswith(
+        "attachment; filename=wallcharts-"
+    )
+
+    rows = read_csv(rv.data)
+    assert len(rows) == 9
+    assert "Watson,Emma" not in [row["Name"] for row in rows]
+    departments = [row["Department"] for row in rows]
+    assert departments == sorted(departments)
+
+    dolly = next(row for row in rows if row["Name"] == "Parton,Dolly")
+    assert dolly["Department"] == "Curriculum Studies"
+    assert (dolly["Card"], dolly["Strike"]) == ("x", "")
+
+
+def test_export_department(client, participation):
+    admin_login(client)
+    rv = client.get("/export/csv?department=curriculum-studies")
+    assert {row["Department"] for row in read_csv(rv.data)} == {"Curriculum Studies"}
+
+    assert client.get("/export/csv?department=unknown").status_code == 404
+    assert client.get("/export/pdf").status_code == 404
+
+
+def test_export_csv_chunks(client, participation, monkeypatch):
+    monkeypatch.setattr(export, "CSV_CHUNK_ROWS", 2)
+    structure_tests = list(StructureTest.select())
+    chunks = list(
+        export.csv_chunks(structure_tests, export.wallchart_rows(structure_tests))
+    )
+    assert len(chunks) == 5
+    assert len(read_csv("".join(chunks).encode())) == 9
+
+
+def test_sheet_name():
+    used = set()
+    assert export.sheet_name("Art/Art History", used) == "Art Art History"
+    long_name = "Department of Languages and Literatures"
+    assert export.sheet_name(long_name, used) == long_name[:31]
+    assert export.sheet_name(long_name.upper(), used) == long_name.upper()[:27] + " (2)"
+
+
+def test_export_xlsx(client, participation):
+    admin_login(client)
+    rv = client.get("/export/xlsx")
+    if export.xlsxwriter is None:
+        assert rv.status_code == 501
+        return
+    assert rv.status_code == 200
+    assert rv.data.startswith(b"PK")
+
+
+def test_export_xlsx_cleanup(client, participation, tmp_path, monkeypatch):
+    path = tmp_path / "export.xlsx"
+    monkeypatch.setattr(export, "xlsxwriter", object())
+    monkeypatch.setattr(
+        export, "temporary_xlsx", lambda *args: path.write_bytes(b"PK") and path
+    )
+    admin_login(client)
+    # never streamed, removed when the response is closed
+    rv = client.head("/export/xlsx")
+    assert rv.status_code == 200
+    assert path.exists()
+    rv.close()
+    assert not path.exists()
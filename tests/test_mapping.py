@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import wallchart
+from wallchart import db, mapping_path
+from wallchart.mapping import DepartmentMapping, load_mapping, normalize
+
+
+def test_normalize():
+    assert normalize("Dept  of Art and Art History") == "DEPT OF ART & ART HISTORY"
+    assert normalize("DEPARTMENT OF MUSIC") == "DEPT OF MUSIC"
+    assert normalize("FAMILY&CONSUMER SCI") == "FAMILY & CONSUMER SCI"
+    assert normalize("ANAT, BIOCHEM, PHYS") == "ANAT BIOCHEM PHYS"
+
+
+def test_resolve():
+    mapping = DepartmentMapping({"DEPARTMENT OF HISTORY": "HISTORY DEPT"})
+    assert mapping.resolve("Department of History") == "HISTORY DEPT"
+    assert mapping.resolve("history dept") == "HISTORY DEPT"
+    assert mapping.resolve("HISTORY", "DEPT OF HISTORY") == "HISTORY DEPT"
+    assert mapping.resolve("HISTORY", None) is None
+
+
+def test_load_mapping(tmp_path):
+    path = tmp_path / "mapping.yml"
+    with pytest.raises(FileNotFoundError):
+        load_mapping(path)
+
+    path.write_text("mapping:\n  PAMI: PACIFIC ASIAN MGMT\n")
+    mapping = load_mapping(path)
+    assert mapping.resolve("PAMI") == "PACIFIC ASIAN MGMT"
+    assert load_mapping(path) is mapping
+
+    path.write_text("mapping:\n  PAMI: PAMI\n")
+    os.utime(path, ns=(0, 0))
+    assert load_mapping(path).resolve("PAMI") == "PAMI"
+
+
+def test_mapping_path(tmp_path):
+    package_folder = Path(wallchart.__file__).parent.parent
+    assert mapping_path("mapping.yml", tmp_path, package_folder) == str(
+        package_folder / "mapping.yml"
+    )
+    (tmp_path / "mapping.yml").write_text("mapping:\n")
+    assert mapping_path("mapping.yml", tmp_path, package_folder) == str(
+        tmp_path / "mapping.yml"
+    )
+    assert mapping_path("/srv/mapping.yml", tmp_path) == "/srv/mapping.yml"
+    assert mapping_path("missing.yml", tmp_path, package_folder) == str(
+        tmp_path / "missing.yml"
+    )
+
+
+def test_config_in_other_folder(tmp_path):
+    config = tmp_path / "etc" / "config.py"
+    config.parent.mkdir()
+    config.write_text(
+        f"ADMIN_PASSWORD = 'admin'\n"
+        f"SECRET_KEY = 'test'\n"
+        f"DATABASE = {str(tmp_path / 'wallcharts.db')!r}\n"
+    )
+    # the mapping shipped next to the package, like /app in the Docker image
+    app = wallchart.create_app(str(config), str(tmp_path / "instance"))
+    assert app.config["MAPPING_FILE"] == str(
+        Path(wallchart.__file__).parent.parent / "mapping.yml"
+    )
+    db.close()
+
+    (config.parent / "mapping.yml").write_text("mapping:\n")
+    app = wallchart.create_app(str(config), str(tmp_path / "instance"))
+    assert app.config["MAPPING_FILE"] == str(config.parent / "mapping.yml")
+    db.close()
@@ -0,0 +1,65 @@
+from base64 import b64decode
+
+from tests.conftest import admin_login
+from wallchart import db
+from wallchart.db import Participation, StructureTest, Worker
+from wallchart.matrix import bitset
+
+
+def participated(matrix, structure_test_id):
+    bits = b64decode(matrix["structure_tests"][str(structure_test_id)])
+    return [
+        worker_id
+        for position, worker_id in enumerate(matrix["workers"])
+        if bits[position // 8] & (1 << position % 8)
+    ]
+
+
+def test_bitset():
+    assert bitset([], 0) == ""
+    assert b64decode(bitset([0, 3, 9], 10)) == bytes([0b1001, 0b10])
+
+
+def test_matrix(client):
+    card = StructureTest.create(name="Card", description="")
+    strike = StructureTest.create(name="Strike", description="")
+    for worker_id in (1, 4, 9):
+        Participation.create(worker=worker_id, structure_test=card)
+    Participation.create(worker=2, structure_test=card)
+    Worker.update(active=False).where(Worker.id == 2).execute()
+    db.close()
+
+    admin_login(client)
+    rv = client.get("/api/participation/matrix")
+    assert rv.status_code == 200
+    assert rv.json["workers"] == [1, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert participated(rv.json, card.id) == [1, 4, 9]
+    assert participated(rv.json, strike.id) == []
+
+    rv = client.get("/api/participation/matrix/curriculum-studies")
+    assert rv.json["workers"] == [1, 4]
+    assert participated(rv.json, card.id) == [1, 4]
+
+
+def test_matrix_orphaned_participation(client):
+    card = StructureTest.create(name="Card", description="")
+    Participation.create(worker=1, structure_test=card)
+    Participation.create(worker=1, structure_test=card.id + 1)
+    db.close()
+
+    admin_login(client)
+    rv = client.get("/api/participation/matrix")
+    assert rv.status_code == 200
+    assert list(rv.json["structure_tests"]) == [str(card.id)]
+    assert participated(rv.json, card.id) == [1]
+
+
+def test_matrix_unknown_department(client):
+    admin_login(client)
+    rv = client.get("/api/participation/matrix/nowhere")
+    assert rv.status_code == 404
+
+
+def test_matrix_nologin(client):
+    rv = client.get("/api/participation/matrix")
+    assert rv.status_code == 302
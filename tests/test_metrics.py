@@ -0,0 +1,54 @@
+import re
+
+from tests.conftest import admin_login, login
+from wallchart import db_wrapper
+from wallchart.metrics import InstrumentedDatabase, Metrics
+
+SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+')
+
+
+def test_engine_instrumented(app):
+    assert isinstance(db_wrapper.database.obj, InstrumentedDatabase)
+
+
+def test_server_timing(client):
+    admin_login(client)
+    rv = client.get("/department/curriculum-studies")
+    queries = int(SERVER_TIMING.fullmatch(rv.headers["Server-Timing"])[1])
+    assert queries > 0
+
+
+def test_metrics(client):
+    admin_login(client)
+    client.get("/department/curriculum-studies")
+    client.get("/department/curriculum-studies")
+
+    rv = client.get("/metrics")
+    assert rv.status_code == 200
+    assert rv.mimetype == "text/plain"
+    text = rv.data.decode()
+    assert (
+        'wallchart_requests_total{endpoint="department",method="GET",status="200"} 2'
+        in text
+    )
+    assert 'wallchart_request_duration_seconds_count{endpoint="department"} 2' in text
+    assert re.search(r'wallchart_queries_total\{endpoint="department"\} [1-9]', text)
+    assert 'wallchart_query_seconds_total{endpoint="department"}' in text
+
+
+def test_metrics_admin_only(client):
+    assert client.get("/metrics").status_code == 302
+    login(client, "test@test.com", "test")
+    assert client.get("/metrics").status_code == 403
+
+
+def test_histogram():
+    metrics = Metrics()
+    metrics.observe("homepage", "GET", 200, 0.02, 3, 0.001)
+    metrics.observe("homepage", "GET", 200, 20, 3, 0.001)
+    text = metrics.render()
+    assert 'le="0.01"} 0' in text
+    assert 'le="0.025"} 1' in text
+    assert 'le="10"} 1' in text
+    assert 'le="+Inf"} 2' in text
+    assert 'wallchart_queries_total{endpoint="homepage"} 6' in text
@@ -0,0 +1,140 @@
+import importlib
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+from peewee import SqliteDatabase
+
+import wallchart
+from tests.conftest import admin_login
+from wallchart import db, events, migrations
+from wallchart.db import Department, Worker
+from wallchart.util import last_updated
+
+# schema of databases created before the columns of the former migrate.py
+LEGACY_SCHEMA = """
+CREATE TABLE unit (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL UNIQUE,
+    slug VARCHAR(255) NOT NULL);
+CREATE TABLE department (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL UNIQUE,
+    slug VARCHAR(255) NOT NULL, unit_id INTEGER);
+CREATE TABLE worker (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL,
+    preferred_name VARCHAR(255), pronouns VARCHAR(255), email VARCHAR(255) UNIQUE,
+    phone INTEGER UNIQUE, notes TEXT, contract VARCHAR(255) NOT NULL,
+    unit VARCHAR(255) NOT NULL, department_id INTEGER NOT NULL,
+    organizing_dept_id INTEGER NOT NULL, active INTEGER NOT NULL,
+    added DATE NOT NULL, updated DATE NOT NULL);
+CREATE TABLE structuretest (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL UNIQUE,
+    description TEXT NOT NULL, active INTEGER NOT NULL, added DATE NOT NULL);
+CREATE TABLE participation (id INTEGER PRIMARY KEY, worker_id INTEGER NOT NULL,
+    structure_test_id INTEGER NOT NULL);
+INSERT INTO unit VALUES (1, 'Unit', 'unit');
+INSERT INTO department VALUES (1, 'Music', 'music', 1);
+INSERT INTO worker VALUES
+    (1, 'Doe,Jane', NULL, NULL, NULL, 8085551234, NULL, 'GA11', '1', 1, 1, 1,
+     '2022-01-01', '2022-01-01'),
+    (2, 'Roe,Rick', NULL, NULL, NULL, '808.555.4321', NULL, 'GA11', '1', 1, 1, 1,
+     '2022-01-01', '2022-01-01'),
+    (3, 'Poe,Pat', NULL, NULL, NULL, 'call me', NULL, 'GA11', '1', 1, 1, 1,
+     '2022-01-01', '2022-01-01');
+INSERT INTO structuretest VALUES (1, 'Card', '', 1, '2022-01-01');
+INSERT INTO participation VALUES (1, 2, 1);
+"""
+
+
+@pytest.fixture
+def legacy_app(tmp_path):
+    path = tmp_path / "legacy.db"
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.close()
+
+    app = wallchart.create_app(
+        {
+            "ADMIN_PASSWORD": "admin",
+            "BACKUP_FOLDER": tmp_path / "backups",
+            "DATABASE": str(path),
+            "SECRET_KEY": "test",
+            "TESTING": True,
+            "UPLOAD_FOLDER": tmp_path,
+        },
+        instance_path=str(tmp_path / "instance"),
+    )
+    yield app
+    db.close()
+
+
+def test_fresh_database_stamped(app):
+    with app.app_context():
+        assert migrations.pending() == []
+        assert migrations.applied() == {
+            version for version, _, _ in migrations.migrations()
+        }
+        db.close()
+
+
+def test_legacy_database(legacy_app):
+    with legacy_app.app_context():
+        assert migrations.pending() == []
+        assert [
+            phone
+            for (phone,) in Worker.select(Worker.phone).order_by(Worker.id).tuples()
+        ] == ["(808) 555-1234", "(808) 555-4321", "call me"]
+
+        # dated by the workers of the last import before the import history
+        assert last_updated() == date(2022, 1, 1)
+
+        # participation before the event log, as of the day it was added
+        assert events.participation_at(datetime.now()) == {(2, 1)}
+        assert events.participation_at(datetime(2022, 1, 1)) == set()
+
+        # formerly NOT NULL
+        Worker.create(name="Manual,Worker", password="x")
+        assert Department.get_by_id(1).alias is None
+        db.close()
+
+    with legacy_app.test_client() as client, legacy_app.app_context():
+        admin_login(client)
+        assert client.get("/department/music").status_code == 200
+        rv = client.get("/api/search?q=555-4321")
+        assert [worker["name"] for worker in rv.json] == ["Roe,Rick"]
+
+
+def test_in_batches(app):
+    with app.app_context():
+        ranges = []
+        assert migrations.in_batches(Worker, lambda *ids: ranges.append(ids), 4) == 3
+        assert ranges == [(1, 4), (5, 8), (9, 12)]
+        db.close()
+
+
+def test_import_job_owner(tmp_path):
+    database = SqliteDatabase(str(tmp_path / "jobs.db"))
+    module = importlib.import_module("wallchart.migrations.v003_import_job_owner")
+    # databases without import jobs yet get the table from create_tables
+    module.up(database)
+    database.execute_sql("CREATE TABLE importjob (id INTEGER PRIMARY KEY)")
+    module.up(database)
+    module.up(database)
+    assert [column.name for column in database.get_columns("importjob")] == [
+        "id",
+        "owner",
+    ]
+    database.close()
+
+
+def test_drop_password_index(tmp_path):
+    database = SqliteDatabase(str(tmp_path / "workers.db"))
+    database.execute_sql("CREATE TABLE worker (id INTEGER PRIMARY KEY, password TEXT)")
+    database.execute_sql('CREATE INDEX "worker_password" ON "worker" ("password")')
+    module = importlib.import_module("wallchart.migrations.v004_drop_password_index")
+    module.up(database)
+    module.up(database)
+    assert database.get_indexes("worker") == []
+    database.close()
+
+
+def test_migrations_command(app):
+    rv = app.test_cli_runner().invoke(args=["db", "migrations"])
+    assert "001 legacy_columns: applied" in rv.output
+    rv = app.test_cli_runner().invoke(args=["db", "migrate"])
+    assert "Database schema is up to date" in rv.output
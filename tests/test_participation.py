@@ -0,0 +1,138 @@
+import pytest
+
+from tests.conftest import admin_login, login, record_queries
+from wallchart import aggregates, db
+from wallchart.db import Participation, StructureTest, Worker
+from wallchart.participation import coalesce
+
+
+@pytest.fixture
+def structure_tests(client):
+    tests = [
+        StructureTest.create(name="Card", description=""),
+        StructureTest.create(name="Strike", description=""),
+    ]
+    db.close()
+    return [structure_test.id for structure_test in tests]
+
+
+def participated():
+    return set(
+        Participation.select(Participation.worker, Participation.structure_test)
+        .tuples()
+        .iterator()
+    )
+
+
+def change(worker, structure_test, status):
+    return dict(worker=worker, structure_test=structure_test, status=status)
+
+
+def test_coalesce():
+    assert coalesce(
+        [change(1, 2, 1), change("1", "2", "0"), change(3, 2, 1), change(1, 2, 1)]
+    ) == {(1, 2): True, (3, 2): True}
+
+
+def test_bulk(client, structure_tests):
+    card, strike = structure_tests
+    admin_login(client)
+
+    rv = client.post(
+        "/participation",
+        json={
+            "changes": [
+                change(1, card, 1),
+                change(4, card, 1),
+                change(4, strike, 1),
+                change(4, strike, 0),
+            ]
+        },
+    )
+    assert rv.json == {"added": 2, "removed": 0}
+    assert participated() == {(1, card), (4, card)}
+
+    rv = client.post(
+        "/participation",
+        json={
+            "changes": [change(1, card, 1), change(4, card, 0), change(9, strike, 1)]
+        },
+    )
+    assert rv.json == {"added": 1, "removed": 1}
+    assert participated() == {(1, card), (9, strike)}
+    assert aggregates.check() == []
+
+
+def test_bulk_repeated(client, structure_tests):
+    card = structure_tests[0]
+    admin_login(client)
+    for _ in range(3):
+        rv = client.post("/participation", json={"changes": [change(1, card, 1)]})
+        assert rv.status_code == 200
+        assert client.get(f"/participation/1/{card}/1").status_code == 200
+    assert participated() == {(1, card)}
+    assert aggregates.check() == []
+
+
+def test_bulk_large(client, structure_tests):
+    # more bound parameters than older SQLite builds allow in one statement
+    structure_tests = structure_tests + [
+        StructureTest.create(name=f"Test {number}", description="").id
+        for number in range(58)
+    ]
+    worker_ids = [worker.id for worker in Worker.select(Worker.id)]
+    db.close()
+    admin_login(client)
+
+    for status in (1, 0):
+        changes = [
+            change(worker_id, structure_test, status)
+            for worker_id in worker_ids
+            for structure_test in structure_tests
+        ]
+        assert len(changes) > 500
+        with record_queries() as queries:
+            rv = client.post("/participation", json={"changes": changes})
+        assert rv.status_code == 200
+        assert max(len(params or ()) for _, params in queries) <= 999
+        assert participated() == (
+            {(change["worker"], change["structure_test"]) for change in changes}
+            if status
+            else set()
+        )
+    assert rv.json == {"added": 0, "removed": len(changes)}
+    assert aggregates.check() == []
+
+
+def test_bulk_other_department(client, structure_tests):
+    card = structure_tests[0]
+    login(client, "test@test.com", "test")
+
+    # worker 4 shares the department of the user, worker 2 does not
+    rv = client.post(
+        "/participation", json={"changes": [change(4, card, 1), change(2, card, 1)]}
+    )
+    assert rv.status_code == 400
+    assert participated() == set()
+
+    rv = client.post("/participation", json={"changes": [change(4, card, 1)]})
+    assert rv.status_code == 200
+    assert participated() == {(4, card)}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        None,
+        {},
+        {"changes": [{"worker": 1}]},
+        {"changes": [change("x", 1, 1)]},
+        {"changes": [change(100, 1, 1)]},
+        {"changes": [change(1, 100, 1)]},
+    ],
+)
+def test_bulk_invalid(client, structure_tests, body):
+    admin_login(client)
+    rv = client.post("/participation", json=body)
+    assert rv.status_code == 400
+    assert participated() == set()
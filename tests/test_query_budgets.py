@@ -0,0 +1,84 @@
+import pytest
+
+from tests.conftest import admin_login, record_queries
+from wallchart import aggregates, db
+from wallchart.cache import bump_version
+from wallchart.db import Department, Participation, StructureTest, Unit, Worker
+from wallchart.reference import reference_data
+
+# most SQL statements a cold (uncached) request may run, raise a budget only
+# together with the change adding the statement
+QUERY_BUDGETS = {
+    "/admin": 5,
+    "/departments/": 4,
+    "/units/": 6,
+    "/manage-units/": 2,
+    "/department/curriculum-studies": 5,
+    "/department/curriculum-studies?as_of=2024-01-01": 9,
+    "/worker/1": 3,
+    "/worker/": 2,
+    "/api/workers": 2,
+    "/api/workers?since=1": 3,
+    "/api/worker/1": 1,
+    "/api/search?q=dolly": 1,
+    "/api/departments": 2,
+    "/api/units": 2,
+    "/api/participation": 2,
+    "/api/participation/matrix": 4,
+    "/api/participation/matrix/curriculum-studies": 5,
+    "/api/participation/as_of/2024-01-01": 3,
+    "/export/csv": 2,
+    "/export/csv?department=curriculum-studies": 3,
+    "/trends/": 4,
+    "/trends/?department=curriculum-studies": 4,
+    "/api/trends": 3,
+}
+
+
+def organize(size):
+    """Add ``size`` units and departments, each with a member chairing both."""
+    structure_test = StructureTest.get_or_create(name="Card", description="")[0]
+    first = Unit.select().count()
+    for number in range(first, first + size):
+        unit = Unit.create(name=f"Unit {number}", slug=f"unit-{number}")
+        department = Department.create(
+            name=f"Department {number}", slug=f"department-{number}", unit=unit
+        )
+        worker = Worker.create(
+            name=f"Chair,Number {number}",
+            contract="GA11",
+            department_id=department.id,
+            organizing_dept_id=department.id,
+            dept_chair_id=department.id,
+            unit_chair_id=unit.id,
+        )
+        Participation.create(worker=worker, structure_test=structure_test)
+    aggregates.rebuild()
+    bump_version()
+    db.close()
+
+
+def query_count(client, url):
+    # reference data is loaded once per process, not per request
+    reference_data()
+    with record_queries() as queries:
+        rv = client.get(url)
+    assert rv.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.parametrize("url", QUERY_BUDGETS)
+def test_query_budget(client, url):
+    organize(3)
+    admin_login(client)
+    assert query_count(client, url) <= QUERY_BUDGETS[url]
+
+
+@pytest.mark.parametrize("url", ["/departments/", "/units/", "/manage-units/"])
+def test_query_count_independent_of_size(app, url):
+    with app.test_client() as client, app.app_context():
+        admin_login(client)
+        organize(2)
+        small = query_count(client, url)
+        organize(4)
+        assert query_count(client, url) == small
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+from tests.conftest import admin_login, login, record_queries
+from wallchart import db, db_wrapper
+from wallchart.db import Participation, StructureTest, Worker
+
+FULL_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\w+)")
+TABLE_ALIAS = re.compile(r'"(\w+)" AS "(\w+)"')
+SCANNED_TABLES = {"worker", "participation"}
+
+# /users/ is left out, it walks all workers by name to list the few who can
+# log in, which is fine for a page only admins open now and then
+ADMIN_PAGES = [
+    "/admin",
+    "/departments/",
+    "/units/",
+    "/department/curriculum-studies",
+    "/structure_tests",
+    "/worker/1",
+    "/former/",
+    "/upload_record",
+    "/api/worker/1",
+    "/api/search?q=dolly",
+    "/api/workers?since=1",
+    "/api/participation?since=1",
+    "/api/participation/matrix/curriculum-studies",
+]
+
+
+@pytest.fixture
+def participation(client):
+    structure_test = StructureTest.create(name="Card", description="")
+    StructureTest.create(name="Strike", description="")
+    for worker in Worker.select().limit(5):
+        Participation.create(worker=worker, structure_test=structure_test)
+    Worker.update(active=False).where(Worker.name == "Watson,Emma").execute()
+    db.close()
+
+
+def full_scans(queries):
+    scans = []
+    for sql, params in queries:
+        if not sql.startswith("SELECT"):
+            continue
+        tables = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+        plan = db_wrapper.database.execute_sql(f"EXPLAIN QUERY PLAN {sql}", params)
+        for row in plan:
+            scan = FULL_SCAN.search(row[-1])
+            if scan and tables.get(scan[1], scan[1]) in SCANNED_TABLES:
+                scans.append((sql, row[-1]))
+    return scans
+
+
+@pytest.mark.parametrize("url", ADMIN_PAGES)
+def test_query_plan(client, participation, url):
+    admin_login(client)
+    with record_queries() as queries:
+        rv = client.get(url)
+    assert rv.status_code == 200
+    assert queries
+    assert full_scans(queries) == []
+
+
+def test_query_plan_login(client):
+    with record_queries() as queries:
+        login(client, "test@test.com", "test")
+    assert full_scans(queries) == []
@@ -0,0 +1,55 @@
+import wallchart
+from wallchart import db
+from wallchart.db import Department, StructureTest, Unit
+from wallchart.reference import reference_data, reference_version
+
+
+def test_reference_data(client):
+    reference = reference_data()
+    names = [department.name for department in reference.departments]
+    assert names == sorted(names)
+    department = Department.get(Department.slug == "curriculum-studies")
+    assert reference.department_by_id[department.id].name == department.name
+    assert reference.latest_structure_test is None
+
+    # unchanged data is not loaded again
+    assert reference_data() is reference
+    db.close()
+
+
+def test_writes_reload(client):
+    reference = reference_data()
+    version = reference_version()
+
+    StructureTest.create(name="Card", description="")
+    structure_test = StructureTest.create(name="Strike", description="")
+    assert reference_version() == version + 2
+    assert reference_data().latest_structure_test.id == structure_test.id
+
+    unit = Unit.create(name="Unit", slug="unit")
+    assert reference_data().unit_by_id[unit.id].name == "Unit"
+
+    Department.update(alias="CS").where(
+        Department.slug == "curriculum-studies"
+    ).execute()
+    assert "CS" in [department.alias for department in reference_data().departments]
+    assert reference_data() is not reference
+    db.close()
+
+
+def test_other_process_writes(app):
+    # a second app on the same database stands in for another worker process
+    other = wallchart.create_app(
+        {**app.config, "DATABASE": app.config["DATABASE"]["name"]}, app.instance_path
+    )
+    with app.app_context():
+        assert "Unit" not in [unit.name for unit in reference_data().units]
+        db.close()
+
+    with other.app_context():
+        Unit.create(name="Unit", slug="unit")
+        db.close()
+
+    with app.app_context():
+        assert "Unit" in [unit.name for unit in reference_data().units]
+        db.close()
@@ -0,0 +1,156 @@
+import csv
+from datetime import date, timedelta
+
+from wallchart.db import Department, ImportHistory, Unit, Worker
+from wallchart.mapping import load_mapping
+from wallchart.roster import ImportStats, diff_roster, import_roster
+from wallchart.util import last_updated
+
+
+def read_roster():
+    with open("tests/test_roster.csv") as roster_file:
+        return list(csv.DictReader(roster_file))
+
+
+def test_import_roster_reimport(client):
+    stats = import_roster(read_roster())
+    assert stats.rows == 10
+    assert stats.created == 0
+    assert stats.updated == 10
+    assert stats.deactivated == 0
+    assert Worker.select().count() == 10
+    assert Unit.select().count() == 9
+    assert Department.select().count() == 10
+
+
+def test_import_roster_fields(client):
+    worker = Worker.get(Worker.name == "Station,International Space")
+    department = Department.get(Department.id == worker.department_id)
+    unit = Unit.get(Unit.name == "Curriculum Studies")
+    assert department.name == "Curriculum Studies"
+    assert department.slug == "curriculum-studies"
+    assert department.unit == unit
+    assert worker.organizing_dept_id == department.id
+    assert worker.unit == str(unit.id)
+    assert worker.active
+
+
+def test_import_roster_deactivates_missing(client):
+    # pretend the fixture roster was imported yesterday
+    yesterday = date.today() - timedelta(days=1)
+    Worker.update(updated=yesterday, organizing_dept_id=0).execute()
+    rows = [row for row in read_roster() if row["Last Name"] != "Watson"]
+
+    stats = import_roster(rows, chunk_size=3)
+    assert stats.created == 0
+    assert stats.updated == 9
+    assert stats.deactivated == 1
+    assert not Worker.get(Worker.name == "Watson,Emma").active
+    assert Worker.select().where(Worker.organizing_dept_id == 0).count() == 1
+
+
+def test_import_roster_duplicate_rows(client):
+    Worker.delete().execute()
+    rows = read_roster()
+    moved = dict(rows[0], **{"Sect Desc": "PAMI"})
+
+    stats = import_roster(rows + [moved])
+    assert stats.rows == 11
+    assert stats.created == 10
+    worker = Worker.get(Worker.name == "Station,International Space")
+    assert Department.get_by_id(worker.department_id).name == "Pami"
+
+
+def test_diff_roster_unchanged(client):
+    yesterday = date.today() - timedelta(days=1)
+    Worker.update(updated=yesterday).execute()
+
+    diff = diff_roster(read_roster())
+    assert not diff
+    assert diff.unchanged == 10
+    assert Worker.select().where(Worker.updated == yesterday).count() == 10
+
+
+def test_diff_roster_changes(client):
+    yesterday = date.today() - timedelta(days=1)
+    Worker.update(updated=yesterday).execute()
+    Worker.update(active=False).where(Worker.name == "Parton,Dolly").execute()
+    # admin assigned organizing department is kept for unmoved workers
+    Worker.update(organizing_dept_id=0).where(
+        Worker.name == "Dali,Salvador R"
+    ).execute()
+
+    rows = [row for row in read_roster() if row["Last Name"] != "Watson"]
+    rows[0]["Sect Desc"] = "PAMI"
+    rows.append(
+        {"Last Name": "New", "First Name": "Worker", "Unit (in UnionWare)": "PAMI"}
+    )
+
+    diff = diff_roster(rows)
+    assert diff.added == ["New,Worker"]
+    assert diff.moved == ["Station,International Space"]
+    assert diff.reactivated == ["Parton,Dolly"]
+    assert diff.deactivated == ["Watson,Emma"]
+    assert diff.unchanged == 7
+
+    pami = Department.get(Department.name == "Pami")
+    station = Worker.get(Worker.name == "Station,International Space")
+    assert station.department_id == pami.id
+    assert station.organizing_dept_id == pami.id
+    assert station.updated == date.today()
+    assert Worker.get(Worker.name == "Parton,Dolly").active
+    assert not Worker.get(Worker.name == "Watson,Emma").active
+    assert Worker.get(Worker.name == "Dali,Salvador R").organizing_dept_id == 0
+    assert Worker.select().where(Worker.updated == yesterday).count() == 8
+
+
+def test_diff_roster_dry_run(client):
+    rows = [row for row in read_roster() if row["Last Name"] != "Watson"]
+
+    diff = diff_roster(rows, dry_run=True)
+    assert diff.deactivated == ["Watson,Emma"]
+    assert Worker.get(Worker.name == "Watson,Emma").active
+
+
+def test_import_roster_mapping(client):
+    rows = read_roster()
+    for row in rows[:2]:
+        row["Sect Desc"] = row["Dept Desc"] = "NEW SECTION"
+    rows[2]["Sect Desc"] = "DEPARTMENT OF HISTORY"
+
+    stats = import_roster(rows, mapping=load_mapping("mapping.yml"))
+    assert stats.unmapped == {"NEW SECTION": 2}
+    worker = Worker.get(Worker.name == "Manilow,Barry")
+    assert Department.get_by_id(worker.department_id).name == "History Dept"
+    worker = Worker.get(Worker.name == "Dali,Salvador R")
+    assert Department.get_by_id(worker.department_id).name == "Anthropology Dept"
+
+
+def test_import_roster_no_sections(client):
+    rows = [{"Last Name": "New", "First Name": "Worker", "Unit (in UnionWare)": "PAMI"}]
+    stats = import_roster(rows)
+    worker = Worker.get(Worker.name == "New,Worker")
+    assert Department.get_by_id(worker.department_id).name == "Unknown (Pami)"
+    assert stats.unmapped == {}
+
+
+def test_import_history(client):
+    yesterday = date.today() - timedelta(days=1)
+    ImportHistory.update(roster_date=yesterday).execute()
+    assert last_updated() == yesterday
+
+    import_roster(read_roster(), filename="roster.csv")
+    latest = ImportHistory.select().order_by(ImportHistory.id.desc()).get()
+    assert (latest.filename, latest.mode, latest.rows) == ("roster.csv", "full", 10)
+    assert latest.roster_date == date.today()
+    assert last_updated() == date.today()
+
+    ImportHistory.update(roster_date=yesterday).execute()
+    diff_roster(read_roster())
+    latest = ImportHistory.select().order_by(ImportHistory.id.desc()).get()
+    assert (latest.mode, latest.roster_date) == ("diff", None)
+    # no worker was stamped with today's date
+    assert last_updated() == yesterday
+
+    diff_roster(read_roster(), dry_run=True)
+    assert ImportHistory.select().count() == 3
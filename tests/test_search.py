@@ -0,0 +1,75 @@
+from tests.conftest import admin_login
+from wallchart import db
+from wallchart.db import Worker
+from wallchart.search import match_query, rebuild_index, search_workers
+
+
+def names(results):
+    return [worker["name"] for worker in results]
+
+
+def test_match_query():
+    assert match_query("dol par") == '"dol"* "par"*'
+    assert match_query("(808) 555-1234") == '"808"* "5551234"*'
+    assert match_query('bob" OR "x') == '"bob"* "OR"* "x"*'
+    assert match_query(" - ") == ""
+
+
+def test_search_name_prefix(app_with_data):
+    with app_with_data.app_context():
+        assert names(search_workers("dol")) == ["Parton,Dolly"]
+        assert names(search_workers("parton dolly")) == ["Parton,Dolly"]
+        assert search_workers("parton emma") == []
+        assert search_workers("") == []
+
+
+def test_search_department(app_with_data):
+    with app_with_data.app_context():
+        (worker,) = search_workers("Station")
+    assert worker["department_slug"] == "curriculum-studies"
+    assert worker["department_name"] == "Curriculum Studies"
+    assert "password" not in worker
+
+
+def test_search_follows_writes(app_with_data):
+    with app_with_data.app_context():
+        Worker.update(
+            preferred_name="Manny", email="barry@example.com", phone="(808) 555-1234"
+        ).where(Worker.name == "Manilow,Barry").execute()
+        assert names(search_workers("manny")) == ["Manilow,Barry"]
+        assert names(search_workers("barry@example")) == ["Manilow,Barry"]
+        assert names(search_workers("808-555-1234")) == ["Manilow,Barry"]
+        assert names(search_workers("555-1234")) == ["Manilow,Barry"]
+        assert names(search_workers("1234")) == ["Manilow,Barry"]
+
+        Worker.delete().where(Worker.name == "Manilow,Barry").execute()
+        assert search_workers("manny") == []
+
+        Worker.create(name="Manny,Ramirez")
+        assert names(search_workers("manny")) == ["Manny,Ramirez"]
+
+
+def test_rebuild_index(app_with_data):
+    with app_with_data.app_context():
+        rebuild_index()
+        assert names(search_workers("emma")) == ["Watson,Emma"]
+
+
+def test_api_search_nologin(client):
+    rv = client.get("/api/search?q=emma")
+    assert rv.status_code == 302
+
+
+def test_api_search(client):
+    admin_login(client)
+    rv = client.get("/api/search?q=emma")
+    assert rv.status_code == 200
+    assert names(rv.json) == ["Watson,Emma"]
+
+
+def test_api_search_limit(client):
+    admin_login(client)
+    rv = client.get("/api/search?q=s&limit=2")
+    assert len(rv.json) == 2
+    rv = client.get("/api/search?q=s&limit=0")
+    assert len(rv.json) == 1
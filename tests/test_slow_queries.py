@@ -0,0 +1,70 @@
+import json
+
+from tests.conftest import admin_login, login
+from wallchart.slow_queries import SlowQueryLog, short, slow_query_log
+from wallchart.util import bcryptify
+
+
+def test_slow_queries(app, client):
+    app.config["SLOW_QUERY_THRESHOLD"] = 0
+    admin_login(client)
+    client.get("/department/curriculum-studies")
+
+    entries = slow_query_log().latest()
+    assert entries
+    assert entries == sorted(entries, key=lambda entry: -entry["duration"])
+
+    (department,) = [
+        entry
+        for entry in entries
+        if entry["source"] == "department" and 'FROM "department"' in entry["sql"]
+    ][:1]
+    assert department["params"] == ["curriculum-studies", 1, 0]
+    assert any("department" in step for step in department["plan"])
+
+    with open(app.config["SLOW_QUERY_LOG"]) as log:
+        logged = [json.loads(line) for line in log]
+    assert len(logged) >= len(entries)
+    assert department in logged
+
+
+def test_fast_queries_not_logged(client):
+    admin_login(client)
+    client.get("/department/curriculum-studies")
+    assert slow_query_log().latest() == []
+
+
+def test_ring_buffer(tmp_path):
+    log = SlowQueryLog(tmp_path / "slow.log", 2)
+    for duration in (3, 1, 2):
+        log.add(dict(duration=duration))
+    assert log.latest() == [dict(duration=2), dict(duration=1)]
+    assert len((tmp_path / "slow.log").read_text().splitlines()) == 3
+
+
+def test_log_rotated(tmp_path):
+    log = SlowQueryLog(tmp_path / "slow.log", 2)
+    log.add(dict(duration=1))
+    # moved away by logrotate, the next entry starts a new file
+    (tmp_path / "slow.log").rename(tmp_path / "slow.log.1")
+    log.add(dict(duration=2))
+    assert len((tmp_path / "slow.log.1").read_text().splitlines()) == 1
+    assert json.loads((tmp_path / "slow.log").read_text()) == dict(duration=2)
+
+
+def test_short():
+    assert short(1) == 1
+    assert short(None) is None
+    assert short("x" * 100) == "x" * 64 + "..."
+    assert short(bcryptify("test")) == "<redacted>"
+
+
+def test_api_slow_queries(app, client):
+    login(client, "test@test.com", "test")
+    assert client.get("/api/slow_queries").status_code == 403
+
+    app.config["SLOW_QUERY_THRESHOLD"] = 0
+    admin_login(client)
+    rv = client.get("/api/slow_queries")
+    assert rv.status_code == 200
+    assert rv.json
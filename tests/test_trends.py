@@ -0,0 +1,147 @@
+from datetime import date
+
+import pytest
+
+import wallchart
+from tests.conftest import admin_login
+from wallchart import aggregates, db, trends
+from wallchart.cache import data_version
+from wallchart.db import (
+    Department,
+    Participation,
+    ParticipationSnapshot,
+    StructureTest,
+    Unit,
+    Worker,
+    WorkerSnapshot,
+)
+from wallchart.reference import reference_data
+
+
+@pytest.fixture
+def history(client):
+    card = StructureTest.create(name="Card", description="")
+    dolly = Worker.get(Worker.name == "Parton,Dolly")
+    station = Worker.get(Worker.name == "Station,International Space")
+    Participation.create(worker=dolly, structure_test=card, added=date(2024, 1, 1))
+    Participation.create(worker=station, structure_test=card, added=date(2024, 1, 3))
+    aggregates.rebuild()
+    db.close()
+    return card, dolly.organizing_dept_id
+
+
+def test_first_snapshot_fills_history(history):
+    card, department_id = history
+    assert trends.take_snapshot(date(2024, 1, 5)) == 3
+
+    trend = trends.trend([department_id])
+    assert trend["days"] == ["2024-01-01", "2024-01-03", "2024-01-05"]
+    assert trend["workers"] == [2, 2, 2]
+    assert trend["structure_tests"] == {card.id: [1, 2, 2]}
+
+    assert trends.trend()["workers"] == [10, 10, 10]
+
+
+def test_snapshot_since_previous(history):
+    card, department_id = history
+    trends.take_snapshot(date(2024, 1, 5))
+
+    bob = Worker.get(Worker.name == "Josephonson,Bob K")
+    Participation.create(worker=bob, structure_test=card, added=date(2024, 1, 7))
+    aggregates.count_participation(bob.organizing_dept_id, card.id, 1)
+    # only the days after the previous snapshot are filled in
+    assert trends.take_snapshot(date(2024, 1, 10)) == 2
+    assert trends.trend()["structure_tests"] == {card.id: [1, 2, 2, 3, 3]}
+
+    Worker.update(active=False).where(Worker.id == bob.id).execute()
+    aggregates.move_worker(bob.id, (bob.organizing_dept_id, True), None)
+    # a second snapshot of the day replaces the first
+    assert trends.take_snapshot(date(2024, 1, 10)) == 1
+    trend = trends.trend()
+    assert trend["workers"][-1] == 9
+    assert trend["structure_tests"][card.id][-1] == 2
+    assert (
+        WorkerSnapshot.select().where(WorkerSnapshot.day == date(2024, 1, 10)).count()
+        == 8
+    )
+
+
+def test_snapshot_keeps_cache(history):
+    trends.take_snapshot(date(2024, 1, 5))
+    version = data_version()
+    # nothing changed since
+    trends.take_snapshot(date(2024, 1, 5))
+    assert data_version() == version
+
+    Worker.update(active=False).where(Worker.name == "Parton,Dolly").execute()
+    aggregates.rebuild()
+    trends.take_snapshot(date(2024, 1, 5))
+    assert data_version() == version + 1
+
+
+def test_scheduler_started_once(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(trends, "start_scheduler", started.append)
+    app.config["TRENDS_INTERVAL"] = 3600
+    wallchart.start_schedulers(app)
+    assert started == [app]
+    app.extensions["scheduler_lock"].close()
+
+
+def test_selection(client):
+    curriculum = Department.get(Department.slug == "curriculum-studies")
+    assert trends.selection(reference_data(), "curriculum-studies") == (
+        curriculum.name,
+        [curriculum.id],
+    )
+    unit = Unit.create(name="Education", slug="education")
+    Department.update(unit=unit).where(Department.id == curriculum.id).execute()
+    assert trends.selection(reference_data(), unit_slug="education") == (
+        "Education",
+        [curriculum.id],
+    )
+    assert trends.selection(
+        reference_data(),
+    ) == ("All departments", None)
+    assert trends.selection(reference_data(), "unknown") is None
+    assert trends.selection(reference_data(), unit_slug="unknown") is None
+
+
+def test_trends_api(client, history):
+    card, _ = history
+    trends.take_snapshot(date(2024, 1, 5))
+    db.close()
+    admin_login(client)
+
+    rv = client.get("/api/trends?department=curriculum-studies")
+    assert rv.json == {
+        "days": ["2024-01-01", "2024-01-03", "2024-01-05"],
+        "workers": [2, 2, 2],
+        "structure_tests": {str(card.id): [1, 2, 2]},
+    }
+    rv = client.get(f"/api/trends?structure_test={card.id + 1}")
+    assert rv.json["structure_tests"] == {str(card.id + 1): [0, 0, 0]}
+    assert client.get("/api/trends?unit=unknown").status_code == 404
+
+
+def test_trends_page(client, history):
+    admin_login(client)
+    assert b"No participation counts" in client.get("/trends/").data
+
+    trends.take_snapshot(date(2024, 1, 5))
+    db.close()
+    rv = client.get("/trends/?department=curriculum-studies")
+    assert rv.status_code == 200
+    assert b"Trends: Curriculum Studies" in rv.data
+    assert b"2024-01-03" in rv.data
+    assert client.get("/trends/?department=unknown").status_code == 404
+
+
+def test_snapshot_command(app):
+    rv = app.test_cli_runner().invoke(args=["wallchart", "snapshot-trends"])
+    assert rv.exit_code == 0, rv.output
+    assert "Stored 1 days of trends in" in rv.output
+    with app.app_context():
+        assert ParticipationSnapshot.select().count() == 0
+        assert WorkerSnapshot.select(WorkerSnapshot.day).scalar() == date.today()
+        db.close()
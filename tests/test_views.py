@@ -1,4 +1,6 @@
 from tests.conftest import admin_login, login, logout
+from wallchart import db
+from wallchart.db import Department, Unit, Worker
 
 
 def test_worker_delete(client):
@@ -14,7 +16,44 @@ def test_worker_delete_not_found(client):
     assert rv.status_code == 404
 
 
+def test_worker_not_found(client):
+    admin_login(client)
+    assert client.get("/worker/9999999").status_code == 404
+    rv = client.post(
+        "/worker/9999999", data=dict(organizing_dept="1", notes="", active="1")
+    )
+    assert rv.status_code == 404
+
+
 def test_worker_new(client):
     admin_login(client)
     rv = client.get("/worker/")
     assert rv.status_code == 200
+
+
+def test_admin_emails(client):
+    admin_login(client)
+    rv = client.get("/admin")
+    assert b"Active worker emails: test@test.com</p>" in rv.data
+
+
+def test_manage_units(client):
+    unit = Unit.create(name="Education", slug="education")
+    Department.update(unit=unit).where(
+        Department.slug == "curriculum-studies"
+    ).execute()
+    db.close()
+    admin_login(client)
+    rv = client.get("/manage-units/")
+    assert b"Education" in rv.data
+    assert b"<b>Curriculum Studies</b>" in rv.data
+
+
+def test_users(client):
+    # a password set to an empty string still counts
+    Worker.update(password="").where(Worker.name == "Parton,Dolly").execute()
+    db.close()
+    admin_login(client)
+    rv = client.get("/users/")
+    assert rv.status_code == 200
+    assert b"Parton,Dolly" in rv.data
@@ -1,4 +1,17 @@
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from peewee import JOIN, fn
+
+import wallchart
 from tests.conftest import admin_login, login, logout
+from wallchart import db, db_wrapper, jobs
+from wallchart.db import ImportJob, Participation, StructureTest, Worker
 
 
 def test_empty_db(client):
@@ -72,14 +85,22 @@ def test_upload_record(client):
         rv = client.post(
             "/upload_record",
             data=data,
-            follow_redirects=True,
             content_type="multipart/form-data",
         )
 
+        assert rv.status_code == 302
+        job_id = ImportJob.select(fn.MAX(ImportJob.id)).scalar()
+        assert rv.location.endswith(f"/upload_record?job_id={job_id}")
+        jobs.wait(job_id, timeout=10)
+
+        rv = client.get(rv.location)
         assert rv.status_code == 200
+        assert b"Import of roster.csv" in rv.data
+        assert b'data-status="done"' in rv.data
         assert b"New workers: 10" in rv.data
         assert b"Burrito,Frozen Bean" in rv.data
         assert b"Anthropology Dept" in rv.data
+        assert b"<td>roster.csv</td>" in rv.data
 
     rv = client.get("/worker/1")
 
@@ -94,6 +115,95 @@ def test_upload_record(client):
     rv = client.get("/upload_record")
     assert b"Found 10 new workers" in rv.data
 
+    rv = client.get(f"/api/import/{job_id}")
+    assert rv.json["status"] == "done"
+    assert rv.json["rows"] == 10
+    assert rv.json["created"] == 0
+    assert rv.json["updated"] == 10
+    assert rv.json["error"] is None
+
+
+def test_upload_record_failed(client):
+    admin_login(client)
+    data = {"record": (io.BytesIO(b"Name\nfoo\n"), "broken.csv")}
+    rv = client.post("/upload_record", data=data, content_type="multipart/form-data")
+    job_id = ImportJob.select(fn.MAX(ImportJob.id)).scalar()
+    jobs.wait(job_id, timeout=10)
+
+    rv = client.get(f"/api/import/{job_id}")
+    assert rv.json["status"] == "failed"
+    assert "Unit (in UnionWare)" in rv.json["error"]
+
+
+def test_interrupted_jobs_failed(app, client):
+    host = socket.gethostname()
+    dead = subprocess.Popen([sys.executable, "-c", ""])
+    dead.wait()
+    queued = ImportJob.create(filename="queued.csv")
+    running = ImportJob.create(
+        filename="running.csv", status="running", owner=f"{host}:{dead.pid}"
+    )
+    own = ImportJob.create(filename="own.csv", owner=jobs.owner())
+    # a sibling server worker still importing
+    sibling = ImportJob.create(
+        filename="sibling.csv", status="running", owner=f"{host}:{os.getppid()}"
+    )
+    remote = ImportJob.create(filename="remote.csv", owner="elsewhere:1")
+    done = ImportJob.create(filename="done.csv", status="done")
+    with app.test_request_context():
+        jobs.spool_path(queued.id).write_text("Name\n")
+        jobs.spool_path(sibling.id).write_text("Name\n")
+        # the spool file is gone already
+        jobs.remove_spool(running.id)
+    db.close()
+
+    wallchart.start_schedulers(app)
+    app.extensions["scheduler_lock"].close()
+    statuses = dict(ImportJob.select(ImportJob.id, ImportJob.status).tuples())
+    assert statuses == {
+        queued.id: "failed",
+        running.id: "failed",
+        own.id: "failed",
+        sibling.id: "running",
+        remote.id: "queued",
+        done.id: "done",
+    }
+    assert "Interrupted" in ImportJob.get_by_id(queued.id).error
+    with app.test_request_context():
+        assert not jobs.spool_path(queued.id).exists()
+        assert jobs.spool_path(sibling.id).exists()
+
+
+def test_import_progress_shared(app, client, monkeypatch):
+    monkeypatch.setattr(jobs, "PROGRESS_INTERVAL", 0.01)
+    seen = []
+
+    def parse_csv(roster_file, stats, **kwargs):
+        stats.rows, stats.created = 3, 2
+        # as a sibling worker polling the job sees it
+        for _ in range(500):
+            job = ImportJob.get_by_id(job_id)
+            del jobs.running[job_id]
+            status = jobs.job_status(job)
+            jobs.running[job_id] = stats
+            if status["rows"] == 3:
+                seen.append(status)
+                break
+            time.sleep(0.01)
+
+    monkeypatch.setattr(jobs, "parse_csv", parse_csv)
+    job_id = ImportJob.create(filename="roster.csv", owner=jobs.owner()).id
+    with app.test_request_context():
+        jobs.spool_path(job_id).write_text("Name\n")
+    db.close()
+
+    jobs.run_import(app, job_id)
+    assert seen[0]["status"] == "running"
+    assert (seen[0]["created"], seen[0]["updated"]) == (2, 0)
+    with app.test_request_context():
+        assert not jobs.progress_path(job_id).exists()
+        assert jobs.job_status(ImportJob.get_by_id(job_id))["rows"] == 3
+
 
 # def test_add_worker(app, client):
 #    """xXx"""
@@ -117,3 +227,59 @@ def test_upload_record(client):
 #    rv = client.post("/worker/", data=data, follow_redirects=True)
 #    print(rv.data)
 #    assert rv.status_code == 200
+
+
+def test_upload_record_preview(client):
+    admin_login(client)
+    data = {
+        "record": (io.BytesIO(b"Last Name,First Name,Unit (in UnionWare)\n"), "a.csv"),
+        "mode": "preview",
+    }
+    rv = client.post("/upload_record", data=data, content_type="multipart/form-data")
+    assert rv.status_code == 200
+    assert b"Preview: 0 added, 0 moved, 0 reactivated, 10 deactivated" in rv.data
+    assert b"Deactivated (10)" in rv.data
+    assert ImportJob.select().count() == 0
+
+
+def test_database_profile(app):
+    with db_wrapper.database.connection_context():
+        pragma = lambda name: db_wrapper.database.execute_sql(
+            f"PRAGMA {name}"
+        ).fetchone()[0]
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1
+        assert pragma("temp_store") == 2
+
+
+def test_database_concurrency(app):
+    with db_wrapper.database.connection_context():
+        structure_test = StructureTest.create(name="Test", description="")
+        worker_ids = [worker.id for worker in Worker.select()]
+
+    def write(worker_id):
+        for _ in range(20):
+            with db_wrapper.database.connection_context():
+                with db_wrapper.database.atomic("IMMEDIATE"):
+                    Participation.insert(
+                        worker=worker_id, structure_test=structure_test
+                    ).on_conflict_ignore().execute()
+                Participation.delete().where(
+                    Participation.worker == worker_id
+                ).execute()
+
+    def read(_):
+        for _ in range(20):
+            with db_wrapper.database.connection_context():
+                Worker.select(Worker, fn.count(Participation.id)).join(
+                    Participation, JOIN.LEFT_OUTER
+                ).group_by(Worker.id).execute()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        writers = [executor.submit(write, worker_id) for worker_id in worker_ids]
+        readers = [executor.submit(read, i) for i in range(len(worker_ids))]
+        for future in writers + readers:
+            future.result()
+
+    with db_wrapper.database.connection_context():
+        assert Participation.select().count() == 0
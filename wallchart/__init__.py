@@ -9,10 +9,50 @@ __version__ = "0.1.0"
 db_wrapper = FlaskDB()
 
 
-def create_app(test_config=None):
-    app = Flask(__name__, instance_relative_config=True)
+def database_config(config):
+    """Peewee database settings for the SQLite file at ``DATABASE``.
+
+    Connections are pooled per process unless ``DATABASE_MAX_CONNECTIONS`` is
+    unset and every connection applies ``DATABASE_PRAGMAS``. The engines time
+    every statement for ``wallchart.metrics``.
+    """
+    database = dict(
+        name=config["DATABASE"],
+        engine="wallchart.metrics.SqliteDatabase",
+        pragmas=config["DATABASE_PRAGMAS"],
+    )
+    if config["DATABASE_MAX_CONNECTIONS"]:
+        database.update(
+            engine="wallchart.metrics.PooledSqliteDatabase",
+            max_connections=config["DATABASE_MAX_CONNECTIONS"],
+            stale_timeout=config["DATABASE_STALE_TIMEOUT"],
+            # pooled connections are handed out to whichever thread asks next
+            check_same_thread=False,
+        )
+    return database
+
+
+def mapping_path(mapping_file, *folders):
+    """Path of a relative ``mapping_file`` in the first of ``folders`` holding it.
+
+    Resolved independently of the working directory, so CLI commands and cron
+    jobs find the same mapping as the web server. Without any match the path
+    in the first folder is returned, importing then fails on the missing file.
+    """
+    candidates = [folder / mapping_file for folder in folders]
+    for candidate in candidates:
+        if candidate.exists():
+            return str(candidate)
+    return str(candidates[0])
+
+
+def create_app(test_config=None, instance_path=None):
+    """Create the app, ``instance_path`` defaults to ``instance`` next to it."""
+    app = Flask(__name__, instance_path=instance_path, instance_relative_config=True)
     app.config.from_object("wallchart.defaults")
 
+    # mapping.yml ships next to the package, a config file may bring its own
+    config_folder = Path(app.root_path).parent
     if test_config is None:
         # look for a config file in these places
         config_locations = [
@@ -24,6 +64,7 @@ def create_app(test_config=None):
             if (path / "config.py").exists():
                 app.config.from_pyfile(path / "config.py")
                 print(f"Config loaded from {path}/config.py")
+                config_folder = path
                 break
     else:
         # load a test_config in for unit testing
@@ -31,8 +72,13 @@ def create_app(test_config=None):
             app.config.update(test_config)
         elif test_config.endswith(".py"):
             app.config.from_pyfile(test_config)
+            config_folder = Path(test_config).parent
 
-    app.config["DATABASE"] = f"sqlite:///{app.config['DATABASE']}"
+    app.config["MAPPING_FILE"] = mapping_path(
+        app.config["MAPPING_FILE"], config_folder, Path(app.root_path).parent
+    )
+
+    app.config["DATABASE"] = database_config(app.config)
 
     assert app.secret_key != "changeme", f"Please change SECRET_KEY in config.py"
 
@@ -49,10 +95,23 @@ def create_app(test_config=None):
 
     app.register_blueprint(db.db)
 
+    from wallchart.cli import wallchart
+
+    app.cli.add_command(wallchart)
+
     db_wrapper.init_app(app)
 
-    if not Path(app.config["DATABASE"]).exists():
-        db.create_tables()
+    db.create_tables()
+
+    from wallchart import cache, reference
+
+    cache.init_app(app)
+    reference.init_app(app)
+
+    from wallchart import metrics, slow_queries
+
+    metrics.init_app(app)
+    slow_queries.init_app(app)
 
     from wallchart.views import views
 
@@ -63,3 +122,47 @@ def create_app(test_config=None):
     app.register_blueprint(api)
 
     return app
+
+
+def scheduler_lock(app):
+    """Whether this process won the lock to run the background schedulers.
+
+    Every worker of a multi process server imports the app, only the first
+    to lock ``instance/scheduler.lock`` runs the schedulers. The lock is held
+    until the process exits.
+    """
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover
+        return True
+
+    lock_file = open(Path(app.instance_path) / "scheduler.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    app.extensions["scheduler_lock"] = lock_file
+    return True
+
+
+def start_schedulers(app):
+    """Start the background schedulers of a serving app.
+
+    Called by the WSGI entry point rather than ``create_app``, so CLI commands
+    and cron jobs never start them. The process holding the lock also fails
+    the import jobs a previous server left unfinished.
+    """
+    from wallchart import backup, events, jobs, trends
+
+    if "scheduler_lock" not in app.extensions:
+        if not scheduler_lock(app):
+            return
+        jobs.fail_interrupted(app)
+
+    if app.config["BACKUP_INTERVAL"]:
+        backup.start_scheduler(app)
+    if app.config["TRENDS_INTERVAL"]:
+        trends.start_scheduler(app)
+    if app.config["CHECKPOINT_INTERVAL"]:
+        events.start_scheduler(app)
@@ -0,0 +1,128 @@
+from peewee import fn
+
+from wallchart import db_wrapper
+from wallchart.db import DepartmentCount, Participation, ParticipationCount, Worker
+
+
+def count_workers(department_id, delta):
+    DepartmentCount.insert(department_id=department_id, workers=delta).on_conflict(
+        conflict_target=[DepartmentCount.department_id],
+        update={DepartmentCount.workers: DepartmentCount.workers + delta},
+    ).execute()
+
+
+def count_participation(department_id, structure_test_id, delta):
+    ParticipationCount.insert(
+        department_id=department_id,
+        structure_test_id=structure_test_id,
+        participants=delta,
+    ).on_conflict(
+        conflict_target=[
+            ParticipationCount.department_id,
+            ParticipationCount.structure_test_id,
+        ],
+        update={
+            ParticipationCount.participants: ParticipationCount.participants + delta
+        },
+    ).execute()
+
+
+def count_worker(worker_id, department_id, delta):
+    """Add (``delta=1``) or remove (``delta=-1``) an active worker."""
+    count_workers(department_id, delta)
+    structure_tests = Participation.select(Participation.structure_test).where(
+        Participation.worker == worker_id
+    )
+    for (structure_test_id,) in structure_tests.tuples():
+        count_participation(department_id, structure_test_id, delta)
+
+
+def move_worker(worker_id, old, new):
+    """Update counts after a worker changed from ``old`` to ``new``.
+
+    Both states are ``(organizing_dept_id, active)`` tuples, ``old`` is
+    ``None`` for new workers and ``new`` is ``None`` for deleted ones.
+    """
+    old, new = counted_department(old), counted_department(new)
+    if old != new:
+        if old is not None:
+            count_worker(worker_id, old, -1)
+        if new is not None:
+            count_worker(worker_id, new, 1)
+
+
+def counted_department(state):
+    """Department a worker in ``state`` is counted for, if any."""
+    if state and state[0] is not None and state[1]:
+        return int(state[0])
+    return None
+
+
+def worker_counts():
+    return (
+        Worker.select(Worker.organizing_dept_id, fn.COUNT(Worker.id))
+        .where((Worker.active == True) & Worker.organizing_dept_id.is_null(False))
+        .group_by(Worker.organizing_dept_id)
+    )
+
+
+def participation_counts():
+    return (
+        Participation.select(
+            Worker.organizing_dept_id,
+            Participation.structure_test,
+            fn.COUNT(Participation.id),
+        )
+        .join(Worker, on=(Participation.worker == Worker.id))
+        .where((Worker.active == True) & Worker.organizing_dept_id.is_null(False))
+        .group_by(Worker.organizing_dept_id, Participation.structure_test)
+    )
+
+
+def rebuild():
+    """Recompute all counts from the worker and participation tables."""
+    with db_wrapper.database.atomic():
+        DepartmentCount.delete().execute()
+        ParticipationCount.delete().execute()
+        DepartmentCount.insert_from(
+            worker_counts(), [DepartmentCount.department_id, DepartmentCount.workers]
+        ).execute()
+        ParticipationCount.insert_from(
+            participation_counts(),
+            [
+                ParticipationCount.department_id,
+                ParticipationCount.structure_test_id,
+                ParticipationCount.participants,
+            ],
+        ).execute()
+
+
+def check():
+    """Return ``(key, stored, actual)`` for every count that is off."""
+    actual = {
+        (department_id, None): count
+        for department_id, count in worker_counts().tuples()
+    }
+    actual.update(
+        ((department_id, structure_test_id), count)
+        for department_id, structure_test_id, count in participation_counts().tuples()
+    )
+
+    stored = {
+        (department_id, None): count
+        for department_id, count in DepartmentCount.select().tuples()
+    }
+    stored.update(
+        ((department_id, structure_test_id), count)
+        for department_id, structure_test_id, count in ParticipationCount.select(
+            ParticipationCount.department_id,
+            ParticipationCount.structure_test_id,
+            ParticipationCount.participants,
+        ).tuples()
+    )
+
+    return [
+        (key, stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(stored.keys() | actual.keys(), key=str)
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
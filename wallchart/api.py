@@ -1,64 +1,280 @@
-from flask import Blueprint, jsonify
+from datetime import date, datetime, time
+from functools import wraps
+
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    g,
+    json,
+    jsonify,
+    make_response,
+    request,
+    stream_with_context,
+    url_for,
+)
 from playhouse.flask_utils import get_object_or_404
 
-from wallchart.db import Department, Participation, Unit, Worker
-from wallchart.util import login_required
+from wallchart import changes, events, trends
+from wallchart.db import Department, ImportJob, Participation, Unit, Worker
+from wallchart.jobs import job_status
+from wallchart.matrix import participation_matrix
+from wallchart.reference import reference_data
+from wallchart.search import search_workers
+from wallchart.slow_queries import slow_query_log
+from wallchart.util import is_admin, login_required
 
 api = Blueprint("api", __name__, url_prefix="/api")
 
+SEARCH_LIMIT = 50
+PAGE_LIMIT = 1000
+
+# Columns clients may request, password hashes and notes never leave the server
+WORKER_FIELDS = {
+    "id": Worker.id,
+    "name": Worker.name,
+    "preferred_name": Worker.preferred_name,
+    "pronouns": Worker.pronouns,
+    "email": Worker.email,
+    "phone": Worker.phone,
+    "contract": Worker.contract,
+    "unit": Worker.unit,
+    "department_id": Worker.department_id,
+    "organizing_dept_id": Worker.organizing_dept_id,
+    "active": Worker.active,
+    "added": Worker.added,
+    "updated": Worker.updated,
+    "department_slug": Department.slug.alias("department_slug"),
+    "department_name": Department.name.alias("department_name"),
+}
+
+
+def worker_fields(fields):
+    """Validate a comma separated ``fields`` argument, the ID is always kept."""
+    if not fields:
+        return list(WORKER_FIELDS)
+    fields = ["id"] + [field for field in fields.split(",") if field != "id"]
+    unknown = set(fields) - WORKER_FIELDS.keys()
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def worker_query(fields):
+    return Worker.select(*(WORKER_FIELDS[field] for field in fields)).join(
+        Department, on=(Worker.organizing_dept_id == Department.id)
+    )
+
+
+def stream_json(rows):
+    """Stream rows as a JSON array without holding them in memory."""
+
+    def generate():
+        separator = "["
+        for row in rows:
+            yield separator + json.dumps(row)
+            separator = ","
+        yield "[]" if separator == "[" else "]"
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype="application/json"
+    )
+
+
+def stream_ndjson(rows):
+    def generate():
+        for row in rows:
+            yield json.dumps(row) + "\n"
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+def change_token(view):
+    """Tag responses with the current change token in ``X-Change-Token``.
+
+    The token is read before the view queries any rows, so rows changed
+    meanwhile are sent again on the next sync rather than missed.
+    """
+
+    @wraps(view)
+    def inner(*args, **kwargs):
+        g.change_token = changes.revision()
+        since = request.args.get("since", type=int)
+        if since is not None and since > g.change_token:
+            abort(410, "Unknown change token, fetch all rows again")
+        response = make_response(view(*args, **kwargs))
+        response.headers["X-Change-Token"] = str(g.change_token)
+        return response
+
+    return inner
+
+
+def since():
+    return request.args.get("since", type=int)
+
+
+def delta(resource, rows, id_field):
+    """Rows of ``resource`` changed and IDs deleted since ``?since=``."""
+    return jsonify(
+        token=g.change_token,
+        changed=list(
+            rows.where(id_field.in_(changes.changed_since(resource, since())))
+        ),
+        deleted=changes.deleted_since(resource, since()),
+    )
+
 
 @api.route("/workers")
 @login_required
+@change_token
 def api_workers():
-    return jsonify(
-        list(
-            Worker.select(
-                Worker,
-                Department.slug.alias("department_slug"),
-                Department.name.alias("department_name"),
-            )
-            .join(Department, on=(Worker.organizing_dept_id == Department.id))
-            .dicts()
-        )
+    """Workers ordered by ID.
+
+    ``after_id`` and ``limit`` page through the roster, a ``Link`` header
+    points to the next page. Without ``limit`` all workers are streamed,
+    ``format=ndjson`` writes one worker per line. ``fields`` selects a subset
+    of ``WORKER_FIELDS``. ``since`` returns the changes after a token.
+    """
+    limit = request.args.get("limit", type=int)
+    after_id = request.args.get("after_id", 0, type=int)
+    fields = worker_fields(request.args.get("fields"))
+
+    if since() is not None:
+        return delta("worker", worker_query(fields).dicts(), Worker.id)
+
+    workers = (
+        worker_query(fields).where(Worker.id > after_id).order_by(Worker.id).dicts()
     )
 
+    if limit is None:
+        if request.args.get("format") == "ndjson":
+            return stream_ndjson(workers.iterator())
+        return stream_json(workers.iterator())
+
+    limit = min(max(limit, 1), PAGE_LIMIT)
+    page = list(workers.limit(limit + 1))
+    response = jsonify(page[:limit])
+    if len(page) > limit:
+        args = request.args.to_dict()
+        args.update(after_id=page[limit - 1]["id"], limit=limit)
+        response.headers["Link"] = f'<{url_for(".api_workers", **args)}>; rel="next"'
+    return response
+
+
+@api.route("/search")
+@login_required
+def api_search():
+    limit = min(request.args.get("limit", 10, type=int), SEARCH_LIMIT)
+    return jsonify(search_workers(request.args.get("q", ""), max(limit, 1)))
+
 
 @api.route("/worker/<int:worker_id>")
 @login_required
 def api_worker(worker_id):
-    workers = (
-        Worker.select(
-            Worker,
-            Department.slug.alias("department_slug"),
-            Department.name.alias("department_name"),
-        )
-        .join(Department, on=(Worker.organizing_dept_id == Department.id))
-        .dicts()
-    )
-
+    workers = worker_query(worker_fields(request.args.get("fields"))).dicts()
     worker = get_object_or_404(workers, (Worker.id == worker_id))
     return jsonify(worker)
 
 
 @api.route("/participation")
 @login_required
+@change_token
 def api_participation():
-    return jsonify(
-        list(
-            Participation.select(Participation, Worker.organizing_dept_id)
-            .join(Worker, on=(Participation.worker == Worker.id))
-            .dicts()
+    participation = (
+        Participation.select(Participation, Worker.organizing_dept_id)
+        .join(Worker, on=(Participation.worker == Worker.id))
+        .dicts()
+    )
+    if since() is not None:
+        return delta("participation", participation, Participation.id)
+    return jsonify(list(participation))
+
+
+@api.route("/participation/matrix")
+@api.route("/participation/matrix/<department_slug>")
+@login_required
+def api_participation_matrix(department_slug=None):
+    department_id = None
+    if department_slug:
+        department = get_object_or_404(
+            Department.select(Department.id), (Department.slug == department_slug)
         )
+        department_id = department.id
+    return jsonify(participation_matrix(department_id))
+
+
+@api.route("/trends")
+@login_required
+def api_trends():
+    selected = trends.selection(
+        reference_data(), request.args.get("department"), request.args.get("unit")
+    )
+    if selected is None:
+        abort(404)
+    structure_test_ids = request.args.getlist("structure_test", type=int) or None
+    return jsonify(trends.trend(selected[1], structure_test_ids))
+
+
+@api.route("/participation/as_of/<as_of>")
+@login_required
+def api_participation_as_of(as_of):
+    """``[worker, structure_test]`` pairs participating at the end of ``as_of``.
+
+    ``?department=slug`` limits them to the workers organized in a department
+    on that day, see ``events.organized_at``.
+    """
+    try:
+        as_of = date.fromisoformat(as_of)
+    except ValueError:
+        abort(400)
+    moment = datetime.combine(as_of, time.max)
+    if not request.args.get("department"):
+        return jsonify(sorted(events.participation_at(moment)))
+
+    department = get_object_or_404(
+        Department.select(Department.id),
+        (Department.slug == request.args["department"]),
     )
+    organized = {
+        worker_id
+        for (worker_id,) in events.organized_at(department.id, as_of)
+        .select(Worker.id)
+        .tuples()
+    }
+    participation = events.participation_at(moment, department.id)
+    return jsonify(sorted(key for key in participation if key[0] in organized))
 
 
 @api.route("/departments")
 @login_required
+@change_token
 def api_departments():
+    if since() is not None:
+        return delta("department", Department.select().dicts(), Department.id)
     return jsonify(list(Department.select().dicts()))
 
 
 @api.route("/units")
 @login_required
+@change_token
 def api_units():
+    if since() is not None:
+        return delta("unit", Unit.select().dicts(), Unit.id)
     return jsonify(list(Unit.select().dicts()))
+
+
+@api.route("/slow_queries")
+@login_required
+def api_slow_queries():
+    if not is_admin():
+        abort(403)
+    return jsonify(slow_query_log().latest())
+
+
+@api.route("/import/<int:job_id>")
+@login_required
+def api_import_job(job_id):
+    job = get_object_or_404(ImportJob, (ImportJob.id == job_id))
+    return jsonify(job_status(job))
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from flask import current_app
+
+from wallchart import db_wrapper
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def backup_folder():
+    folder = current_app.config["BACKUP_FOLDER"] or Path(
+        current_app.instance_path, "backups"
+    )
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    return Path(folder)
+
+
+def snapshot(path):
+    """Write a consistent copy of the database to ``path``.
+
+    ``VACUUM INTO`` copies from a single read transaction, in WAL mode writers
+    carry on while it runs, and the copy comes out defragmented.
+    """
+    db_wrapper.database.execute_sql("VACUUM INTO ?", (str(path),))
+
+
+def temporary_snapshot():
+    """Snapshot into a temporary file next to the backups, the caller removes it."""
+    fd, path = tempfile.mkstemp(suffix=".db", dir=backup_folder())
+    os.close(fd)
+    # VACUUM INTO refuses to overwrite existing files
+    os.unlink(path)
+    snapshot(path)
+    return Path(path)
+
+
+def chunks(file):
+    return iter(lambda: file.read(CHUNK_SIZE), b"")
+
+
+def checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as snapshot_file:
+        for chunk in chunks(snapshot_file):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def stream_gzip(path, remove=False):
+    """Yield ``path`` gzip compressed chunk by chunk."""
+    try:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        with open(path, "rb") as snapshot_file:
+            for chunk in chunks(snapshot_file):
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+        yield compressor.flush()
+    finally:
+        if remove:
+            remove_file(path)
+
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def snapshots():
+    """Stored snapshots, newest first."""
+    return sorted(backup_folder().glob("wallcharts-*.db.gz"), reverse=True)
+
+
+def store_snapshot(retention=None):
+    """Store a compressed snapshot and delete all but the newest ``retention``."""
+    retention = retention or current_app.config["BACKUP_RETENTION"]
+    path = temporary_snapshot()
+    target = backup_folder() / f"wallcharts-{datetime.now():%Y%m%d-%H%M%S}.db.gz"
+    partial = target.with_suffix(".tmp")
+    with open(partial, "wb") as compressed:
+        for data in stream_gzip(path, remove=True):
+            compressed.write(data)
+    partial.rename(target)
+
+    for old in snapshots()[retention:]:
+        old.unlink()
+    return target
+
+
+def snapshot_due(interval):
+    latest = snapshots()
+    return not latest or time.time() - latest[0].stat().st_mtime >= interval
+
+
+def start_scheduler(app):
+    """Store a snapshot every ``BACKUP_INTERVAL`` seconds in a daemon thread.
+
+    Started by ``wallchart.start_schedulers`` in a single process per host, a
+    snapshot younger than the interval, such as one stored before a restart,
+    skips the turn.
+    """
+    interval = app.config["BACKUP_INTERVAL"]
+
+    def run():
+        while True:
+            try:
+                with app.app_context(), db_wrapper.database.connection_context():
+                    if snapshot_due(interval):
+                        app.logger.info("Stored snapshot %s", store_snapshot())
+            except Exception:
+                app.logger.exception("Snapshot failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="wallchart-backup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,395 @@
+"""Synthetic rosters and an end-to-end benchmark of imports and views.
+
+Run ``python -m wallchart.bench --workers 10000 --output bench.json`` to
+benchmark a fresh database of that size, and ``--compare old.json`` to list
+measurements which got slower than in an earlier run.
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import sqlite3
+import statistics
+import string
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+from peewee import fn
+
+import wallchart
+from wallchart import aggregates, db, db_wrapper, events
+from wallchart.cache import bump_version
+from wallchart.db import Department, Participation, StructureTest, Worker
+from wallchart.util import parse_csv
+
+FIRST_NAMES = (
+    "Alana Bob Carmen Dmitri Emma Farah Gus Hina Ikaika Jun Keala Leilani Malia "
+    "Noa Oscar Pua Quinn Rosa Sione Tavita Uma Vince Wei Xiomara Yuki Zane"
+).split()
+# listed one by one, some contain spaces
+LAST_NAMES = [
+    "Akana",
+    "Brown",
+    "Chang",
+    "Dela Cruz",
+    "Espinoza",
+    "Fong",
+    "Garcia",
+    "Higa",
+    "Ito",
+    "Kahale",
+    "Lee",
+    "Mahoe",
+    "Nakamura",
+    "Okada",
+    "Park",
+    "Quiocho",
+    "Reyes",
+    "Santos",
+    "Tanaka",
+    "Uyeda",
+    "Vierra",
+    "Wong",
+    "Yamada",
+    "Zhang",
+]
+SUBJECTS = (
+    "Anthropology Art Astronomy Biology Botany Chemistry Communications Dance "
+    "Economics Education Engineering English Geography Geology History "
+    "Kinesiology Linguistics Mathematics Music Nursing Oceanography Philosophy "
+    "Physics Psychology Sociology Theatre Zoology"
+).split()
+JOB_TITLES = {
+    "GA09": "GRADUATE ASSISTANT, TEACHING",
+    "GA11": "GRADUATE ASSISTANT, RESEARCH",
+}
+
+HEADER = (
+    "Last Name",
+    "First Name",
+    "Unit (in UnionWare)",
+    "Sect Desc",
+    "Dept Desc",
+    "Job Code",
+    "Job Title",
+)
+
+
+def suffix(number):
+    """Spreadsheet style column letters, keeping generated names unique."""
+    letters = ""
+    number += 1
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = string.ascii_uppercase[remainder] + letters
+    return letters
+
+
+def department_names(departments):
+    names = []
+    for number in range(departments):
+        subject = SUBJECTS[number % len(SUBJECTS)]
+        names.append(
+            f"DEPT OF {subject.upper()}"
+            + (f" {number // len(SUBJECTS) + 1}" if number >= len(SUBJECTS) else "")
+        )
+    return names
+
+
+def roster_rows(workers, departments=150, units=15, seed=0):
+    """Yield ``workers`` roster rows spread unevenly over ``departments``."""
+    rng = random.Random(seed)
+    names = department_names(departments)
+    # a few large departments and a long tail of small ones
+    weights = [1 / (rank + 1) for rank in range(departments)]
+    for number in range(workers):
+        department = rng.choices(range(departments), weights)[0]
+        job_code = rng.choice(list(JOB_TITLES))
+        yield {
+            "Last Name": rng.choice(LAST_NAMES),
+            "First Name": f"{rng.choice(FIRST_NAMES)} {suffix(number)}",
+            "Unit (in UnionWare)": f"UNIT {department % units + 1}",
+            "Sect Desc": names[department],
+            "Dept Desc": names[department],
+            "Job Code": job_code,
+            "Job Title": JOB_TITLES[job_code],
+        }
+
+
+def roster_csv(workers, departments=150, units=15, seed=0):
+    """Generated roster as CSV bytes, ready for ``parse_csv``."""
+    text = io.StringIO()
+    writer = csv.DictWriter(text, HEADER)
+    writer.writeheader()
+    writer.writerows(roster_rows(workers, departments, units, seed))
+    return text.getvalue().encode()
+
+
+def generate_participation(structure_tests=30, rate=0.4, seed=0):
+    """Create structure tests and a participation history for every worker.
+
+    Later tests reach fewer workers, each test reaches about ``rate`` of the
+    workers at first. Tests are 30 days apart, workers join them within the
+    30 days after, which are logged as participation events.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    start = today - timedelta(days=30 * structure_tests)
+    tests = []
+    for number in range(structure_tests):
+        added = start + timedelta(days=30 * number)
+        tests.append(
+            StructureTest.create(
+                name=f"Structure test {number + 1}", description="", added=added
+            )
+        )
+
+    worker_ids = [worker_id for (worker_id,) in Worker.select(Worker.id).tuples()]
+    rows = []
+    for number, structure_test in enumerate(tests):
+        reach = rate * (1 - number / (2 * structure_tests))
+        rows.extend(
+            (
+                worker_id,
+                structure_test.id,
+                min(structure_test.added + timedelta(days=rng.randrange(30)), today),
+            )
+            for worker_id in worker_ids
+            if rng.random() < reach
+        )
+
+    with db_wrapper.database.atomic():
+        for batch in range(0, len(rows), 300):
+            Participation.insert_many(
+                rows[batch : batch + 300],
+                fields=[
+                    Participation.worker,
+                    Participation.structure_test,
+                    Participation.added,
+                ],
+            ).execute()
+        events.seed()
+        aggregates.rebuild()
+        bump_version()
+    return [structure_test.id for structure_test in tests]
+
+
+def measure(function, repeat, setup=None):
+    """Time ``function(iteration)`` after running the untimed ``setup``."""
+    timings = []
+    for iteration in range(repeat):
+        if setup:
+            setup()
+        start = perf_counter()
+        function(iteration)
+        timings.append((perf_counter() - start) * 1000)
+    return dict(
+        median_ms=round(statistics.median(timings), 2),
+        min_ms=round(min(timings), 2),
+        max_ms=round(max(timings), 2),
+        repeat=repeat,
+    )
+
+
+def queries(response):
+    """Query count of a response, from its ``Server-Timing`` header."""
+    timing = response.headers.get("Server-Timing", "")
+    _, _, description = timing.partition('desc="')
+    return int(description.split()[0]) if description else None
+
+
+class Benchmark:
+    def __init__(self, app, repeat):
+        self.app = app
+        self.repeat = repeat
+        self.client = app.test_client()
+        self.results = {}
+
+    def login(self):
+        self.client.post(
+            "/login/",
+            data=dict(email="admin", password=self.app.config["ADMIN_PASSWORD"]),
+        )
+
+    def empty_cache(self):
+        with self.app.app_context():
+            bump_version()
+            db.close()
+
+    def request(self, name, url, method="GET", cold=False, body=None):
+        """Time ``url``, with ``cold`` the response cache is emptied first.
+
+        ``url`` and the JSON ``body`` may be functions of the iteration, so writes can
+        alternate instead of repeating a no-op.
+        """
+        responses = []
+
+        def run(iteration):
+            response = self.client.open(
+                url(iteration) if callable(url) else url,
+                method=method,
+                json=body(iteration) if callable(body) else body,
+            )
+            assert response.status_code < 400, f"{url}: {response.status_code}"
+            response.get_data()
+            responses.append(response)
+
+        result = measure(run, self.repeat, self.empty_cache if cold else None)
+        result.update(url=responses[-1].request.path, queries=queries(responses[-1]))
+        self.results[name] = result
+
+    def run(self, workers, departments, units, structure_tests):
+        roster = roster_csv(workers, departments, units)
+        with self.app.app_context():
+            start = perf_counter()
+            with io.BytesIO(roster) as roster_file:
+                parse_csv(roster_file)
+            self.results["import"] = dict(
+                median_ms=round((perf_counter() - start) * 1000, 2), repeat=1
+            )
+
+            start = perf_counter()
+            with io.BytesIO(roster) as roster_file:
+                parse_csv(roster_file, diff=True)
+            self.results["import_unchanged"] = dict(
+                median_ms=round((perf_counter() - start) * 1000, 2), repeat=1
+            )
+
+            tests = generate_participation(structure_tests)
+            department = (
+                Department.select(Department.slug)
+                .join(Worker, on=(Worker.organizing_dept_id == Department.id))
+                .group_by(Department.id)
+                .order_by(fn.COUNT(Worker.id).desc())
+                .first()
+            )
+            worker_ids = [
+                worker_id
+                for (worker_id,) in Worker.select(Worker.id)
+                .order_by(Worker.id)
+                .limit(50)
+                .tuples()
+            ]
+            worker_id = worker_ids[0]
+            db.close()
+
+        self.login()
+        for cold in (True, False):
+            state = "cold" if cold else "warm"
+            self.request(f"departments_{state}", "/departments/", cold=cold)
+            self.request(f"units_{state}", "/units/", cold=cold)
+            self.request(
+                f"department_{state}", f"/department/{department.slug}", cold=cold
+            )
+        self.request("worker", f"/worker/{worker_id}")
+        self.request("api_workers", "/api/workers")
+        self.request("api_workers_page", "/api/workers?limit=100")
+        self.request("api_participation", "/api/participation")
+        self.request("api_participation_matrix", "/api/participation/matrix")
+        self.request("api_departments", "/api/departments")
+        self.request("api_search", "/api/search?q=ala")
+
+        self.request(
+            "participation_toggle",
+            lambda iteration: f"/participation/{worker_id}/{tests[0]}/{iteration % 2}",
+        )
+        self.request(
+            "participation_bulk",
+            "/participation",
+            method="POST",
+            body=lambda iteration: {
+                "changes": [
+                    dict(
+                        worker=bulk_worker_id,
+                        structure_test=tests[-1],
+                        status=iteration % 2,
+                    )
+                    for bulk_worker_id in worker_ids
+                ]
+            },
+        )
+        return self.results
+
+
+def run(
+    workers=1000, departments=150, units=15, structure_tests=30, repeat=5, path=None
+):
+    """Benchmark a fresh database at ``path`` (a temporary file by default)."""
+    with tempfile.TemporaryDirectory() as folder:
+        app = wallchart.create_app(
+            {
+                "ADMIN_PASSWORD": "bench",
+                "BACKUP_FOLDER": Path(folder, "backups"),
+                "DATABASE": str(path or Path(folder, "bench.db")),
+                "SECRET_KEY": "bench",
+                "SLOW_QUERY_THRESHOLD": None,
+                "UPLOAD_FOLDER": folder,
+            },
+            instance_path=str(Path(folder, "instance")),
+        )
+        results = Benchmark(app, repeat).run(
+            workers, departments, units, structure_tests
+        )
+        db.close()
+
+    return dict(
+        version=wallchart.__version__,
+        date=datetime.now().isoformat(timespec="seconds"),
+        python=sys.version.split()[0],
+        sqlite=sqlite3.sqlite_version,
+        scale=dict(
+            workers=workers,
+            departments=departments,
+            units=units,
+            structure_tests=structure_tests,
+        ),
+        results=results,
+    )
+
+
+def compare(old, new, tolerance=0.2):
+    """``(name, old_ms, new_ms)`` of measurements slower by more than ``tolerance``."""
+    regressions = []
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if before and result["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append((name, before["median_ms"], result["median_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1000)
+    parser.add_argument("--departments", type=int, default=150)
+    parser.add_argument("--units", type=int, default=15)
+    parser.add_argument("--structure-tests", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.workers, args.departments, args.units, args.structure_tests, args.repeat
+    )
+    for name, result in results["results"].items():
+        print(f"{name:28} {result['median_ms']:10.2f} ms  {result.get('queries', '')}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as old_file:
+            regressions = compare(json.load(old_file), results)
+        for name, before, after in regressions:
+            print(f"Slower: {name} {before:.2f} ms -> {after:.2f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from functools import wraps
+from hashlib import sha1
+from pathlib import Path
+from threading import Lock
+
+from flask import Response, current_app, request, session
+
+from wallchart.db import DataVersion
+
+
+def data_version():
+    return (
+        DataVersion.select(DataVersion.version)
+        .where(DataVersion.name == "data")
+        .scalar()
+        or 0
+    )
+
+
+def bump_version():
+    """Invalidate cached responses, call this on every write."""
+    DataVersion.insert(name="data", version=1).on_conflict(
+        conflict_target=[DataVersion.name],
+        update={DataVersion.version: DataVersion.version + 1},
+    ).execute()
+
+
+class ResponseCache:
+    """Least recently used rendered responses of this process."""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def build_id(root):
+    """Fingerprint of the code, templates and static files below ``root``.
+
+    The same in every worker of a deployment and changed by any deployment
+    touching a file, unlike ``__version__`` which is rarely bumped.
+    """
+    digest = sha1()
+    for path in sorted(Path(root).rglob("*")):
+        if path.is_file() and "__pycache__" not in path.parts:
+            digest.update(str(path.relative_to(root)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def init_app(app):
+    app.extensions["response_cache"] = ResponseCache(app.config["RESPONSE_CACHE_SIZE"])
+    app.extensions["build_id"] = app.config["BUILD_ID"] or build_id(app.root_path)
+
+
+def response_cache():
+    return current_app.extensions["response_cache"]
+
+
+def cached(view):
+    """Serve a view from the response cache until the data version changes.
+
+    Responses differ per role, so the role is part of the key. The ETag is
+    derived from the key and the build ID, which lets any process of the same
+    deployment answer a matching ``If-None-Match`` with ``304 Not Modified``
+    before rendering anything, while pages of an earlier deployment are
+    rendered again.
+    """
+
+    @wraps(view)
+    def inner(*args, **kwargs):
+        # pending flash messages are rendered into the page
+        if request.method != "GET" or session.get("_flashes"):
+            return view(*args, **kwargs)
+
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            request.query_string,
+            session.get("admin", False),
+            session.get("department_id"),
+            data_version(),
+        )
+        etag = sha1(
+            repr((current_app.extensions["build_id"], key)).encode()
+        ).hexdigest()
+
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            entry = response_cache().get(key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = (response.get_data(), response.mimetype)
+                response_cache().put(key, entry)
+            response = Response(entry[0], mimetype=entry[1])
+
+        response.set_etag(etag)
+        # pages depend on the login, browsers must revalidate each time
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return inner
@@ -0,0 +1,69 @@
+from peewee import fn
+
+from wallchart import db_wrapper
+from wallchart.db import RowChange
+
+# API resources and the tables whose rows they return
+RESOURCES = ("worker", "participation", "department", "unit")
+
+LOG_CHANGE = """
+    INSERT INTO rowchange (resource, row_id, revision, deleted)
+    VALUES (
+        '{table}',
+        {row}.id,
+        (SELECT COALESCE(MAX(revision), 0) + 1 FROM rowchange),
+        {deleted}
+    )
+    ON CONFLICT (resource, row_id) DO UPDATE
+    SET revision = excluded.revision, deleted = excluded.deleted;"""
+
+TRIGGERS = {
+    "insert": ("new", 0),
+    "update": ("new", 0),
+    "delete": ("old", 1),
+}
+
+
+def create_triggers():
+    """Log the revision of every insert, update and delete on API tables.
+
+    Triggers catch every write path, the views, roster imports and bulk
+    deletes alike. Each row keeps only its latest revision, so the log is
+    bounded by the number of rows ever created.
+    """
+    for table in RESOURCES:
+        for event, (row, deleted) in TRIGGERS.items():
+            db_wrapper.database.execute_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_log_{event} "
+                f"AFTER {event.upper()} ON {table} BEGIN "
+                + LOG_CHANGE.format(table=table, row=row, deleted=deleted)
+                + " END"
+            )
+
+
+def revision():
+    """Current change token, the highest revision logged so far."""
+    return RowChange.select(fn.COALESCE(fn.MAX(RowChange.revision), 0)).scalar()
+
+
+def changed_since(resource, since):
+    """IDs of rows of ``resource`` inserted or updated after revision ``since``."""
+    return RowChange.select(RowChange.row_id).where(
+        (RowChange.resource == resource)
+        & (RowChange.revision > since)
+        & (RowChange.deleted == False)
+    )
+
+
+def deleted_since(resource, since):
+    """IDs of rows of ``resource`` deleted after revision ``since``."""
+    return [
+        row_id
+        for (row_id,) in RowChange.select(RowChange.row_id)
+        .where(
+            (RowChange.resource == resource)
+            & (RowChange.revision > since)
+            & (RowChange.deleted == True)
+        )
+        .tuples()
+    ]
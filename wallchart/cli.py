@@ -0,0 +1,174 @@
+"""``flask wallchart`` commands for imports, exports and maintenance from cron.
+
+They run in the calling process, outside of any web worker, without request
+size limits or timeouts. Long running commands report their throughput.
+"""
+from pathlib import Path
+from time import perf_counter
+
+import click
+from flask.cli import AppGroup
+
+from wallchart import db_wrapper
+from wallchart.db import Department, rebuild_aggregates_command
+
+wallchart = AppGroup("wallchart", help="Bulk import, export and maintenance.")
+wallchart.add_command(rebuild_aggregates_command)
+
+
+def rate(rows, seconds):
+    return (
+        f"{rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s)"
+    )
+
+
+def echo_timings(timings):
+    for name, seconds in timings.items():
+        click.echo(f"  {name:12} {seconds:8.3f}s")
+
+
+def database_size():
+    path = Path(db_wrapper.database.database)
+    return path.stat().st_size if path.exists() else 0
+
+
+@wallchart.command("import")
+@click.argument("roster", type=click.File("rb"))
+@click.option("--diff", is_flag=True, help="Only write workers whose state changed.")
+@click.option("--dry-run", is_flag=True, help="Report changes without writing them.")
+def import_command(roster, diff, dry_run):
+    """Import a roster CSV file, - reads it from stdin."""
+    from wallchart.roster import ImportStats
+    from wallchart.util import parse_csv
+
+    stats = ImportStats()
+    name = getattr(roster, "name", "<stdin>")
+    filename = None if name == "<stdin>" else Path(name).name
+    start = perf_counter()
+    result = parse_csv(
+        roster, stats=stats, diff=diff, dry_run=dry_run, filename=filename
+    )
+    click.echo(f"Imported {rate(stats.rows, perf_counter() - start)}")
+    echo_timings(stats.timings)
+
+    if diff or dry_run:
+        click.echo(
+            f"{len(result.added)} added, {len(result.moved)} moved, "
+            f"{len(result.reactivated)} reactivated, "
+            f"{len(result.deactivated)} deactivated, {result.unchanged} unchanged"
+            + (" (dry run, nothing written)" if dry_run else "")
+        )
+    else:
+        click.echo(
+            f"{stats.created} created, {stats.updated} updated, "
+            f"{stats.deactivated} deactivated"
+        )
+    if stats.unmapped:
+        click.echo(
+            f"{len(stats.unmapped)} sections missing in mapping: "
+            + ", ".join(sorted(stats.unmapped)),
+            err=True,
+        )
+
+
+@wallchart.command("export")
+@click.argument("output", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--format", "format_", type=click.Choice(["csv", "xlsx"]))
+@click.option("--department", help="Slug of a single department to export.")
+def export_command(output, format_, department):
+    """Write the wallcharts of all departments to OUTPUT, - is stdout."""
+    from wallchart import export
+    from wallchart.reference import reference_data
+
+    format_ = format_ or ("xlsx" if output.endswith(".xlsx") else "csv")
+    if format_ == "xlsx" and export.xlsxwriter is None:
+        raise click.ClickException("XLSX export needs the XlsxWriter package")
+    if format_ == "xlsx" and output == "-":
+        raise click.ClickException("XLSX can only be written to a file")
+
+    department_id = None
+    if department:
+        department_id = (
+            Department.select(Department.id)
+            .where(Department.slug == department)
+            .scalar()
+        )
+        if department_id is None:
+            raise click.ClickException(f"Unknown department {department}")
+
+    structure_tests = reference_data().structure_tests
+    count = 0
+
+    def rows():
+        nonlocal count
+        for row in export.wallchart_rows(structure_tests, department_id):
+            count += 1
+            yield row
+
+    start = perf_counter()
+    if format_ == "csv":
+        with click.open_file(output, "w", encoding="utf-8") as csv_file:
+            for chunk in export.csv_chunks(structure_tests, rows()):
+                csv_file.write(chunk)
+    else:
+        export.write_xlsx(structure_tests, rows(), output)
+    # keep stdout clean for the exported data
+    click.echo(f"Exported {rate(count, perf_counter() - start)}", err=True)
+
+
+@wallchart.command("snapshot-trends")
+def snapshot_trends_command():
+    """Store today's participation counts for the trends page, run it daily."""
+    from wallchart import trends
+
+    start = perf_counter()
+    days = trends.take_snapshot()
+    click.echo(f"Stored {days} days of trends in {perf_counter() - start:.2f}s")
+
+
+@wallchart.command("checkpoint")
+def checkpoint_command():
+    """Compact the participation events since the latest checkpoint."""
+    from wallchart import events
+
+    start = perf_counter()
+    checkpoint = events.compact()
+    if checkpoint is None:
+        click.echo("No events since the latest checkpoint")
+    else:
+        click.echo(
+            f"Checkpoint after event {checkpoint.event_id} stored in "
+            f"{perf_counter() - start:.2f}s"
+        )
+
+
+@wallchart.command("vacuum")
+def vacuum_command():
+    """Rebuild the database file, returning free pages to the filesystem."""
+    before = database_size()
+    start = perf_counter()
+    db_wrapper.database.execute_sql("VACUUM")
+    click.echo(
+        f"Vacuumed in {perf_counter() - start:.2f}s, "
+        f"{before / 2**20:.1f} MiB -> {database_size() / 2**20:.1f} MiB"
+    )
+
+
+@wallchart.command("analyze")
+def analyze_command():
+    """Update the statistics the SQLite query planner picks indexes by."""
+    start = perf_counter()
+    db_wrapper.database.execute_sql("ANALYZE")
+    click.echo(f"Analyzed in {perf_counter() - start:.2f}s")
+
+
+@wallchart.command(
+    "bench",
+    context_settings=dict(ignore_unknown_options=True, help_option_names=[]),
+)
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def bench_command(args):
+    """Benchmark a generated roster, see python -m wallchart.bench --help."""
+    from wallchart import bench
+
+    raise SystemExit(bench.main(list(args)))
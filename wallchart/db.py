@@ -1,16 +1,25 @@
-from datetime import date
+import logging
+from datetime import date, datetime
+from time import perf_counter
 
+import click
 from flask import Blueprint, current_app
 from peewee import (
     AutoField,
+    BlobField,
     BooleanField,
     CharField,
+    CompositeKey,
     DateField,
+    DateTimeField,
     ForeignKeyField,
     IntegerField,
     TextField,
+    fn,
 )
 
+from playhouse.sqlite_ext import FTS5Model, RowIDField, SearchField
+
 from wallchart import db_wrapper
 
 db = Blueprint("db", __name__)
@@ -25,7 +34,7 @@ class Unit(db_wrapper.Model):
 class Department(db_wrapper.Model):
     id = AutoField()
     name = CharField(unique=True)
-    slug = CharField()
+    slug = CharField(index=True)
     alias = CharField(unique=True, null=True)
     unit = ForeignKeyField(Unit, backref="departments", null=True)
 
@@ -52,7 +61,13 @@ class Worker(db_wrapper.Model):
     password = CharField(null=True)
 
     class Meta:
-        indexes = ((("name",), True),)
+        indexes = (
+            (("name",), True),
+            (("organizing_dept_id", "active"), False),
+            (("department_id", "active"), False),
+            (("active", "updated"), False),
+            (("added",), False),
+        )
 
 
 class StructureTest(db_wrapper.Model):
@@ -69,14 +84,205 @@ class Participation(db_wrapper.Model):
     added = DateField(default=date.today)
 
     class Meta:
-        indexes = ((("worker", "structure_test"), True),)
+        indexes = (
+            (("worker", "structure_test"), True),
+            (("added",), False),
+        )
+
+
+class ParticipationEvent(db_wrapper.Model):
+    """Append-only log of participation changes, written by wallchart.events."""
+
+    id = AutoField()
+    worker_id = IntegerField()
+    structure_test_id = IntegerField()
+    status = BooleanField()
+    # worker ID of the logged in user, 0 for the admin
+    user_id = IntegerField(null=True)
+    timestamp = DateTimeField(default=datetime.now)
+
+
+class ParticipationCheckpoint(db_wrapper.Model):
+    """Participation after ``event_id``, compacted by wallchart.events."""
+
+    id = AutoField()
+    event_id = IntegerField(unique=True)
+    # latest timestamp of all events up to ``event_id``
+    timestamp = DateTimeField(index=True)
+    state = BlobField()
+
+
+class ImportJob(db_wrapper.Model):
+    id = AutoField()
+    filename = CharField()
+    status = CharField(default="queued")
+    rows = IntegerField(default=0)
+    created = IntegerField(default=0)
+    updated = IntegerField(default=0)
+    deactivated = IntegerField(default=0)
+    unmapped = TextField(null=True)
+    error = TextField(null=True)
+    # "host:pid" of the process the job was queued in, see wallchart.jobs
+    owner = CharField(null=True)
+    added = DateTimeField(default=datetime.now)
+    started = DateTimeField(null=True)
+    finished = DateTimeField(null=True)
+
+    @property
+    def elapsed(self):
+        if not self.started:
+            return 0.0
+        return ((self.finished or datetime.now()) - self.started).total_seconds()
+
+
+class ImportHistory(db_wrapper.Model):
+    """Completed roster imports, written by wallchart.roster."""
+
+    id = AutoField()
+    filename = CharField(null=True)
+    mode = CharField()
+    # date the imported workers were stamped with, None if none changed
+    roster_date = DateField(null=True, index=True)
+    rows = IntegerField(default=0)
+    created = IntegerField(default=0)
+    updated = IntegerField(default=0)
+    deactivated = IntegerField(default=0)
+    finished = DateTimeField(default=datetime.now)
+
+
+class SchemaVersion(db_wrapper.Model):
+    """Migrations of wallchart.migrations applied to the database."""
+
+    version = IntegerField(primary_key=True)
+    name = CharField()
+    applied = DateTimeField(default=datetime.now)
+
+
+class DataVersion(db_wrapper.Model):
+    """Counters bumped on writes, shared by all processes using the database."""
+
+    name = CharField(primary_key=True)
+    version = IntegerField(default=0)
+
+
+class DepartmentCount(db_wrapper.Model):
+    """Active workers organized in a department, kept by wallchart.aggregates."""
+
+    department_id = IntegerField(primary_key=True)
+    workers = IntegerField(default=0)
+
+
+class ParticipationCount(db_wrapper.Model):
+    """Active workers of a department that took part in a structure test."""
+
+    department_id = IntegerField()
+    structure_test_id = IntegerField(index=True)
+    participants = IntegerField(default=0)
+
+    class Meta:
+        primary_key = CompositeKey("department_id", "structure_test_id")
+
+
+class WorkerSnapshot(db_wrapper.Model):
+    """``DepartmentCount`` of a day, written by wallchart.trends."""
+
+    day = DateField()
+    department_id = IntegerField()
+    workers = IntegerField(default=0)
+
+    class Meta:
+        primary_key = CompositeKey("day", "department_id")
+
+
+class ParticipationSnapshot(db_wrapper.Model):
+    """``ParticipationCount`` of a day, written by wallchart.trends."""
+
+    day = DateField()
+    department_id = IntegerField()
+    structure_test_id = IntegerField()
+    participants = IntegerField(default=0)
+
+    class Meta:
+        primary_key = CompositeKey("day", "department_id", "structure_test_id")
+
+
+class RowChange(db_wrapper.Model):
+    """Latest revision of every API row, written by triggers in wallchart.changes."""
+
+    resource = CharField()
+    row_id = IntegerField()
+    revision = IntegerField(index=True)
+    deleted = BooleanField(default=False)
+
+    class Meta:
+        primary_key = CompositeKey("resource", "row_id")
+        indexes = ((("resource", "revision"), False),)
+
+
+class WorkerSearch(FTS5Model):
+    """Full-text index of workers, kept in sync by triggers on ``worker``."""
+
+    rowid = RowIDField()
+    name = SearchField()
+    preferred_name = SearchField()
+    email = SearchField()
+    phone = SearchField()
+
+    class Meta:
+        database = db_wrapper.database
+        options = {"tokenize": "unicode61 remove_diacritics 2"}
 
 
 def create_tables():
+    from wallchart import aggregates, changes, events, migrations, reference, search
+
     with db_wrapper.database.connection_context():
+        fresh = not Worker.table_exists()
+        rebuild_aggregates = not DepartmentCount.table_exists()
+        seed_history = not fresh and not ImportHistory.table_exists()
+        seed_events = not fresh and not ParticipationEvent.table_exists()
+        SchemaVersion.create_table()
+        if fresh:
+            migrations.stamp()
+        else:
+            # same logger as app.logger, create_tables runs without app context
+            migrations.migrate(log=logging.getLogger("wallchart").info)
         db_wrapper.database.create_tables(
-            [Unit, Department, Worker, StructureTest, Participation]
+            [
+                Unit,
+                Department,
+                Worker,
+                StructureTest,
+                Participation,
+                ParticipationEvent,
+                ParticipationCheckpoint,
+                ImportJob,
+                ImportHistory,
+                DepartmentCount,
+                ParticipationCount,
+                WorkerSnapshot,
+                ParticipationSnapshot,
+                DataVersion,
+                RowChange,
+                SchemaVersion,
+            ]
         )
+        if rebuild_aggregates:
+            aggregates.rebuild()
+        if seed_history:
+            # date the roster of databases imported before the history existed
+            roster_date = (
+                Worker.select(fn.MAX(Worker.updated))
+                .where(Worker.contract.is_null() | (Worker.contract != "manual"))
+                .scalar()
+            )
+            if roster_date:
+                ImportHistory.create(mode="full", roster_date=roster_date)
+        if seed_events:
+            events.seed()
+        search.create_index()
+        changes.create_triggers()
+        reference.create_triggers()
         department, _ = Department.get_or_create(
             id=0,
             name="Admin",
@@ -84,6 +290,69 @@ def create_tables():
         )
 
 
+@db.cli.command("rebuild-aggregates")
+def rebuild_aggregates_command():
+    """Recompute the participation counts of the overview pages."""
+    from wallchart import aggregates
+
+    start = perf_counter()
+    aggregates.rebuild()
+    click.echo(f"Aggregates rebuilt in {perf_counter() - start:.2f}s")
+
+
+@db.cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    from wallchart import migrations
+
+    if not migrations.migrate(log=click.echo):
+        click.echo("Database schema is up to date")
+
+
+@db.cli.command("migrations")
+def migrations_command():
+    """List schema migrations and whether they are applied."""
+    from wallchart import migrations
+
+    applied = migrations.applied()
+    for version, name, _ in migrations.migrations():
+        state = "applied" if version in applied else "pending"
+        click.echo(f"{version:03} {name}: {state}")
+
+
+@db.cli.command("rebuild-search")
+def rebuild_search_command():
+    """Reindex all workers for the find worker page."""
+    from wallchart import search
+
+    search.rebuild_index()
+    click.echo("Search index rebuilt")
+
+
+@db.cli.command("snapshot")
+def snapshot_command():
+    """Store a compressed snapshot in BACKUP_FOLDER."""
+    from wallchart import backup
+
+    click.echo(f"Stored snapshot {backup.store_snapshot()}")
+
+
+@db.cli.command("check-aggregates")
+def check_aggregates_command():
+    """Compare the participation counts with the worker tables."""
+    from wallchart import aggregates
+
+    mismatches = aggregates.check()
+    for (department_id, structure_test_id), stored, actual in mismatches:
+        click.echo(
+            f"department {department_id} structure test {structure_test_id}: "
+            f"stored {stored}, actual {actual}"
+        )
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} aggregates are off")
+    click.echo("Aggregates are consistent")
+
+
 def close():
     if not db_wrapper.database.is_closed():
         db_wrapper.database.close()
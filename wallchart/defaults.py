@@ -1,3 +1,25 @@
 ADMIN_PASSWORD = "changeme"
 SECRET_KEY = "changeme"
 DATABASE = "wallcharts.db"
+DATABASE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 10000,
+    "cache_size": -16000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+DATABASE_MAX_CONNECTIONS = 8
+DATABASE_STALE_TIMEOUT = 300
+MAPPING_FILE = "mapping.yml"
+UPLOAD_FOLDER = None
+RESPONSE_CACHE_SIZE = 256
+BUILD_ID = None
+BACKUP_FOLDER = None
+BACKUP_INTERVAL = None
+BACKUP_RETENTION = 7
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = None
+SLOW_QUERY_BUFFER = 50
+TRENDS_INTERVAL = None
+CHECKPOINT_INTERVAL = 600
@@ -0,0 +1,268 @@
+"""Append-only log of participation changes and checkpoints of its state.
+
+Every checked or unchecked box appends an event, as does every participation
+deleted along with its worker or structure test. Every ``CHECKPOINT_INTERVAL``
+seconds a scheduler thread compacts the participation the events lead to into
+a new checkpoint, once ``CHECKPOINT_EVENTS`` events were appended since the
+latest one, so requests never pay for it. Only the latest ``CHECKPOINT_KEEP``
+checkpoints are kept. The participation at any moment is the latest checkpoint
+before it plus the events since replayed, moments before the oldest kept
+checkpoint replay the log from its start. Participations older than the log
+are seeded as events of the day they were added. Events are never changed or
+deleted.
+"""
+import json
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from peewee import Value, chunked, fn
+
+from wallchart import db_wrapper
+from wallchart.db import (
+    Participation,
+    ParticipationCheckpoint,
+    ParticipationEvent,
+    Worker,
+)
+
+CHECKPOINT_EVENTS = 1000
+
+# checkpoints kept, each holds the whole participation
+CHECKPOINT_KEEP = 20
+
+# rows per INSERT statement
+INSERT_BATCH = 100
+
+EVENT_FIELDS = [
+    ParticipationEvent.worker_id,
+    ParticipationEvent.structure_test_id,
+    ParticipationEvent.status,
+    ParticipationEvent.user_id,
+    ParticipationEvent.timestamp,
+]
+
+
+def pack(participation):
+    return zlib.compress(json.dumps(sorted(participation)).encode())
+
+
+def unpack(state):
+    return {tuple(key) for key in json.loads(zlib.decompress(bytes(state)))}
+
+
+def record(added, removed, user_id=None):
+    """Log ``(worker_id, structure_test_id)`` keys ``added`` and ``removed``."""
+    now = datetime.now()
+    rows = [(*key, True, user_id, now) for key in added] + [
+        (*key, False, user_id, now) for key in removed
+    ]
+    for batch in chunked(rows, INSERT_BATCH):
+        ParticipationEvent.insert_many(batch, fields=EVENT_FIELDS).execute()
+
+
+def record_removal(condition, user_id=None):
+    """Log the removal of all participations matching ``condition``.
+
+    Call it in the transaction deleting them, before they are deleted.
+    """
+    ParticipationEvent.insert_from(
+        Participation.select(
+            Participation.worker,
+            Participation.structure_test,
+            Value(False),
+            Value(user_id),
+            Value(datetime.now()),
+        )
+        .where(condition)
+        .order_by(Participation.id),
+        EVENT_FIELDS,
+    ).execute()
+
+
+def seed():
+    """Log every existing participation as added at midnight of its day."""
+    with db_wrapper.database.atomic("IMMEDIATE"):
+        ParticipationEvent.insert_from(
+            Participation.select(
+                Participation.worker,
+                Participation.structure_test,
+                Value(True),
+                Value(None),
+                fn.DATETIME(Participation.added),
+            ).order_by(Participation.added, Participation.id),
+            EVENT_FIELDS,
+        ).execute()
+        compact()
+
+
+def latest_checkpoint(moment=None):
+    """Latest checkpoint, limited to those not newer than ``moment``."""
+    query = ParticipationCheckpoint.select().order_by(
+        ParticipationCheckpoint.event_id.desc()
+    )
+    if moment is not None:
+        query = query.where(ParticipationCheckpoint.timestamp <= moment)
+    return query.first()
+
+
+def compact_if_due():
+    """Checkpoint once ``CHECKPOINT_EVENTS`` events piled up."""
+    latest = ParticipationEvent.select(fn.MAX(ParticipationEvent.id)).scalar() or 0
+    checkpointed = (
+        ParticipationCheckpoint.select(
+            fn.MAX(ParticipationCheckpoint.event_id)
+        ).scalar()
+        or 0
+    )
+    if latest - checkpointed >= CHECKPOINT_EVENTS:
+        return compact()
+    return None
+
+
+def compact():
+    """Checkpoint the participation after the latest event.
+
+    Only the events since the previous checkpoint are replayed onto it,
+    checkpoints beyond the latest ``CHECKPOINT_KEEP`` are deleted. Returns the
+    new checkpoint, ``None`` if there were no new events.
+    """
+    # take the write lock up front, see wallchart.roster
+    with db_wrapper.database.atomic("IMMEDIATE"):
+        checkpoint = latest_checkpoint()
+        if checkpoint is None:
+            participation, event_id, timestamp = set(), 0, None
+        else:
+            participation = unpack(checkpoint.state)
+            event_id, timestamp = checkpoint.event_id, checkpoint.timestamp
+
+        events = (
+            ParticipationEvent.select(
+                ParticipationEvent.id,
+                ParticipationEvent.worker_id,
+                ParticipationEvent.structure_test_id,
+                ParticipationEvent.status,
+                ParticipationEvent.timestamp,
+            )
+            .where(ParticipationEvent.id > event_id)
+            .order_by(ParticipationEvent.id)
+            .tuples()
+            .iterator()
+        )
+        latest = event_id
+        for latest, worker_id, structure_test_id, status, event_timestamp in events:
+            replay(participation, (worker_id, structure_test_id), status)
+            if timestamp is None or event_timestamp > timestamp:
+                timestamp = event_timestamp
+        if latest == event_id:
+            return None
+        checkpoint = ParticipationCheckpoint.create(
+            event_id=latest, timestamp=timestamp, state=pack(participation)
+        )
+        prune()
+        return checkpoint
+
+
+def prune():
+    """Delete all but the latest ``CHECKPOINT_KEEP`` checkpoints."""
+    oldest_kept = (
+        ParticipationCheckpoint.select(ParticipationCheckpoint.event_id)
+        .order_by(ParticipationCheckpoint.event_id.desc())
+        .offset(CHECKPOINT_KEEP - 1)
+        .limit(1)
+        .scalar()
+    )
+    if oldest_kept is not None:
+        ParticipationCheckpoint.delete().where(
+            ParticipationCheckpoint.event_id < oldest_kept
+        ).execute()
+
+
+def replay(participation, key, status):
+    if status:
+        participation.add(key)
+    else:
+        participation.discard(key)
+
+
+def organized_at(department_id, day):
+    """Workers organized in ``department_id`` at the end of ``day``.
+
+    Past rosters are not stored, a worker counts from the day it was added
+    until the last roster listing it. Department moves are not recorded, so
+    workers are found in the department they are organized in today.
+    """
+    return Worker.select().where(
+        (Worker.organizing_dept_id == department_id)
+        & (Worker.added <= day)
+        & ((Worker.active == True) | (Worker.updated >= day))
+    )
+
+
+def participation_at(moment, department_id=None):
+    """``(worker_id, structure_test_id)`` keys participating at ``moment``.
+
+    Replays the events up to ``moment`` onto the latest checkpoint before it,
+    never past the next checkpoint. ``department_id`` limits the result to
+    the workers organized in that department today.
+    """
+    checkpoint = latest_checkpoint(moment)
+    if checkpoint is None:
+        participation, event_id = set(), 0
+    else:
+        participation, event_id = unpack(checkpoint.state), checkpoint.event_id
+
+    events = (
+        ParticipationEvent.select(
+            ParticipationEvent.worker_id,
+            ParticipationEvent.structure_test_id,
+            ParticipationEvent.status,
+        )
+        .where(
+            (ParticipationEvent.id > event_id)
+            & (ParticipationEvent.timestamp <= moment)
+        )
+        .order_by(ParticipationEvent.id)
+    )
+    following = (
+        ParticipationCheckpoint.select(fn.MIN(ParticipationCheckpoint.event_id))
+        .where(ParticipationCheckpoint.event_id > event_id)
+        .scalar()
+    )
+    if following is not None:
+        # events after it are newer than its timestamp, which is after moment
+        events = events.where(ParticipationEvent.id <= following)
+    if department_id is not None:
+        # a subquery rather than one bound parameter per worker
+        workers = Worker.select(Worker.id).where(
+            Worker.organizing_dept_id == department_id
+        )
+        events = events.where(ParticipationEvent.worker_id.in_(workers))
+        worker_ids = {worker_id for (worker_id,) in workers.tuples()}
+        participation = {key for key in participation if key[0] in worker_ids}
+
+    for worker_id, structure_test_id, status in events.tuples():
+        replay(participation, (worker_id, structure_test_id), status)
+    return participation
+
+
+def start_scheduler(app):
+    """Compact the log every ``CHECKPOINT_INTERVAL`` seconds in a daemon thread.
+
+    Started by ``wallchart.start_schedulers`` in a single process per host.
+    """
+    interval = app.config["CHECKPOINT_INTERVAL"]
+
+    def run():
+        while True:
+            try:
+                with app.app_context(), db_wrapper.database.connection_context():
+                    compact_if_due()
+            except Exception:
+                app.logger.exception("Participation checkpoint failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="wallchart-checkpoints", daemon=True)
+    thread.start()
+    return thread
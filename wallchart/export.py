@@ -0,0 +1,147 @@
+"""Wallcharts of all departments as CSV or XLSX files.
+
+Workers and their participation come from a single query ordered by
+department, which is grouped while iterating, so memory stays bounded
+however large the roster is. XLSX export needs the optional XlsxWriter
+package, its constant memory mode flushes every row to disk once written.
+"""
+import csv
+import io
+import os
+import re
+import tempfile
+
+from peewee import JOIN, fn
+
+from wallchart.backup import chunks
+from wallchart.db import Department, Participation, Worker
+
+try:
+    import xlsxwriter
+except ImportError:  # pragma: no cover
+    xlsxwriter = None
+
+FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+COLUMNS = ("Name", "Preferred name", "Pronouns", "Email", "Phone", "Contract")
+
+# rows written to the CSV buffer before it is handed out as one chunk
+CSV_CHUNK_ROWS = 200
+
+# characters Excel does not allow in sheet names, which are at most 31 long
+SHEET_NAME_INVALID = re.compile(r"[\[\]:*?/\\]")
+SHEET_NAME_LENGTH = 31
+
+
+def wallchart_rows(structure_tests, department_id=None):
+    """``(department name, row)`` of active workers, ordered by department.
+
+    Every row holds the ``COLUMNS`` followed by an ``x`` for each of
+    ``structure_tests`` the worker participated in.
+    """
+    participated = fn.group_concat(Participation.structure_test)
+    query = (
+        Worker.select(
+            Department.name,
+            Worker.name,
+            Worker.preferred_name,
+            Worker.pronouns,
+            Worker.email,
+            Worker.phone,
+            Worker.contract,
+            participated,
+        )
+        .join(Department, on=(Worker.organizing_dept_id == Department.id))
+        .join_from(
+            Worker,
+            Participation,
+            JOIN.LEFT_OUTER,
+            on=(Participation.worker == Worker.id),
+        )
+        .where(Worker.active == True)
+        .group_by(Worker.id)
+        .order_by(Department.name, Worker.name)
+    )
+    if department_id is not None:
+        query = query.where(Worker.organizing_dept_id == department_id)
+
+    test_ids = [structure_test.id for structure_test in structure_tests]
+    for department, *worker, participation in query.tuples().iterator():
+        # a single ID comes back as an integer
+        done = set(str(participation).split(",")) if participation else set()
+        yield department, [value or "" for value in worker] + [
+            "x" if str(test_id) in done else "" for test_id in test_ids
+        ]
+
+
+def header(structure_tests):
+    return list(COLUMNS) + [structure_test.name for structure_test in structure_tests]
+
+
+def csv_chunks(structure_tests, rows):
+    """CSV text of ``wallchart_rows`` with a leading department column."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Department"] + header(structure_tests))
+    for number, (department, row) in enumerate(rows, 1):
+        writer.writerow([department] + row)
+        if number % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def sheet_name(department, used):
+    name = SHEET_NAME_INVALID.sub(" ", department)[:SHEET_NAME_LENGTH]
+    number = 1
+    candidate = name
+    # names are unique ignoring case
+    while candidate.lower() in used:
+        number += 1
+        suffix = f" ({number})"
+        candidate = name[: SHEET_NAME_LENGTH - len(suffix)] + suffix
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_xlsx(structure_tests, rows, path):
+    """Write ``wallchart_rows`` to ``path``, one worksheet per department."""
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    bold = workbook.add_format({"bold": True})
+    columns = header(structure_tests)
+    used = set()
+    sheet = current = None
+    row_number = 0
+    for department, row in rows:
+        if department != current:
+            current = department
+            sheet = workbook.add_worksheet(sheet_name(department, used))
+            sheet.write_row(0, 0, columns, bold)
+            sheet.freeze_panes(1, 1)
+            row_number = 0
+        row_number += 1
+        sheet.write_row(row_number, 0, row)
+    if sheet is None:
+        workbook.add_worksheet("Wallchart").write_row(0, 0, columns, bold)
+    workbook.close()
+
+
+def temporary_xlsx(structure_tests, rows):
+    """Write ``rows`` to a temporary XLSX file and return its path."""
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        write_xlsx(structure_tests, rows, path)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def stream_file(path):
+    with open(path, "rb") as export_file:
+        yield from chunks(export_file)
@@ -0,0 +1,233 @@
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from flask import current_app
+
+from wallchart import db_wrapper
+from wallchart.db import ImportJob
+from wallchart.roster import ImportStats
+from wallchart.util import parse_csv
+
+# A single worker thread keeps imports strictly sequential, SQLite only allows
+# one writer at a time anyway.
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wallchart-import")
+
+# Live counters of imports running in this process, keyed by job ID. The
+# import runs in a single transaction, so other connections only see the job
+# row change once it finished. Other processes, such as sibling server
+# workers, read the counters from the progress file next to the spool file.
+running = {}
+futures = {}
+
+# seconds between writes of the progress file
+PROGRESS_INTERVAL = 1.0
+
+COUNTERS = ("rows", "created", "updated", "deactivated")
+
+
+def spool_folder():
+    folder = current_app.config["UPLOAD_FOLDER"] or Path(
+        current_app.instance_path, "uploads"
+    )
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    return Path(folder)
+
+
+def spool_path(job_id):
+    return spool_folder() / f"{job_id}.csv"
+
+
+def progress_path(job_id):
+    return spool_folder() / f"{job_id}.progress"
+
+
+def remove_spool(job_id):
+    for path in (spool_path(job_id), progress_path(job_id)):
+        # missing_ok needs Python 3.8
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def write_progress(path, stats):
+    # replaced in one step, readers never see a partly written file
+    partial = path.with_suffix(".partial")
+    partial.write_text(json.dumps({name: getattr(stats, name) for name in COUNTERS}))
+    os.replace(partial, path)
+
+
+def read_progress(job_id):
+    """Counters written by the process running the job, ``None`` if there are none."""
+    try:
+        return json.loads(progress_path(job_id).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def report_progress(path, stats, done):
+    """Write the counters of ``stats`` to ``path`` until ``done`` is set."""
+    while not done.wait(PROGRESS_INTERVAL):
+        write_progress(path, stats)
+
+
+def owner():
+    """Identifies this process in ``ImportJob.owner``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # exists, but belongs to another user
+        return True
+    return True
+
+
+def orphaned(job):
+    """Whether the process that queued ``job`` is gone.
+
+    Jobs of other hosts sharing the database cannot be checked and are left
+    alone. This process only owns the jobs it still has futures for, the pid
+    may be reused by a restarted server.
+    """
+    host, _, pid = (job.owner or "").rpartition(":")
+    if not pid.isdigit():
+        return True
+    if host != socket.gethostname():
+        return False
+    if int(pid) == os.getpid():
+        return job.id not in futures
+    return not process_alive(int(pid))
+
+
+def submit_import(upload, diff=False):
+    """Spool an uploaded roster to disk and queue it for import."""
+    job = ImportJob.create(filename=upload.filename, owner=owner())
+    upload.save(spool_path(job.id))
+    future = executor.submit(
+        run_import, current_app._get_current_object(), job.id, diff
+    )
+    futures[job.id] = future
+    future.add_done_callback(lambda _: futures.pop(job.id, None))
+    return job
+
+
+def run_import(app, job_id, diff=False):
+    with app.app_context(), db_wrapper.database.connection_context():
+        path = spool_path(job_id)
+        filename = ImportJob.get_by_id(job_id).filename
+        stats = running[job_id] = ImportStats()
+        progress = progress_path(job_id)
+        write_progress(progress, stats)
+        ImportJob.update(status="running", started=datetime.now()).where(
+            ImportJob.id == job_id
+        ).execute()
+
+        done = threading.Event()
+        reporter = threading.Thread(
+            target=report_progress,
+            args=(progress, stats, done),
+            name=f"wallchart-import-progress-{job_id}",
+            daemon=True,
+        )
+        reporter.start()
+        try:
+            with open(path, "rb") as roster_file:
+                parse_csv(roster_file, stats=stats, diff=diff, filename=filename)
+            status, error = "done", None
+        except Exception as exc:
+            app.logger.exception("Import job %s failed", job_id)
+            status, error = "failed", str(exc)
+        finally:
+            done.set()
+            reporter.join()
+            running.pop(job_id, None)
+            remove_spool(job_id)
+
+        ImportJob.update(
+            status=status,
+            error=error,
+            finished=datetime.now(),
+            rows=stats.rows,
+            created=stats.created,
+            updated=stats.updated,
+            deactivated=stats.deactivated,
+            unmapped="\n".join(sorted(stats.unmapped)) or None,
+        ).where(ImportJob.id == job_id).execute()
+
+        if stats.unmapped:
+            app.logger.warning(
+                "Import job %s: %d sections missing in mapping: %s",
+                job_id,
+                len(stats.unmapped),
+                ", ".join(sorted(stats.unmapped)),
+            )
+
+
+def fail_interrupted(app):
+    """Mark jobs left queued or running by a stopped process as failed.
+
+    Their threads died with the process, they would stay pending forever.
+    Jobs of processes still running, such as sibling server workers, are kept.
+    """
+    with app.app_context(), db_wrapper.database.connection_context():
+        job_ids = [
+            job.id
+            for job in ImportJob.select(ImportJob.id, ImportJob.owner).where(
+                ImportJob.status.in_(("queued", "running"))
+            )
+            if orphaned(job)
+        ]
+        for job_id in job_ids:
+            ImportJob.update(
+                status="failed",
+                error="Interrupted by a server restart, upload the roster again",
+                finished=datetime.now(),
+            ).where(ImportJob.id == job_id).execute()
+            app.logger.warning("Import job %s was interrupted", job_id)
+            remove_spool(job_id)
+    return job_ids
+
+
+def wait(job_id, timeout=None):
+    """Block until the job finished, used by tests and CLI callers."""
+    future = futures.get(job_id)
+    if future:
+        future.result(timeout)
+
+
+def job_status(job):
+    status = dict(
+        id=job.id,
+        filename=job.filename,
+        status=job.status,
+        rows=job.rows,
+        created=job.created,
+        updated=job.updated,
+        deactivated=job.deactivated,
+        error=job.error,
+        unmapped=job.unmapped.splitlines() if job.unmapped else [],
+        elapsed=round(job.elapsed, 1),
+    )
+
+    stats = running.get(job.id)
+    if stats:
+        status.update(
+            status="running", **{name: getattr(stats, name) for name in COUNTERS}
+        )
+    elif job.status == "running":
+        # running in another process
+        progress = read_progress(job.id)
+        if progress:
+            status.update({name: progress.get(name, 0) for name in COUNTERS})
+
+    return status
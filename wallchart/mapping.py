@@ -0,0 +1,71 @@
+import re
+from pathlib import Path
+
+import yaml
+
+# Spellings found in roster section names, all normalized to one form so
+# "DEPARTMENT OF MUSIC" and "DEPT OF MUSIC" share a key.
+ABBREVIATIONS = {
+    "AND": "&",
+    "CENTER": "CTR",
+    "COLLEGE": "C",
+    "DEPARTMENT": "DEPT",
+    "EDUCATION": "EDUC",
+    "ENGINEERING": "ENGINRG",
+    "OFFICE": "OFF",
+    "PROGRAM": "PROG",
+    "SCHOOL": "SCH",
+    "SCIENCE": "SCI",
+}
+
+_separators = re.compile(r"[\s,.]+")
+
+
+def normalize(name):
+    """Hash key of a section or department name."""
+    name = name.upper().replace("&", " & ")
+    return " ".join(
+        ABBREVIATIONS.get(token, token) for token in _separators.split(name) if token
+    )
+
+
+class DepartmentMapping:
+    """Index of ``mapping.yml`` translating roster sections to departments."""
+
+    def __init__(self, mapping=None):
+        self.index = {}
+        for section, department in (mapping or {}).items():
+            # departments map to themselves, so rosters may use either name
+            self.index.setdefault(normalize(department), department)
+            self.index[normalize(section)] = department
+
+    def resolve(self, *names):
+        """Return the department of the first mapped name or ``None``."""
+        for name in names:
+            if name:
+                department = self.index.get(normalize(name))
+                if department:
+                    return department
+        return None
+
+
+_cache = {}
+
+
+def load_mapping(path):
+    """Load a mapping file, reusing the compiled index until the file changes.
+
+    A missing file raises ``FileNotFoundError``, importing without the mapping
+    would move workers of every mapped section into departments of their own.
+    """
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path) as mapping_file:
+        mapping = DepartmentMapping((yaml.safe_load(mapping_file) or {}).get("mapping"))
+    _cache[path] = (mtime, mapping)
+    return mapping
@@ -0,0 +1,61 @@
+from base64 import b64encode
+
+from wallchart import db_wrapper
+from wallchart.db import Participation, StructureTest, Worker
+
+
+def bitset(positions, size):
+    """Base64 encoded bitset of ``size`` bits with ``positions`` set.
+
+    Bit ``i`` is ``byte[i // 8] & (1 << i % 8)``.
+    """
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position // 8] |= 1 << position % 8
+    return b64encode(bits).decode()
+
+
+def participation_matrix(department_id=None):
+    """Participation of active workers in every structure test.
+
+    Workers are listed by ID, each structure test maps to a bitset whose bit
+    ``i`` tells whether ``workers[i]`` participated. ``department_id`` limits
+    the matrix to the workers organized in that department.
+    """
+    organized = Worker.active == True
+    if department_id is not None:
+        organized &= Worker.organizing_dept_id == department_id
+
+    # one read transaction, so all queries see the same snapshot
+    with db_wrapper.database.atomic():
+        workers = [
+            worker_id
+            for (worker_id,) in Worker.select(Worker.id)
+            .where(organized)
+            .order_by(Worker.id)
+            .tuples()
+        ]
+        index = {worker_id: position for position, worker_id in enumerate(workers)}
+
+        participants = {
+            structure_test_id: []
+            for (structure_test_id,) in StructureTest.select(StructureTest.id).tuples()
+        }
+        participation = (
+            Participation.select(Participation.structure_test, Participation.worker)
+            .join(Worker, on=(Participation.worker == Worker.id))
+            .where(organized)
+            .tuples()
+        )
+        for structure_test_id, worker_id in participation:
+            # skip rows of structure tests deleted without their participation
+            if structure_test_id in participants and worker_id in index:
+                participants[structure_test_id].append(index[worker_id])
+
+    return dict(
+        workers=workers,
+        structure_tests={
+            structure_test_id: bitset(positions, len(workers))
+            for structure_test_id, positions in participants.items()
+        },
+    )
@@ -0,0 +1,165 @@
+"""Per request query counts and timings, exported at ``/metrics``.
+
+The database engines below time every statement and add it to the request
+being handled. Statement times cover executing the statement and fetching the
+first row, rows fetched later by iterating the cursor are not included.
+"""
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter
+
+import peewee
+from flask import Response, abort, current_app, g, has_request_context, request
+from playhouse import pool
+
+from wallchart import slow_queries
+from wallchart.util import is_admin, login_required
+
+# upper bounds in seconds of the request latency histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class InstrumentedDatabase:
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return super().execute_sql(sql, params, *args, **kwargs)
+        finally:
+            duration = perf_counter() - start
+            record_query(sql, params, duration)
+            slow_queries.check(self, sql, params, duration)
+
+
+class SqliteDatabase(InstrumentedDatabase, peewee.SqliteDatabase):
+    pass
+
+
+class PooledSqliteDatabase(InstrumentedDatabase, pool.PooledSqliteDatabase):
+    pass
+
+
+def record_query(sql, params, duration):
+    if has_request_context() and "query_count" in g:
+        g.query_count += 1
+        g.query_time += duration
+
+
+class Metrics:
+    """Request counters of this process, each worker process keeps its own."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(lambda: [0] * len(BUCKETS))
+        self.latency_sum = defaultdict(float)
+        self.latency_count = defaultdict(int)
+        self.queries = defaultdict(int)
+        self.query_time = defaultdict(float)
+
+    def observe(self, endpoint, method, status, duration, queries, query_time):
+        with self.lock:
+            self.requests[endpoint, method, status] += 1
+            buckets = self.latency[endpoint]
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+            self.latency_sum[endpoint] += duration
+            self.latency_count[endpoint] += 1
+            self.queries[endpoint] += queries
+            self.query_time[endpoint] += query_time
+
+    def render(self):
+        """Prometheus text exposition of all counters."""
+        with self.lock:
+            lines = [
+                "# HELP wallchart_requests_total Requests handled.",
+                "# TYPE wallchart_requests_total counter",
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'wallchart_requests_total{{endpoint="{endpoint}",'
+                    f'method="{method}",status="{status}"}} {count}'
+                )
+
+            lines += [
+                "# HELP wallchart_request_duration_seconds Request latency.",
+                "# TYPE wallchart_request_duration_seconds histogram",
+            ]
+            for endpoint, buckets in sorted(self.latency.items()):
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(BUCKETS, buckets):
+                    lines.append(
+                        f"wallchart_request_duration_seconds_bucket"
+                        f'{{{label},le="{bound}"}} {count}'
+                    )
+                count = self.latency_count[endpoint]
+                lines += [
+                    f'wallchart_request_duration_seconds_bucket{{{label},le="+Inf"}} '
+                    f"{count}",
+                    f"wallchart_request_duration_seconds_sum{{{label}}} "
+                    f"{self.latency_sum[endpoint]:.6f}",
+                    f"wallchart_request_duration_seconds_count{{{label}}} {count}",
+                ]
+
+            lines += [
+                "# HELP wallchart_queries_total SQL statements executed.",
+                "# TYPE wallchart_queries_total counter",
+            ]
+            lines += [
+                f'wallchart_queries_total{{endpoint="{endpoint}"}} {count}'
+                for endpoint, count in sorted(self.queries.items())
+            ]
+
+            lines += [
+                "# HELP wallchart_query_seconds_total Time spent in SQLite.",
+                "# TYPE wallchart_query_seconds_total counter",
+            ]
+            lines += [
+                f'wallchart_query_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}'
+                for endpoint, seconds in sorted(self.query_time.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def metrics():
+    return current_app.extensions["metrics"]
+
+
+def start_request():
+    g.request_start = perf_counter()
+    g.query_count = 0
+    g.query_time = 0.0
+
+
+def finish_request(response):
+    if "request_start" not in g:
+        return response
+    duration = perf_counter() - g.request_start
+    metrics().observe(
+        request.endpoint or "none",
+        request.method,
+        response.status_code,
+        duration,
+        g.query_count,
+        g.query_time,
+    )
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={g.query_time * 1000:.2f};desc="{g.query_count} queries", '
+        f"app;dur={duration * 1000:.2f}",
+    )
+    return response
+
+
+@login_required
+def metrics_view():
+    if not is_admin():
+        abort(403)
+    return Response(metrics().render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.extensions["metrics"] = Metrics()
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,101 @@
+"""Schema migrations of existing databases.
+
+Every ``vNNN_name.py`` module in this package is one migration, applied in
+order of ``NNN`` and recorded in the ``schemaversion`` table. A module defines
+``up(database)``, which runs in a transaction of its own. Modules setting
+``BATCHED = True`` manage transactions themselves, typically through
+``in_batches``, so rewriting a large table never locks out writers for long.
+Batched migrations must be safe to run again after an interruption.
+
+Migrations only change tables which already exist, new tables and indexes are
+created by ``create_tables`` after all migrations ran.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+
+from peewee import fn
+
+from wallchart import db_wrapper
+from wallchart.db import SchemaVersion
+
+BATCH_SIZE = 500
+
+
+def migrations():
+    """``(version, name, module)`` of all migrations in order."""
+    found = []
+    for module in pkgutil.iter_modules(__path__):
+        prefix, _, name = module.name.partition("_")
+        if prefix.startswith("v") and prefix[1:].isdigit():
+            found.append((int(prefix[1:]), name, module.name))
+    return [
+        (version, name, importlib.import_module(f"{__name__}.{module}"))
+        for version, name, module in sorted(found)
+    ]
+
+
+def applied():
+    return {
+        version for (version,) in SchemaVersion.select(SchemaVersion.version).tuples()
+    }
+
+
+def pending():
+    done = applied()
+    return [migration for migration in migrations() if migration[0] not in done]
+
+
+def record(version, name):
+    SchemaVersion.insert(
+        version=version, name=name, applied=datetime.now()
+    ).on_conflict_ignore().execute()
+
+
+def stamp():
+    """Mark all migrations as applied, used for freshly created databases."""
+    with db_wrapper.database.atomic():
+        for version, name, _ in migrations():
+            record(version, name)
+
+
+def migrate(log=print):
+    """Apply all pending migrations, returns the applied versions."""
+    database = db_wrapper.database.obj
+    done = []
+    for version, name, module in pending():
+        log(f"Applying migration {version} {name}")
+        if getattr(module, "BATCHED", False):
+            module.up(database)
+            record(version, name)
+        else:
+            with database.atomic("IMMEDIATE"):
+                # another process may have applied it meanwhile
+                if version in applied():
+                    continue
+                module.up(database)
+                record(version, name)
+        done.append(version)
+    return done
+
+
+def in_batches(model, update, batch_size=BATCH_SIZE):
+    """Call ``update(first_id, last_id)`` for consecutive ID ranges of ``model``.
+
+    Every range is updated in a short transaction of its own, so other
+    connections may write in between. Returns the number of batches.
+    """
+    database = db_wrapper.database.obj
+    primary_key = model._meta.primary_key
+    low, high = model.select(fn.MIN(primary_key), fn.MAX(primary_key)).scalar(
+        as_tuple=True
+    )
+    if low is None:
+        return 0
+
+    batches = 0
+    for first_id in range(low, high + 1, batch_size):
+        with database.atomic("IMMEDIATE"):
+            update(first_id, first_id + batch_size - 1)
+        batches += 1
+    return batches
@@ -0,0 +1,28 @@
+"""Columns added by hand with the former ``migrate.py`` script."""
+from datetime import date
+
+from peewee import CharField, DateField, IntegerField, TextField
+from playhouse.migrate import SqliteMigrator
+
+
+def up(database):
+    migrator = SqliteMigrator(database)
+
+    def add_missing(table, name, field):
+        if name not in {column.name for column in database.get_columns(table)}:
+            migrator.add_column(table, name, field).run()
+
+    add_missing("department", "alias", CharField(null=True))
+    add_missing("participation", "added", DateField(default=date.today))
+    add_missing("worker", "password", TextField(null=True))
+    add_missing("worker", "unit_chair_id", IntegerField(null=True))
+    add_missing("worker", "dept_chair_id", IntegerField(null=True))
+
+    not_null = {
+        column.name
+        for column in database.get_columns("worker")
+        if not column.null and not column.primary_key
+    }
+    for name in ("organizing_dept_id", "unit", "contract", "department_id"):
+        if name in not_null:
+            migrator.drop_not_null("worker", name).run()
@@ -0,0 +1,39 @@
+"""Store all phone numbers in the national format the worker form writes."""
+import phonenumbers
+from peewee import IntegrityError
+
+from wallchart import db_wrapper
+from wallchart.db import Worker
+from wallchart.migrations import in_batches
+
+BATCHED = True
+
+
+def national(phone):
+    try:
+        number = phonenumbers.parse(str(phone), "US")
+    except phonenumbers.NumberParseException:
+        return phone
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.NATIONAL)
+
+
+def convert(first_id, last_id):
+    workers = (
+        Worker.select(Worker.id, Worker.phone)
+        .where(Worker.id.between(first_id, last_id) & Worker.phone.is_null(False))
+        .tuples()
+    )
+    for worker_id, phone in list(workers):
+        formatted = national(phone)
+        if formatted == phone:
+            continue
+        try:
+            with db_wrapper.database.atomic():
+                Worker.update(phone=formatted).where(Worker.id == worker_id).execute()
+        except IntegrityError:
+            # another worker already has the number, keep this one as it was
+            pass
+
+
+def up(database):
+    in_batches(Worker, convert)
@@ -0,0 +1,12 @@
+"""Record the process running an import job."""
+from peewee import CharField
+from playhouse.migrate import SqliteMigrator
+
+
+def up(database):
+    if not database.table_exists("importjob"):
+        return
+    if "owner" not in {column.name for column in database.get_columns("importjob")}:
+        SqliteMigrator(database).add_column(
+            "importjob", "owner", CharField(null=True)
+        ).run()
@@ -0,0 +1,5 @@
+"""Drop the index on worker passwords, no query looks them up."""
+
+
+def up(database):
+    database.execute_sql("DROP INDEX IF EXISTS worker_password")
@@ -0,0 +1,97 @@
+from collections import Counter
+
+from peewee import Tuple, chunked
+
+from wallchart import aggregates, db_wrapper, events
+from wallchart.db import Participation, StructureTest, Worker
+from wallchart.roster import CHUNK_SIZE
+
+
+def coalesce(changes):
+    """Reduce ``changes`` to the final status per worker and structure test.
+
+    ``changes`` are dicts with ``worker``, ``structure_test`` and ``status``
+    keys in the order they were made, so a box clicked twice cancels out.
+    """
+    final = {}
+    for change in changes:
+        key = (int(change["worker"]), int(change["structure_test"]))
+        final[key] = bool(int(change["status"]))
+    return final
+
+
+def workers_of(changes):
+    """``{worker_id: (organizing_dept_id, active)}`` of workers in ``changes``."""
+    workers = {}
+    for batch in chunked({worker_id for worker_id, _ in changes}, CHUNK_SIZE):
+        workers.update(
+            (worker_id, (organizing_dept_id, active))
+            for worker_id, organizing_dept_id, active in Worker.select(
+                Worker.id, Worker.organizing_dept_id, Worker.active
+            )
+            .where(Worker.id.in_(batch))
+            .tuples()
+        )
+    return workers
+
+
+def unknown_structure_tests(changes):
+    structure_tests = {structure_test_id for _, structure_test_id in changes}
+    known = set()
+    for batch in chunked(structure_tests, CHUNK_SIZE):
+        known.update(
+            structure_test_id
+            for (structure_test_id,) in StructureTest.select(StructureTest.id)
+            .where(StructureTest.id.in_(batch))
+            .tuples()
+        )
+    return structure_tests - known
+
+
+def apply_changes(changes, workers, user_id=None):
+    """Write coalesced ``changes`` in one transaction.
+
+    Only boxes whose status differs from the database are written, repeated
+    or concurrent clicks are no-ops instead of unique constraint errors.
+    ``workers`` is the result of ``workers_of(changes)``, the written changes
+    are logged for ``user_id``. Returns the number of participation rows
+    added and removed.
+    """
+    counts = Counter()
+    with db_wrapper.database.atomic("IMMEDIATE"):
+        # batched to stay below SQLite's limit of bound parameters, see
+        # wallchart.roster
+        existing = set()
+        for batch in chunked(workers, CHUNK_SIZE):
+            existing.update(
+                Participation.select(Participation.worker, Participation.structure_test)
+                .where(Participation.worker.in_(batch))
+                .tuples()
+            )
+        added = [
+            key for key, status in changes.items() if status and key not in existing
+        ]
+        removed = [
+            key for key, status in changes.items() if not status and key in existing
+        ]
+
+        for batch in chunked(added, CHUNK_SIZE):
+            Participation.insert_many(
+                batch, fields=[Participation.worker, Participation.structure_test]
+            ).on_conflict_ignore().execute()
+        for batch in chunked(removed, CHUNK_SIZE):
+            Participation.delete().where(
+                Tuple(Participation.worker, Participation.structure_test).in_(batch)
+            ).execute()
+        events.record(added, removed, user_id)
+
+        for delta, keys in ((1, added), (-1, removed)):
+            for worker_id, structure_test_id in keys:
+                department_id = aggregates.counted_department(workers[worker_id])
+                if department_id is not None:
+                    counts[department_id, structure_test_id] += delta
+        for (department_id, structure_test_id), delta in counts.items():
+            if delta:
+                aggregates.count_participation(department_id, structure_test_id, delta)
+
+    return len(added), len(removed)
@@ -0,0 +1,98 @@
+"""Units, departments, structure tests and the roster date, cached per process.
+
+They change rarely but nearly every page shows them. Triggers bump the
+``reference`` row of ``dataversion`` on every write to their tables, so all
+processes reload their copy on the next request after any of them wrote.
+Cached rows are shared between requests and must not be modified.
+"""
+from threading import Lock
+
+from flask import current_app
+from peewee import fn
+
+from wallchart import db_wrapper
+from wallchart.db import DataVersion, Department, ImportHistory, StructureTest, Unit
+
+TABLES = ("unit", "department", "structuretest", "importhistory")
+
+BUMP_VERSION = """
+    INSERT INTO dataversion (name, version) VALUES ('reference', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;"""
+
+
+def create_triggers():
+    """Bump the reference data version on every write to its tables."""
+    for table in TABLES:
+        for event in ("insert", "update", "delete"):
+            db_wrapper.database.execute_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_reference_{event} "
+                f"AFTER {event.upper()} ON {table} BEGIN {BUMP_VERSION} END"
+            )
+
+
+def reference_version():
+    return (
+        DataVersion.select(DataVersion.version)
+        .where(DataVersion.name == "reference")
+        .scalar()
+        or 0
+    )
+
+
+class ReferenceData:
+    """Sorted lists and ``id`` indexes of all reference rows."""
+
+    def __init__(self, version):
+        self.version = version
+        self.units = list(Unit.select().order_by(Unit.name))
+        self.departments = list(Department.select().order_by(Department.name))
+        self.structure_tests = list(
+            StructureTest.select().order_by(StructureTest.added, StructureTest.id)
+        )
+        # workers of the latest roster import carry this date
+        self.last_updated = ImportHistory.select(
+            fn.MAX(ImportHistory.roster_date)
+        ).scalar()
+        self.unit_by_id = {unit.id: unit for unit in self.units}
+        self.department_by_id = {
+            department.id: department for department in self.departments
+        }
+        self.structure_test_by_id = {
+            structure_test.id: structure_test for structure_test in self.structure_tests
+        }
+
+    @property
+    def latest_structure_test(self):
+        """Most recently created structure test, ``None`` if there is none."""
+        return max(
+            self.structure_tests,
+            key=lambda structure_test: structure_test.id,
+            default=None,
+        )
+
+
+class ReferenceCache:
+    def __init__(self):
+        self.lock = Lock()
+        self.data = None
+
+    def get(self):
+        # read the version first, a concurrent write then reloads next time
+        version = reference_version()
+        with self.lock:
+            if self.data is None or self.data.version != version:
+                self.data = ReferenceData(version)
+            return self.data
+
+    def clear(self):
+        with self.lock:
+            self.data = None
+
+
+def init_app(app):
+    app.extensions["reference_data"] = ReferenceCache()
+
+
+def reference_data():
+    """Current reference data, costs one query unless it changed."""
+    return current_app.extensions["reference_data"].get()
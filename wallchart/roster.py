@@ -0,0 +1,295 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from time import perf_counter
+
+from peewee import chunked
+from slugify import slugify
+
+from wallchart import aggregates, db_wrapper
+from wallchart.cache import bump_version
+from wallchart.db import Department, ImportHistory, Unit, Worker
+from wallchart.mapping import DepartmentMapping
+
+# Rows per INSERT statement. Each worker row binds 7 parameters, so this stays
+# well below SQLite's default limit of 999 host parameters per statement.
+CHUNK_SIZE = 100
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    deactivated: int = 0
+    # roster sections missing in mapping.yml, with their number of rows
+    unmapped: dict = field(default_factory=dict)
+    # seconds spent in each phase of the import, in order
+    timings: dict = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + perf_counter() - start
+
+
+class _Lookup:
+    """Resolve units or departments by name, creating missing ones on demand.
+
+    All existing rows are loaded once so every roster row costs a dictionary
+    lookup instead of a ``get_or_create`` round-trip.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.by_name = {obj.name: obj for obj in model.select()}
+
+    def get(self, name, slug, **defaults):
+        obj = self.by_name.get(name)
+        if obj is None:
+            obj = self.model.create(name=name, slug=slug, **defaults)
+            self.by_name[name] = obj
+        return obj
+
+
+def worker_name(row):
+    return f"{row['Last Name']},{row['First Name']}"
+
+
+def department_name(row, unit_name, mapping, stats):
+    """Name of the department a roster row belongs to.
+
+    Sections missing in the mapping keep their own name and are counted in
+    ``stats.unmapped``, rosters without section columns fall back to one
+    placeholder department per unit.
+    """
+    section = row.get("Sect Desc") or row.get("Dept Desc")
+    if not section:
+        return f"Unknown ({unit_name})"
+
+    name = mapping.resolve(section, row.get("Dept Desc"))
+    if name is None:
+        stats.unmapped[section] = stats.unmapped.get(section, 0) + 1
+        name = section
+    return name
+
+
+def roster_records(rows, units, departments, today, stats, mapping=None):
+    """Turn roster rows into worker records, resolving units and departments."""
+    if mapping is None:
+        mapping = DepartmentMapping()
+
+    for row in rows:
+        stats.rows += 1
+
+        unit_name = row["Unit (in UnionWare)"]
+        unit = units.get(unit_name.title(), slugify(unit_name))
+
+        name = department_name(row, unit_name, mapping, stats).title()
+        department = departments.get(name, slugify(name), unit=unit)
+
+        yield {
+            "name": worker_name(row),
+            "unit": str(unit.id),
+            # default organizing_dept to department ID, can be changed later on
+            "department_id": department.id,
+            "organizing_dept_id": department.id,
+            "active": True,
+            "added": today,
+            "updated": today,
+        }
+
+
+def fingerprint(record):
+    """Roster controlled state of a worker, equal fingerprints need no write."""
+    return (record["unit"], record["department_id"], record["active"])
+
+
+def record_import(mode, filename, roster_date, stats):
+    ImportHistory.create(
+        filename=filename,
+        mode=mode,
+        roster_date=roster_date,
+        rows=stats.rows,
+        created=stats.created,
+        updated=stats.updated,
+        deactivated=stats.deactivated,
+    )
+
+
+def import_roster(rows, chunk_size=CHUNK_SIZE, stats=None, mapping=None, filename=None):
+    """Import roster rows and deactivate every worker missing from them.
+
+    Workers are upserted by name in chunks and the deactivation runs in the
+    same transaction, so a failed import leaves the database untouched.
+    Counters are written to ``stats`` as the import progresses, which lets
+    another thread report on a running import.
+    """
+    today = date.today()
+    if stats is None:
+        stats = ImportStats()
+
+    # take the write lock up front, a deferred transaction that reads first
+    # fails with "database is locked" if another writer commits in between
+    with db_wrapper.database.atomic("IMMEDIATE"):
+        with stats.phase("load"):
+            units = _Lookup(Unit)
+            departments = _Lookup(Department)
+            known = {name for (name,) in Worker.select(Worker.name).tuples()}
+        seen = set()
+
+        def records():
+            for record in roster_records(
+                rows, units, departments, today, stats, mapping
+            ):
+                if record["name"] not in seen:
+                    seen.add(record["name"])
+                    if record["name"] in known:
+                        stats.updated += 1
+                    else:
+                        stats.created += 1
+                yield record
+
+        with stats.phase("workers"):
+            for batch in chunked(records(), chunk_size):
+                Worker.insert_many(batch).on_conflict(
+                    conflict_target=[Worker.name],
+                    preserve=[
+                        Worker.unit,
+                        Worker.department_id,
+                        Worker.organizing_dept_id,
+                        Worker.active,
+                        Worker.updated,
+                    ],
+                ).execute()
+
+        with stats.phase("deactivate"):
+            stats.deactivated = (
+                Worker.update(active=False)
+                .where((Worker.updated != today) & (Worker.active == True))
+                .execute()
+            )
+        record_import(
+            "full", filename, today if stats.created or stats.updated else None, stats
+        )
+        with stats.phase("aggregates"):
+            aggregates.rebuild()
+        bump_version()
+
+    return stats
+
+
+@dataclass
+class RosterDiff:
+    added: list = field(default_factory=list)
+    moved: list = field(default_factory=list)
+    reactivated: list = field(default_factory=list)
+    deactivated: list = field(default_factory=list)
+    unchanged: int = 0
+
+    def __bool__(self):
+        return bool(self.added or self.moved or self.reactivated or self.deactivated)
+
+
+def diff_roster(
+    rows, chunk_size=CHUNK_SIZE, stats=None, dry_run=False, mapping=None, filename=None
+):
+    """Import roster rows, but only write workers whose state changed.
+
+    Each roster row is compared to the stored worker by its fingerprint, so
+    unchanged workers keep their ``updated`` date. Moved workers also get
+    their organizing department reset, other workers keep the one an admin
+    may have assigned. With ``dry_run`` the changes are rolled back and only
+    the returned ``RosterDiff`` tells what the import would do.
+    """
+    today = date.today()
+    if stats is None:
+        stats = ImportStats()
+    diff = RosterDiff()
+
+    with db_wrapper.database.atomic("IMMEDIATE") as transaction:
+        with stats.phase("load"):
+            units = _Lookup(Unit)
+            departments = _Lookup(Department)
+            current = {
+                name: (worker_id, (unit, department_id, active))
+                for name, worker_id, unit, department_id, active in Worker.select(
+                    Worker.name,
+                    Worker.id,
+                    Worker.unit,
+                    Worker.department_id,
+                    Worker.active,
+                ).tuples()
+            }
+
+        with stats.phase("read"):
+            # later rows of the same worker win, just like in import_roster
+            records = {
+                record["name"]: record
+                for record in roster_records(
+                    rows, units, departments, today, stats, mapping
+                )
+            }
+
+        with stats.phase("workers"):
+            inserts = []
+            for name, record in records.items():
+                if name not in current:
+                    diff.added.append(name)
+                    inserts.append(record)
+                    continue
+
+                worker_id, state = current[name]
+                if state == fingerprint(record):
+                    diff.unchanged += 1
+                    continue
+
+                data = dict(updated=today, active=True)
+                if not state[2]:
+                    diff.reactivated.append(name)
+                if state[:2] != fingerprint(record)[:2]:
+                    if state[2]:
+                        diff.moved.append(name)
+                    data.update(
+                        unit=record["unit"],
+                        department_id=record["department_id"],
+                        organizing_dept_id=record["organizing_dept_id"],
+                    )
+                Worker.update(**data).where(Worker.id == worker_id).execute()
+                stats.updated += 1
+
+            for batch in chunked(inserts, chunk_size):
+                Worker.insert_many(batch).execute()
+                stats.created += len(batch)
+
+        with stats.phase("deactivate"):
+            gone = [
+                (name, worker_id)
+                for name, (worker_id, state) in current.items()
+                if state[2] and name not in records
+            ]
+            for batch in chunked(gone, chunk_size):
+                Worker.update(active=False).where(
+                    Worker.id.in_([worker_id for _, worker_id in batch])
+                ).execute()
+                diff.deactivated.extend(name for name, _ in batch)
+            stats.deactivated = len(gone)
+
+        if dry_run:
+            transaction.rollback()
+        else:
+            record_import(
+                "diff",
+                filename,
+                today if stats.created or stats.updated else None,
+                stats,
+            )
+            if diff:
+                with stats.phase("aggregates"):
+                    aggregates.rebuild()
+                bump_version()
+
+    return diff
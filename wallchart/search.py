@@ -0,0 +1,109 @@
+import re
+
+from peewee import JOIN
+
+from wallchart import db_wrapper
+from wallchart.db import Department, Worker, WorkerSearch
+
+# Phone numbers are indexed as digits only, plus the last seven and four
+# digits so "555-1234" and "1234" find "(808) 555-1234".
+PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace("
+    "{0}, '(', ''), ')', ''), '-', ''), ' ', ''), '+', ''), '.', '')"
+)
+PHONE_TERMS = "{0} || ' ' || substr({0}, -7) || ' ' || substr({0}, -4)".format(
+    PHONE_DIGITS.format("{row}.phone")
+)
+
+INDEXED = "{row}.name, {row}.preferred_name, {row}.email, " + PHONE_TERMS
+
+TRIGGERS = {
+    "worker_search_insert": """
+        AFTER INSERT ON worker BEGIN
+            INSERT INTO workersearch (rowid, name, preferred_name, email, phone)
+            VALUES (new.id, {new});
+        END""",
+    "worker_search_update": """
+        AFTER UPDATE OF name, preferred_name, email, phone ON worker BEGIN
+            DELETE FROM workersearch WHERE rowid = old.id;
+            INSERT INTO workersearch (rowid, name, preferred_name, email, phone)
+            VALUES (new.id, {new});
+        END""",
+    "worker_search_delete": """
+        AFTER DELETE ON worker BEGIN
+            DELETE FROM workersearch WHERE rowid = old.id;
+        END""",
+}
+
+PHONE_PUNCTUATION = re.compile(r"[()\-+.]")
+
+
+def create_index():
+    """Create the search table and its triggers, indexing existing workers."""
+    database = db_wrapper.database
+    with database.atomic():
+        if not WorkerSearch.table_exists():
+            WorkerSearch.create_table()
+            database.execute_sql(
+                "INSERT INTO workersearch (rowid, name, preferred_name, email, phone) "
+                f"SELECT worker.id, {INDEXED.format(row='worker')} FROM worker"
+            )
+        for name, trigger in TRIGGERS.items():
+            database.execute_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {name} "
+                + trigger.format(new=INDEXED.format(row="new"))
+            )
+
+
+def rebuild_index():
+    with db_wrapper.database.atomic():
+        WorkerSearch.drop_table()
+        create_index()
+
+
+def match_query(q):
+    """Turn user input into an FTS5 query matching every term as a prefix.
+
+    Terms are quoted so punctuation in emails or names is never parsed as
+    query syntax, phone fragments are reduced to their digits.
+    """
+    terms = []
+    for term in q.split():
+        digits = PHONE_PUNCTUATION.sub("", term)
+        if digits.isdigit():
+            term = digits
+        term = term.replace('"', "")
+        if term.strip("()-+.@"):
+            terms.append(f'"{term}"*')
+    return " ".join(terms)
+
+
+def search_workers(q, limit=10):
+    """Best matching workers with their organizing department."""
+    query = match_query(q)
+    if not query:
+        return []
+
+    return list(
+        Worker.select(
+            Worker.id,
+            Worker.name,
+            Worker.preferred_name,
+            Worker.email,
+            Worker.phone,
+            Worker.active,
+            Department.slug.alias("department_slug"),
+            Department.name.alias("department_name"),
+        )
+        .join(WorkerSearch, on=(WorkerSearch.rowid == Worker.id))
+        .join_from(
+            Worker,
+            Department,
+            JOIN.LEFT_OUTER,
+            on=(Worker.organizing_dept_id == Department.id),
+        )
+        .where(WorkerSearch.match(query))
+        .order_by(WorkerSearch.rank())
+        .limit(limit)
+        .dicts()
+    )
@@ -0,0 +1,104 @@
+"""Log of SQL statements slower than ``SLOW_QUERY_THRESHOLD`` seconds.
+
+Entries carry the parameters, the view or thread that ran the statement and
+its ``EXPLAIN QUERY PLAN``. They are appended as JSON lines to a file shared
+by all processes and the latest ones are kept in memory for the admin page.
+Rotating the file is left to logrotate, the file is reopened once it moved.
+
+Parameters are logged as bound, which includes names, emails and phone
+numbers of workers. Only password hashes are redacted.
+"""
+import json
+import logging
+import re
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import WatchedFileHandler
+from pathlib import Path
+
+from flask import current_app, has_app_context, has_request_context, request
+
+EXPLAINED = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# long parameters are cut in the log
+MAX_PARAM_LENGTH = 64
+
+# bcrypt hashes such as those of wallchart.util.bcryptify are never logged
+PASSWORD_HASH = re.compile(r"\$2[abxy]?\$\d{2}\$")
+
+
+class SlowQueryLog:
+    def __init__(self, path, size):
+        self.entries = deque(maxlen=size)
+        self.logger = logging.Logger("wallchart.slow_queries")
+        if path:
+            # rotating in every process would race, each appends and reopens
+            handler = WatchedFileHandler(path, delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    def add(self, entry):
+        self.entries.append(entry)
+        self.logger.warning(json.dumps(entry))
+
+    def latest(self):
+        """Logged entries, slowest first."""
+        return sorted(self.entries, key=lambda entry: entry["duration"], reverse=True)
+
+
+def init_app(app):
+    path = app.config["SLOW_QUERY_LOG"]
+    if path is None:
+        path = Path(app.instance_path, "slow-queries.log")
+    app.extensions["slow_queries"] = SlowQueryLog(path, app.config["SLOW_QUERY_BUFFER"])
+
+
+def slow_query_log():
+    return current_app.extensions["slow_queries"]
+
+
+def query_plan(database, sql, params):
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return []
+    try:
+        # a raw cursor, statements run through execute_sql would be timed again
+        cursor = database.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+        return [row[-1] for row in cursor.fetchall()]
+    except sqlite3.Error as exc:
+        return [f"EXPLAIN failed: {exc}"]
+
+
+def short(param):
+    if isinstance(param, str) and PASSWORD_HASH.match(param):
+        return "<redacted>"
+    if isinstance(param, str) and len(param) > MAX_PARAM_LENGTH:
+        return param[:MAX_PARAM_LENGTH] + "..."
+    return param if isinstance(param, (int, float, type(None))) else str(param)
+
+
+def check(database, sql, params, duration):
+    """Log the statement if it was slow, called after every statement."""
+    if not has_app_context() or "slow_queries" not in current_app.extensions:
+        return
+    threshold = current_app.config["SLOW_QUERY_THRESHOLD"]
+    if threshold is None or duration < threshold:
+        return
+
+    if has_request_context():
+        source = request.endpoint or request.path
+    else:
+        source = threading.current_thread().name
+
+    slow_query_log().add(
+        dict(
+            time=datetime.now().isoformat(timespec="seconds"),
+            source=source,
+            duration=round(duration * 1000, 2),
+            sql=sql,
+            params=[short(param) for param in params or ()],
+            plan=query_plan(database, sql, params),
+        )
+    )
@@ -0,0 +1,69 @@
+// Collects checkbox changes and sends them in one request once clicking
+// pauses, the server keeps only the last status per worker and test.
+const participationDelay = 500;
+
+let participationChanges = [];
+let participationTimeout = null;
+
+function toggleParticipation(element) {
+  participationChanges.push({
+    worker: element.dataset.worker,
+    structure_test: element.dataset.structure_test,
+    status: element.checked ? 1 : 0,
+    element: element,
+  });
+  clearTimeout(participationTimeout);
+  participationTimeout = setTimeout(flushParticipation, participationDelay);
+}
+
+function participationBody(changes) {
+  return JSON.stringify({
+    changes: changes.map(({ worker, structure_test, status }) => ({
+      worker,
+      structure_test,
+      status,
+    })),
+  });
+}
+
+function flushParticipation() {
+  clearTimeout(participationTimeout);
+  const changes = participationChanges;
+  participationChanges = [];
+  if (!changes.length) {
+    return;
+  }
+
+  fetch("/participation", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: participationBody(changes),
+  })
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error(`Saving participation failed: ${response.status}`);
+      }
+    })
+    .catch((error) => {
+      console.log(error);
+      // undo in reverse so every box ends up as before the batch
+      for (const change of changes.slice().reverse()) {
+        change.element.checked = !change.status;
+      }
+      alert("Participation could not be saved, please try again.");
+    });
+}
+
+// send pending changes when the organizer leaves the page
+document.addEventListener("visibilitychange", () => {
+  if (document.visibilityState === "hidden" && participationChanges.length) {
+    navigator.sendBeacon(
+      "/participation",
+      new Blob([participationBody(participationChanges)], {
+        type: "application/json",
+      })
+    );
+    participationChanges = [];
+    clearTimeout(participationTimeout);
+  }
+});
@@ -0,0 +1,279 @@
+"""Daily participation counts of every department for trend charts.
+
+``take_snapshot`` copies the aggregate tables into the snapshot tables under
+the date of the day, which takes a single query per table however long the
+participation history is. Days since the previous snapshot on which none was
+taken are filled in from the participations added meanwhile, counted for the
+department their worker is organized in today, as is the whole history on
+the first snapshot. Unit trends are summed from their departments when read.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import date
+from itertools import groupby
+
+from peewee import Value, chunked, fn
+
+from wallchart import db_wrapper
+from wallchart.cache import bump_version
+from wallchart.db import (
+    DepartmentCount,
+    Participation,
+    ParticipationCount,
+    ParticipationSnapshot,
+    Worker,
+    WorkerSnapshot,
+)
+
+# rows per INSERT statement
+INSERT_BATCH = 100
+
+
+def previous_day(day):
+    """Latest day before ``day`` with a snapshot, ``None`` if there is none."""
+    return (
+        WorkerSnapshot.select(fn.MAX(WorkerSnapshot.day))
+        .where(WorkerSnapshot.day < day)
+        .scalar()
+    )
+
+
+def added_between(start, end):
+    """``(day, department_id, structure_test_id, count)`` added between both days.
+
+    Both days are excluded, without ``start`` all participations added before
+    ``end`` are counted.
+    """
+    query = (
+        Participation.select(
+            Participation.added,
+            Worker.organizing_dept_id,
+            Participation.structure_test,
+            fn.COUNT(Participation.id),
+        )
+        .join(Worker, on=(Participation.worker == Worker.id))
+        .where(
+            (Participation.added < end)
+            & (Worker.active == True)
+            & Worker.organizing_dept_id.is_null(False)
+        )
+        .group_by(
+            Participation.added,
+            Worker.organizing_dept_id,
+            Participation.structure_test,
+        )
+        .order_by(Participation.added)
+    )
+    if start is not None:
+        query = query.where(Participation.added > start)
+    return query.tuples()
+
+
+def store(day, workers, participants):
+    for batch in chunked(
+        [
+            dict(day=day, department_id=department_id, workers=count)
+            for department_id, count in workers.items()
+            if count > 0
+        ],
+        INSERT_BATCH,
+    ):
+        WorkerSnapshot.insert_many(batch).execute()
+    for batch in chunked(
+        [
+            dict(
+                day=day,
+                department_id=department_id,
+                structure_test_id=structure_test_id,
+                participants=count,
+            )
+            for (department_id, structure_test_id), count in participants.items()
+            if count > 0
+        ],
+        INSERT_BATCH,
+    ):
+        ParticipationSnapshot.insert_many(batch).execute()
+
+
+def fill(previous, day):
+    """Snapshot every day between ``previous`` and ``day`` with participations.
+
+    Returns the number of days stored. Past worker counts are not recorded,
+    the filled in days use today's.
+    """
+    participants = Counter(
+        {
+            (department_id, structure_test_id): count
+            for department_id, structure_test_id, count in ParticipationSnapshot.select(
+                ParticipationSnapshot.department_id,
+                ParticipationSnapshot.structure_test_id,
+                ParticipationSnapshot.participants,
+            )
+            .where(ParticipationSnapshot.day == previous)
+            .tuples()
+        }
+    )
+    workers = dict(DepartmentCount.select().tuples())
+
+    days = 0
+    for added, rows in groupby(added_between(previous, day), key=lambda row: row[0]):
+        for _, department_id, structure_test_id, count in rows:
+            participants[(department_id, structure_test_id)] += count
+        store(added, workers, participants)
+        days += 1
+    return days
+
+
+def copy_counts(day):
+    """Replace the snapshot of ``day`` with the current aggregates."""
+    WorkerSnapshot.delete().where(WorkerSnapshot.day == day).execute()
+    ParticipationSnapshot.delete().where(ParticipationSnapshot.day == day).execute()
+    WorkerSnapshot.insert_from(
+        DepartmentCount.select(
+            Value(day), DepartmentCount.department_id, DepartmentCount.workers
+        ).where(DepartmentCount.workers > 0),
+        [WorkerSnapshot.day, WorkerSnapshot.department_id, WorkerSnapshot.workers],
+    ).execute()
+    ParticipationSnapshot.insert_from(
+        ParticipationCount.select(
+            Value(day),
+            ParticipationCount.department_id,
+            ParticipationCount.structure_test_id,
+            ParticipationCount.participants,
+        ).where(ParticipationCount.participants > 0),
+        [
+            ParticipationSnapshot.day,
+            ParticipationSnapshot.department_id,
+            ParticipationSnapshot.structure_test_id,
+            ParticipationSnapshot.participants,
+        ],
+    ).execute()
+
+
+def take_snapshot(day=None):
+    """Store the counts of ``day``, today by default, returns the days stored.
+
+    Taking another snapshot the same day replaces the earlier one.
+    """
+    day = day or date.today()
+    # take the write lock up front, see wallchart.roster
+    with db_wrapper.database.atomic("IMMEDIATE"):
+        before = stored_counts(day)
+        days = fill(previous_day(day), day)
+        copy_counts(day)
+        changed = days or stored_counts(day) != before
+    # scheduled snapshots mostly store the same counts again, keep the
+    # response cache unless the trends changed
+    if changed:
+        bump_version()
+    return days + 1
+
+
+def stored_counts(day):
+    return (
+        set(
+            WorkerSnapshot.select(WorkerSnapshot.department_id, WorkerSnapshot.workers)
+            .where(WorkerSnapshot.day == day)
+            .tuples()
+        ),
+        set(
+            ParticipationSnapshot.select(
+                ParticipationSnapshot.department_id,
+                ParticipationSnapshot.structure_test_id,
+                ParticipationSnapshot.participants,
+            )
+            .where(ParticipationSnapshot.day == day)
+            .tuples()
+        ),
+    )
+
+
+def trend(department_ids=None, structure_test_ids=None):
+    """Workers and participants per day, summed over ``department_ids``.
+
+    Returns ISO ``days``, the ``workers`` of each day and for every structure
+    test the participants of each day. Without ``department_ids`` all
+    departments are summed, without ``structure_test_ids`` all tests listed.
+    """
+    workers = WorkerSnapshot.select(
+        WorkerSnapshot.day, fn.SUM(WorkerSnapshot.workers)
+    ).group_by(WorkerSnapshot.day)
+    participants = ParticipationSnapshot.select(
+        ParticipationSnapshot.day,
+        ParticipationSnapshot.structure_test_id,
+        fn.SUM(ParticipationSnapshot.participants),
+    ).group_by(ParticipationSnapshot.day, ParticipationSnapshot.structure_test_id)
+    if department_ids is not None:
+        workers = workers.where(WorkerSnapshot.department_id.in_(department_ids))
+        participants = participants.where(
+            ParticipationSnapshot.department_id.in_(department_ids)
+        )
+    if structure_test_ids is not None:
+        participants = participants.where(
+            ParticipationSnapshot.structure_test_id.in_(structure_test_ids)
+        )
+
+    workers = dict(workers.tuples())
+    participants = list(participants.tuples())
+    days = sorted(workers.keys() | {day for day, _, _ in participants})
+    index = {day: position for position, day in enumerate(days)}
+
+    structure_tests = {
+        structure_test_id: [0] * len(days)
+        for structure_test_id in structure_test_ids or ()
+    }
+    for day, structure_test_id, count in participants:
+        structure_tests.setdefault(structure_test_id, [0] * len(days))
+        structure_tests[structure_test_id][index[day]] = count
+
+    return dict(
+        days=[day.isoformat() for day in days],
+        workers=[workers.get(day, 0) for day in days],
+        structure_tests=structure_tests,
+    )
+
+
+def selection(reference, department_slug=None, unit_slug=None):
+    """``(name, department_ids)`` of a department or unit of ``reference``.
+
+    Without either slug all departments are selected, ``department_ids`` is
+    ``None`` then. Returns ``None`` for unknown slugs.
+    """
+    if department_slug:
+        for department in reference.departments:
+            if department.slug == department_slug:
+                return department.name, [department.id]
+        return None
+    if unit_slug:
+        for unit in reference.units:
+            if unit.slug == unit_slug:
+                return unit.name, [
+                    department.id
+                    for department in reference.departments
+                    if department.unit_id == unit.id
+                ]
+        return None
+    return "All departments", None
+
+
+def start_scheduler(app):
+    """Snapshot the counts every ``TRENDS_INTERVAL`` seconds in a daemon thread.
+
+    Started by ``wallchart.start_schedulers`` in a single process per host,
+    the snapshot of the day is replaced each time.
+    """
+    interval = app.config["TRENDS_INTERVAL"]
+
+    def run():
+        while True:
+            try:
+                with app.app_context(), db_wrapper.database.connection_context():
+                    take_snapshot()
+            except Exception:
+                app.logger.exception("Trend snapshot failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="wallchart-trends", daemon=True)
+    thread.start()
+    return thread
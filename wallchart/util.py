@@ -4,12 +4,11 @@ from functools import wraps
 from io import TextIOWrapper
 
 import bcrypt
-import yaml
-from flask import redirect, session, url_for
-from peewee import fn
-from slugify import slugify
+from flask import current_app, redirect, session, url_for
 
-from wallchart.db import Department, Worker, Unit
+from wallchart.db import Worker
+from wallchart.mapping import load_mapping
+from wallchart.roster import diff_roster, import_roster
 
 
 def max_age():
@@ -17,11 +16,10 @@ def max_age():
 
 
 def last_updated():
-    return (
-        Worker.select(fn.MAX(Worker.updated))
-        .where(Worker.contract != "manual")
-        .scalar()
-    )
+    """Date of the latest roster import which changed workers."""
+    from wallchart.reference import reference_data
+
+    return reference_data().last_updated
 
 
 def bcryptify(password: str):
@@ -47,76 +45,17 @@ def login_required(f):
     return inner
 
 
-def parse_csv(csv_file_b):
-    mapping = {}
-    with open("mapping.yml") as mapping_file:
-        mapping = yaml.safe_load(mapping_file)
+def parse_csv(csv_file_b, stats=None, diff=False, dry_run=False, filename=None):
+    mapping = load_mapping(current_app.config["MAPPING_FILE"])
 
     with TextIOWrapper(csv_file_b, encoding="utf-8") as csv_file:
         reader = csv.DictReader(csv_file, delimiter=",")
-
-        for row in reader:
-            # print(row.items())
-            # department_name = mapping["mapping"].get(row["Sect Desc"], row["Sect Desc"])
-
-            unit_name = row["Unit (in UnionWare)"]
-            unit, _ = Unit.get_or_create(
-                name=unit_name.title(),
-                slug=slugify(unit_name),
-            )
-
-            department_name = f"Unknown ({unit_name})"
-
-            department, _ = Department.get_or_create(
-                # name=row["Job Sect Desc"].title(),
-                # slug=slugify(row["Job Sect Desc"]),
-                name=department_name.title(),
-                # unit=unit,
-                slug=slugify(department_name),
+        if diff or dry_run:
+            return diff_roster(
+                reader,
+                stats=stats,
+                dry_run=dry_run,
+                mapping=mapping,
+                filename=filename,
             )
-            # print('dpet unit', department.unit, department.unit is None)
-
-            # # Populate department unit if it hasn't been set
-            try:
-                print(department.unit)
-
-            except Unit.DoesNotExist:
-                department.update(
-                    unit=unit
-                ).where(
-                    Department.id == department.id,
-                ).execute()
-                # department.unit = unit
-            # print('dpet unit', department.unit.name)
-
-            worker_name = f"{row['Last Name']},{row['First Name']}"
-            # if row["Middle"]:
-            #     worker_name += f" {row['Middle']}"
-
-            worker = Worker.get_or_none(
-                name=worker_name,
-            )
-
-            if not worker:
-                print("creating new worker")
-                worker = Worker.create(
-                    # name=row["Name"],
-                    name=worker_name,
-                    department_id=department.id,
-                    organizing_dept_id=department.id,
-                    # default organizing_dept to department ID, can be changed later on
-                    unit=unit,
-                )
-
-            worker.update(
-                updated=date.today(),
-                # contract=row["Job Code"],
-                unit=unit,
-                department_id=department.id,
-                organizing_dept_id=department.id,
-                active=True,
-            ).where(
-                Worker.id == worker.id,
-            ).execute()
-
-    Worker.update(active=False).where(Worker.updated != date.today()).execute()
+        return import_roster(reader, stats=stats, mapping=mapping, filename=filename)
@@ -1,23 +1,46 @@
-from datetime import date
+from datetime import date, datetime, time
 
 import bcrypt
 import phonenumbers
 from flask import (
     Blueprint,
+    abort,
     current_app,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
-    send_file,
     session,
+    stream_with_context,
     url_for,
 )
-from peewee import JOIN, Case, fn
+from peewee import JOIN, Case, fn, prefetch
 from playhouse.flask_utils import get_object_or_404
 from slugify import slugify
 
-from wallchart.db import Department, Participation, StructureTest, Unit, Worker
+from wallchart import aggregates, backup, db_wrapper, events, export, trends
+from wallchart.cache import bump_version, cached
+from wallchart.db import (
+    Department,
+    DepartmentCount,
+    ImportHistory,
+    ImportJob,
+    Participation,
+    ParticipationCount,
+    StructureTest,
+    Unit,
+    Worker,
+)
+from wallchart.jobs import job_status, submit_import
+from wallchart.participation import (
+    apply_changes,
+    coalesce,
+    unknown_structure_tests,
+    workers_of,
+)
+from wallchart.reference import reference_data
+from wallchart.roster import ImportStats
 from wallchart.util import (
     bcryptify,
     is_admin,
@@ -85,31 +108,77 @@ def homepage():
 @views.route("/download_db")
 @login_required
 def download_db():
-    return send_file(
-        current_app.config["DATABASE"][len("sqlite:///") :],
-        download_name=f"wallcharts-backup-{date.today().strftime('%Y-%m-%d')}.db",
+    path = backup.temporary_snapshot()
+    try:
+        response = current_app.response_class(
+            backup.stream_gzip(path), mimetype="application/gzip"
+        )
+        response.headers["Content-Disposition"] = (
+            "attachment; "
+            f"filename=wallcharts-backup-{date.today().strftime('%Y-%m-%d')}.db.gz"
+        )
+        # checksum of the uncompressed database, verify with gunzip | sha256sum
+        response.headers["X-Checksum-SHA256"] = backup.checksum(path)
+    except BaseException:
+        backup.remove_file(path)
+        raise
+    # also runs for HEAD requests and clients leaving before the first chunk
+    response.call_on_close(lambda: backup.remove_file(path))
+    return response
+
+
+@views.route("/export/<format>")
+@login_required
+def export_wallcharts(format):
+    """Stream the wallcharts of all or ``?department=`` one department."""
+    if format not in export.FORMATS:
+        abort(404)
+    department_id = None
+    if request.args.get("department"):
+        department_id = get_object_or_404(
+            Department.select(Department.id),
+            (Department.slug == request.args["department"]),
+        ).id
+
+    structure_tests = reference_data().structure_tests
+    rows = export.wallchart_rows(structure_tests, department_id)
+    if format == "csv":
+        body = stream_with_context(export.csv_chunks(structure_tests, rows))
+    else:
+        if export.xlsxwriter is None:
+            abort(501, "XLSX export needs the XlsxWriter package")
+        path = export.temporary_xlsx(structure_tests, rows)
+        body = export.stream_file(path)
+
+    response = current_app.response_class(body, mimetype=export.FORMATS[format])
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename={request.args.get('department', 'wallcharts')}-"
+        f"{date.today().strftime('%Y-%m-%d')}.{format}"
     )
+    if format == "xlsx":
+        # also runs for HEAD requests and aborted downloads
+        response.call_on_close(lambda: backup.remove_file(path))
+    return response
 
 
 @views.route("/admin")
 @login_required
+@cached
 def admin():
     department_count = Department.select(fn.count(Department.id)).scalar()
     worker_count = (
         Worker.select(fn.count(Worker.id)).where(Worker.active == True).scalar()
     )
-    
-    emails = (
-        Worker.select().where(Worker.active == True).where(Worker.email.is_null(False))
+    emails = ", ".join(
+        email
+        for (email,) in Worker.select(Worker.email)
+        .where((Worker.active == True) & Worker.email.is_null(False))
+        .tuples()
     )
-    emailList = ""
-    for user in emails:
-        emailList = emailList + user.email + ", "
-    emailList = emailList[0:len(emailList)-2]
 
     return render_template(
         "admin.html",
-        emails=emailList,
+        emails=emails,
         last_updated=last_updated(),
         department_count=department_count,
         worker_count=worker_count,
@@ -129,12 +198,20 @@ def structure_test(structure_test_id=None):
         if structure_test_id:
             action = request.args.get("action")
             if action == "delete":
-                StructureTest.delete().where(
-                    StructureTest.id == structure_test_id
-                ).execute()
-                Participation.delete().where(
-                    Participation.structure_test == structure_test_id,
-                ).execute()
+                with db_wrapper.database.atomic():
+                    StructureTest.delete().where(
+                        StructureTest.id == structure_test_id
+                    ).execute()
+                    events.record_removal(
+                        Participation.structure_test == structure_test_id,
+                        session.get("user_id"),
+                    )
+                    Participation.delete().where(
+                        Participation.structure_test == structure_test_id,
+                    ).execute()
+                    ParticipationCount.delete().where(
+                        ParticipationCount.structure_test_id == structure_test_id
+                    ).execute()
                 flash("Deleted Structure Test")
             else:
                 StructureTest.update(data).where(
@@ -148,6 +225,7 @@ def structure_test(structure_test_id=None):
             else:
                 flash("Structure test with same name already exists")
 
+        bump_version()
         return redirect(url_for("structure_tests"))
 
     if structure_test_id:
@@ -166,36 +244,69 @@ def find_worker():
 
 @views.route("/units/")
 @login_required
+@cached
 def units_view():
-    latest_test = (
-        StructureTest.select(StructureTest.id, StructureTest.name)
-        .order_by(StructureTest.id.desc())
-        .get()
-    )
+    latest_test = reference_data().latest_structure_test
 
+    members = ParticipationCount.alias("members")
+    latest = ParticipationCount.alias("latest")
+    worker_count = fn.COALESCE(fn.SUM(DepartmentCount.workers), 0)
     units = (
         Unit.select(
             Unit,
-            fn.count(Worker.id).alias("worker_count"),
-            fn.sum(Case(Participation.structure_test, ((1, 1),), 0)).alias("members"),
-            fn.sum(Case(Participation.structure_test, ((latest_test.id, 1),), 0)).alias(
-                "latest"
-            ),
+            worker_count.alias("worker_count"),
+            fn.COALESCE(fn.SUM(members.participants), 0).alias("members"),
+            fn.COALESCE(fn.SUM(latest.participants), 0).alias("latest"),
         )
         .join(Department, JOIN.LEFT_OUTER, on=(Department.unit == Unit.id))
-        .join(Worker, JOIN.LEFT_OUTER, on=(Department.id == Worker.organizing_dept_id))
-        .join(Participation, JOIN.LEFT_OUTER, on=(Worker.id == Participation.worker))
-        .join(
-            StructureTest,
+        .join_from(
+            Department,
+            DepartmentCount,
+            JOIN.LEFT_OUTER,
+            on=(DepartmentCount.department_id == Department.id),
+        )
+        .join_from(
+            Department,
+            members,
+            JOIN.LEFT_OUTER,
+            on=(
+                (members.department_id == Department.id)
+                & (members.structure_test_id == 1)
+            ),
+        )
+        .join_from(
+            Department,
+            latest,
             JOIN.LEFT_OUTER,
-            on=(Participation.structure_test == StructureTest.id),
+            on=(
+                (latest.department_id == Department.id)
+                & (latest.structure_test_id == latest_test.id)
+            ),
         )
-        .where(Worker.active == True)
         .group_by(Unit.id)
+        .having(worker_count > 0)
+    )
+    units = prefetch(
+        units,
+        (chairs(Worker.unit_chair_id), Unit),
+        (
+            Department.select(
+                Department.id, Department.name, Department.alias, Department.unit
+            ),
+            Unit,
+        ),
+        (chairs(Worker.dept_chair_id), Department),
     )
     return render_template("units.html", units=units, latest_test_name=latest_test.name)
 
 
+def chairs(chair_field):
+    """Workers chairing a unit or department, for ``prefetch``."""
+    return Worker.select(
+        Worker.id, Worker.name, Worker.preferred_name, chair_field
+    ).where(chair_field.is_null(False))
+
+
 @views.route("/manage-units/", methods=["GET", "POST"])
 @login_required
 def units():
@@ -206,6 +317,7 @@ def units():
                 name=request.form["name"],
                 slug=slugify(request.form["name"]),
             )
+            bump_version()
             flash(f"Unit \"{ request.form['name'] }\" created")
             return redirect(url_for("admin"))
         elif action == "delete":
@@ -214,55 +326,65 @@ def units():
             Department.update({Department.unit: None}).where(
                 Department.unit == unit_id
             ).execute()
+            bump_version()
             flash("Unit deleted")
 
-    units = Unit.select().group_by(Unit.name)
-    return render_template("units_edit.html", units=units)
+    reference = reference_data()
+    departments = {}
+    for department in reference.departments:
+        departments.setdefault(department.unit_id, []).append(department)
+    return render_template(
+        "units_edit.html", units=reference.units, departments=departments
+    )
 
 
 @views.route("/departments/")
 @login_required
+@cached
 def departments():
-    latest_test = (
-        StructureTest.select(StructureTest.id, StructureTest.name)
-        .order_by(StructureTest.id.desc())
-        .get()
-    )
+    latest_test = reference_data().latest_structure_test
 
+    members = ParticipationCount.alias("members")
+    latest = ParticipationCount.alias("latest")
     units = (
         Department.select(
             Department,
             Case(None, ((Unit.name.is_null(), "No Unit"),), Unit.name).alias(
                 "unit_name"
             ),
-            # select `none` as entry to calculate the total number of workers.
-            # It's a LEFT JOIN so all workers are selected, however if they
-            # participated in both structure tests they appear twice. This
-            # means a simple count is not possible since the numbers would be
-            # off. Instead count how many people did not participate in any
-            # test and add it to the with highest participation.
-            # Reminder: 0 or 1 participations result in 1 row (left join), two
-            # participations result in two row.
-            fn.sum(Case(None, ((Participation.structure_test.is_null(), 1),), 0)).alias(
-                "none"
-            ),
-            fn.sum(Case(Participation.structure_test, ((1, 1),), 0)).alias("members"),
-            fn.sum(Case(Participation.structure_test, ((latest_test.id, 1),), 0)).alias(
-                "latest"
-            ),
+            fn.COALESCE(DepartmentCount.workers, 0).alias("worker_count"),
+            fn.COALESCE(members.participants, 0).alias("members"),
+            fn.COALESCE(latest.participants, 0).alias("latest"),
         )
         .join(Unit, JOIN.LEFT_OUTER, on=(Department.unit == Unit.id))
-        .join(Worker, JOIN.LEFT_OUTER, on=(Department.id == Worker.organizing_dept_id))
-        .join(Participation, JOIN.LEFT_OUTER, on=(Worker.id == Participation.worker))
-        .join(
-            StructureTest,
+        .join_from(
+            Department,
+            DepartmentCount,
+            JOIN.LEFT_OUTER,
+            on=(DepartmentCount.department_id == Department.id),
+        )
+        .join_from(
+            Department,
+            members,
             JOIN.LEFT_OUTER,
-            on=(Participation.structure_test == StructureTest.id),
+            on=(
+                (members.department_id == Department.id)
+                & (members.structure_test_id == 1)
+            ),
+        )
+        .join_from(
+            Department,
+            latest,
+            JOIN.LEFT_OUTER,
+            on=(
+                (latest.department_id == Department.id)
+                & (latest.structure_test_id == latest_test.id)
+            ),
         )
-        .where(Worker.active == True)
-        .group_by(Department.id)
+        .order_by(Department.id)
     )
-    department_count = len(units)
+    units = prefetch(units, chairs(Worker.dept_chair_id))
+    department_count = sum(1 for department in units if department.worker_count)
     return render_template(
         "departments.html",
         latest_test_name=latest_test.name,
@@ -282,6 +404,7 @@ def department(department_slug=None):
                 alias=request.form["alias"].strip() or None,
                 unit=request.form["unit"] or None,
             ).where(Department.slug == department_slug).execute()
+            bump_version()
         flash("Department updated")
 
     if department_slug:
@@ -289,6 +412,13 @@ def department(department_slug=None):
     else:
         department = Department.get(Department.id == session["department_id"])
 
+    as_of = request.args.get("as_of")
+    if as_of:
+        try:
+            as_of = date.fromisoformat(as_of)
+        except ValueError:
+            abort(400)
+
     workers_active = (
         Worker.select(
             Worker,
@@ -299,14 +429,13 @@ def department(department_slug=None):
             .alias("participated"),
         )
         .join(Participation, JOIN.LEFT_OUTER, on=(Worker.id == Participation.worker))
-        .where(
-            ((Worker.organizing_dept_id == department.id))
-            & (Worker.updated > max_age())
-            & (Worker.active == True)
-        )
+        .where((Worker.organizing_dept_id == department.id) & (Worker.active == True))
         .group_by(Worker.id)
         .order_by(Worker.active.desc(), Worker.name, Participation.structure_test)
     )
+    if as_of:
+        workers_active = workers_as_of(department.id, as_of)
+
     workers_inactive = (
         Worker.select(Worker)
         .where(
@@ -331,16 +460,10 @@ def department(department_slug=None):
         .order_by(Worker.active.desc(), Worker.name)
     )
 
-    units = Unit.select().order_by(Unit.name)
-
-    emailList = ""
-    for user in workers_active:
-        if(user.email):
-            emailList = emailList + str(user.email) + ", "
-
-    emailList = emailList[0:len(emailList)-2]
+    reference = reference_data()
 
-    structure_tests = StructureTest.select().order_by(StructureTest.added)
+    # the template iterates the same, already fetched rows
+    emails = ", ".join(str(user.email) for user in workers_active if user.email)
 
     return render_template(
         "department.html",
@@ -348,15 +471,31 @@ def department(department_slug=None):
         workers_inactive=workers_inactive,
         workers_external=workers_external,
         department=department,
-        structure_tests=structure_tests,
-        last_updated=last_updated(),
-        emails=emailList,
-        units=units,
+        structure_tests=reference.structure_tests,
+        last_updated=reference.last_updated,
+        emails=emails,
+        units=reference.units,
+        as_of=as_of,
     )
 
 
+def workers_as_of(department_id, as_of):
+    """Workers organized at the end of ``as_of`` with their participation then."""
+    workers = list(events.organized_at(department_id, as_of).order_by(Worker.name))
+    participated = {worker.id: [] for worker in workers}
+    for worker_id, structure_test_id in sorted(
+        events.participation_at(datetime.combine(as_of, time.max), department_id)
+    ):
+        if worker_id in participated:
+            participated[worker_id].append(structure_test_id)
+    for worker in workers:
+        worker.participated = participated[worker.id]
+    return workers
+
+
 @views.route("/structure_tests", methods=["GET", "POST"])
 @login_required
+@cached
 def structure_tests():
     structure_tests = (
         StructureTest.select(
@@ -380,12 +519,57 @@ def structure_tests():
     )
 
 
+@views.route("/trends/")
+@login_required
+@cached
+def trends_view():
+    reference = reference_data()
+    selected = trends.selection(
+        reference, request.args.get("department"), request.args.get("unit")
+    )
+    if selected is None:
+        abort(404)
+    name, department_ids = selected
+    trend = trends.trend(department_ids)
+    structure_tests = [
+        structure_test
+        for structure_test in reference.structure_tests
+        if structure_test.id in trend["structure_tests"]
+    ]
+    # newest first
+    days = [
+        (
+            day,
+            workers,
+            [
+                trend["structure_tests"][structure_test.id][position]
+                for structure_test in structure_tests
+            ],
+        )
+        for position, (day, workers) in enumerate(zip(trend["days"], trend["workers"]))
+    ][::-1]
+    return render_template(
+        "trends.html",
+        name=name,
+        days=days,
+        structure_tests=structure_tests,
+        units=reference.units,
+        departments=reference.departments,
+    )
+
+
 @views.route("/worker/<int:worker_id>/delete")
 @login_required
 def worker_delete(worker_id):
     worker = get_object_or_404(Worker, (Worker.id == worker_id))
-    Worker.delete().where(Worker.id == worker_id).execute()
-    Participation.delete().where(Participation.worker == worker_id).execute()
+    with db_wrapper.database.atomic():
+        aggregates.move_worker(
+            worker_id, (worker.organizing_dept_id, worker.active), None
+        )
+        Worker.delete().where(Worker.id == worker_id).execute()
+        events.record_removal(Participation.worker == worker_id, session.get("user_id"))
+        Participation.delete().where(Participation.worker == worker_id).execute()
+        bump_version()
     flash(f"Deleted worker {worker.name} ({worker.id})")
     return redirect(url_for("homepage"))
 
@@ -426,20 +610,35 @@ def worker(worker_id=None):
                 else:
                     flash("If setting a password a email address is required, too")
 
-        if worker_id:
-            Worker.update(**data).where(Worker.id == worker_id).execute()
-            flash("Worker updated")
-        else:
-            worker = Worker.get_or_create(
-                name=request.form.get("name", "").strip(),
-                contract="manual",
-                # special case for manually added worker
-                department_id=0,
-                **data,
-                updated=date.today(),
-                unit=0,
-            )
-            flash("Worker added")
+        with db_wrapper.database.atomic():
+            if worker_id:
+                worker = get_object_or_404(Worker, (Worker.id == worker_id))
+                Worker.update(**data).where(Worker.id == worker_id).execute()
+                aggregates.move_worker(
+                    worker_id,
+                    (worker.organizing_dept_id, worker.active),
+                    (
+                        data.get("organizing_dept_id", worker.organizing_dept_id),
+                        data["active"],
+                    ),
+                )
+                flash("Worker updated")
+            else:
+                worker, created = Worker.get_or_create(
+                    name=request.form.get("name", "").strip(),
+                    contract="manual",
+                    # special case for manually added worker
+                    department_id=0,
+                    **data,
+                    updated=date.today(),
+                    unit=0,
+                )
+                if created:
+                    aggregates.move_worker(
+                        worker.id, None, (worker.organizing_dept_id, worker.active)
+                    )
+                flash("Worker added")
+            bump_version()
 
         return redirect(
             url_for(
@@ -451,7 +650,7 @@ def worker(worker_id=None):
         )
 
     if worker_id:
-        worker = Worker.get(Worker.id == worker_id)
+        worker = get_object_or_404(Worker, (Worker.id == worker_id))
 
     structure_tests = list(
         StructureTest.select(
@@ -471,13 +670,14 @@ def worker(worker_id=None):
         .order_by(StructureTest.added)
         .dicts()
     )
+    reference = reference_data()
 
     return render_template(
         "worker.html",
         worker=worker,
         structure_tests=structure_tests,
-        Department=Department,
-        last_updated=last_updated(),
+        reference=reference,
+        last_updated=reference.last_updated,
     )
 
 
@@ -486,6 +686,7 @@ def worker(worker_id=None):
 def user_delete(user_id):
     user = get_object_or_404(Worker, (Worker.id == user_id))
     Worker.update({Worker.password: None}).where(Worker.id == user_id).execute()
+    bump_version()
     flash(f"Deleted user password of {user.name} ({user.id})")
     return redirect(url_for("users"))
 
@@ -497,6 +698,7 @@ def users():
         Worker.update(
             unit_chair_id=request.form["unit_chair_id"] or None,
         ).where(Worker.id == request.args.get("user_id")).execute()
+        bump_version()
         flash("User updated")
 
     users = list(
@@ -506,9 +708,8 @@ def users():
         .order_by(Worker.name)
         .dicts()
     )
-    units = Unit.select().order_by(Unit.name)
     return render_template(
-        "users.html", users=users, units=units, departments=departments
+        "users.html", users=users, units=reference_data().units, departments=departments
     )
 
 
@@ -518,7 +719,7 @@ def former():
     former = list(
         Worker.select(Worker, Department.name.alias("department_name"))
         .join(Department, on=(Worker.organizing_dept_id == Department.id))
-        .where(Worker.active != True)
+        .where(Worker.active == False)
         .order_by(Worker.name)
         .dicts()
     )
@@ -528,19 +729,46 @@ def former():
 @views.route("/participation/<int:worker_id>/<int:structure_test_id>/<int:status>")
 @login_required
 def participation(worker_id, structure_test_id, status):
-    worker = Worker.get(Worker.id == worker_id)
-    if session.get("department_id") == worker.organizing_dept_id or is_admin():
-        if status == 1:
-            Participation.create(worker=worker_id, structure_test=structure_test_id)
-        else:
-            Participation.delete().where(
-                Participation.worker == worker_id,
-                Participation.structure_test == structure_test_id,
-            ).execute()
-        return ""
-    else:
+    return update_participation(
+        {(worker_id, structure_test_id): bool(status)}, single=True
+    )
+
+
+@views.route("/participation", methods=["POST"])
+@login_required
+def participation_bulk():
+    """Apply a batch of checkbox changes sent as JSON.
+
+    The body is ``{"changes": [{"worker": 1, "structure_test": 2, "status": 1}]}``,
+    the batch is rejected as a whole if any worker is outside the user's
+    department.
+    """
+    try:
+        changes = coalesce((request.get_json(silent=True) or {})["changes"])
+    except (KeyError, TypeError, ValueError):
+        return "", 400
+    return update_participation(changes)
+
+
+def update_participation(changes, single=False):
+    workers = workers_of(changes)
+    allowed = len(workers) == len({worker_id for worker_id, _ in changes}) and (
+        is_admin()
+        or all(
+            session.get("department_id") == organizing_dept_id
+            for organizing_dept_id, _ in workers.values()
+        )
+    )
+    if not allowed or unknown_structure_tests(changes):
         return "", 400
 
+    added, removed = apply_changes(changes, workers, session.get("user_id"))
+    if added or removed:
+        bump_version()
+    if single:
+        return ""
+    return jsonify(added=added, removed=removed)
+
 
 @views.route("/logout/")
 def logout():
@@ -567,8 +795,31 @@ def upload_record():
             flash("Wrong filetype, convert to CSV please")
             return redirect(request.url)
 
+        mode = request.form.get("mode", "full")
+        if mode == "preview":
+            stats = ImportStats()
+            roster_diff = parse_csv(record, stats=stats, dry_run=True)
+            flash(
+                f"Preview: {len(roster_diff.added)} added, "
+                f"{len(roster_diff.moved)} moved, "
+                f"{len(roster_diff.reactivated)} reactivated, "
+                f"{len(roster_diff.deactivated)} deactivated"
+            )
+            return render_template(
+                "upload_record.html",
+                roster_diff=roster_diff,
+                unmapped=sorted(stats.unmapped),
+                new_workers=[],
+            )
+
         if record:
-            parse_csv(record)
+            job = submit_import(record, diff=(mode == "diff"))
+            flash(f'Import of "{job.filename}" started')
+            return redirect(url_for("upload_record", job_id=job.id))
+
+    job = None
+    if request.args.get("job_id"):
+        job = get_object_or_404(ImportJob, (ImportJob.id == request.args["job_id"]))
 
     new_workers = (
         Worker.select(Worker, Department.name.alias("department_name"))
@@ -579,7 +830,10 @@ def upload_record():
     if new_workers:
         flash(f"Found {len(new_workers)} new workers")
 
+    imports = ImportHistory.select().order_by(ImportHistory.id.desc()).limit(20)
     return render_template(
         "upload_record.html",
         new_workers=new_workers,
+        job=job_status(job) if job else None,
+        imports=imports,
     )